@@ -0,0 +1,44 @@
+// SPDX-License-Identifier: MIT
+
+pragma solidity 0.6.11;
+pragma experimental ABIEncoderV2;
+
+/* Aggregates view calls to any contracts into a single eth_call - used by the
+brownie simulation to read the system state in one request per phase.
+Not part of the Zero application. */
+contract Multicall {
+    struct Call {
+        address target;
+        bytes callData;
+    }
+
+    struct Result {
+        bool success;
+        bytes returnData;
+    }
+
+    function aggregate(Call[] calldata _calls) external view returns (uint256 blockNumber, bytes[] memory returnData) {
+        blockNumber = block.number;
+        returnData = new bytes[](_calls.length);
+        for (uint256 i = 0; i < _calls.length; i++) {
+            (bool success, bytes memory data) = _calls[i].target.staticcall(_calls[i].callData);
+            require(success, "Multicall: call failed");
+            returnData[i] = data;
+        }
+    }
+
+    function tryAggregate(bool _requireSuccess, Call[] calldata _calls) external view returns (Result[] memory returnData) {
+        returnData = new Result[](_calls.length);
+        for (uint256 i = 0; i < _calls.length; i++) {
+            (bool success, bytes memory data) = _calls[i].target.staticcall(_calls[i].callData);
+            if (_requireSuccess) {
+                require(success, "Multicall: call failed");
+            }
+            returnData[i] = Result(success, data);
+        }
+    }
+
+    function getBlockNumber() external view returns (uint256) {
+        return block.number;
+    }
+}
@@ -0,0 +1,15 @@
+"""Agent-based macro model of the Zero protocol: troves, ZUSD market and ZERO market.
+
+Importing the package only defines the model; runs start with `simulate` or
+`simulate_policies`, and the figures live in `macroModel.plots`. From the
+command line:
+
+    python -m macroModel run --scenario compare --steps 8640 --out results
+"""
+
+from .macro_model import simulate, simulate_policies
+from .policies import BaseRatePolicy, FixedRatePolicy
+from .random_streams import RandomStreams
+from .recorder import Recorder
+from .sketches import TroveSketch
+from .trove_store import TroveStore
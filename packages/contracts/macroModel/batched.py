@@ -0,0 +1,346 @@
+"""Batched kernel: many independent paths of the macro model advanced together.
+
+The troves of all paths live in 2-D arrays (path x trove slot) with a
+validity mask, and the path-level state (ZUSD price, pools, exogenous
+prices) in 1-D arrays, so each phase of `macro_model` -- liquidation,
+closing, adjustment, opening, the stability pool, price clearing with the
+ceiling and floor arbitrage, and the ZERO market -- runs as a handful of
+array operations over the whole batch instead of a Python pass per path.
+Freed slots are reused by later openings; capacity grows for all paths when
+one of them runs out.
+
+The phases follow `macro_model` step for step, with fixed fee rates, and
+share its arithmetic, the functions of `kernels` and the draws of new
+troves, applied here to one value per path; but the random draws are laid out per batch (one stream per phase and hour,
+with a value per path or per slot), so a batch is a statistically
+equivalent ensemble, not a replay of `simulate` for particular seeds. Paths
+stop, as in the reference model, when the liquidity pool or the ZUSD price
+turn negative or undefined; their later hours are recorded as missing.
+"""
+
+import numpy as np
+
+from . import kernels
+from .ensemble import ENSEMBLE_METRICS, EnsembleResult, run_summary
+from .random_streams import RandomStreams
+
+RECORDED_METRICS = ENSEMBLE_METRICS + ("n_liquidate", "n_redempt")
+_WINDOWED = ("liquidation_gain", "airdrop_gain", "issuance_fee", "redemption_fee")
+
+class BatchedSimulation:
+    def __init__(self, n_paths, seed, rate_issuance=None, rate_redemption=None, capacity=64):
+        """Parameters are read from `macro_model` when the batch is built; the rates default to its fee rates."""
+        from . import macro_model
+        self.model = macro_model
+        self.n_paths = n_paths
+        self.streams = RandomStreams(seed)
+        self.rate_issuance = macro_model.rate_issuance if rate_issuance is None else rate_issuance
+        self.rate_redemption = macro_model.rate_redemption if rate_redemption is None else rate_redemption
+
+        shape = (n_paths, capacity)
+        self.ether_quantity = np.zeros(shape)
+        self.supply = np.zeros(shape)
+        self.CR_initial = np.ones(shape)
+        self.rational_inattention = np.ones(shape)
+        self.CR_current = np.zeros(shape)
+        self.alive = np.zeros(shape, dtype=bool)
+        self.running = np.ones(n_paths, dtype=bool)
+
+        self.price_ether = np.full(n_paths, float(macro_model.price_ether_initial))
+        self.natural_rate = np.full(n_paths, float(macro_model.natural_rate_initial))
+        self.price_ZERO_path = np.full(n_paths, float(macro_model.price_ZERO_initial))
+
+        # trailing sums of the windowed metrics over the last day and month of recorded hours
+        self._history = {name: np.zeros((macro_model.month, n_paths)) for name in _WINDOWED}
+        self._day_sum = {name: np.zeros(n_paths) for name in _WINDOWED}
+        self._month_sum = {name: np.zeros(n_paths) for name in _WINDOWED}
+
+    @property
+    def capacity(self):
+        return self.alive.shape[1]
+
+    def _columns(self):
+        return ("ether_quantity", "supply", "CR_initial", "rational_inattention", "CR_current")
+
+    def _reserve(self, capacity):
+        if capacity <= self.capacity:
+            return
+        extra = max(capacity, 2 * self.capacity) - self.capacity
+        for name in self._columns():
+            column = getattr(self, name)
+            setattr(self, name, np.concatenate([column, np.zeros((self.n_paths, extra))], axis=1))
+        self.alive = np.concatenate([self.alive, np.zeros((self.n_paths, extra), dtype=bool)], axis=1)
+
+    def _append(self, counts, **values):
+        """Opens `counts[p]` troves on path p, taken from the first columns of the (paths x k) `values`."""
+        opening = np.flatnonzero(counts)
+        if not len(opening):
+            return
+        counts = counts[opening]
+        free = self.capacity - self.alive[opening].sum(axis=1)
+        self._reserve(self.capacity + max(0, int((counts - free).max())))
+        vacant = ~self.alive[opening]
+        if counts.max() == 1:
+            # one trove per path, e.g. the ceiling arbitrage: the first vacant slot
+            local, slots, source = np.arange(len(opening)), vacant.argmax(axis=1), 0
+        else:
+            rank = np.cumsum(vacant, axis=1, dtype=np.int32)
+            local, slots = np.nonzero(vacant & (rank <= counts[:, None]))
+            source = rank[local, slots] - 1
+        rows = opening[local]
+        for name, value in values.items():
+            getattr(self, name)[rows, slots] = value[rows, source]
+        self.alive[rows, slots] = True
+
+    def _remove(self, rows, slots):
+        # vacant slots hold no debt or collateral, so per-path totals are plain row sums
+        self.alive[rows, slots] = False
+        self.supply[rows, slots] = 0
+        self.ether_quantity[rows, slots] = 0
+
+    def _window_sum(self, name, window):
+        return self._day_sum[name] if window == self.model.day else self._month_sum[name]
+
+    def _record_windows(self, index, row):
+        month, day = self.model.month, self.model.day
+        for name in _WINDOWED:
+            history = self._history[name]
+            value = row[name]
+            if index >= day:
+                self._day_sum[name] += value - history[(index - day) % month]
+            else:
+                self._day_sum[name] += value
+            self._month_sum[name] += value - history[index % month]
+            history[index % month] = value
+            if index % month == month - 1:
+                # drop the rounding drift of the running sums once per window
+                self._month_sum[name] = history.sum(axis=0)
+                self._day_sum[name] = history[(np.arange(index - day + 1, index + 1)) % month].sum(axis=0)
+
+    def _open(self, index, price_ZUSD_previous, n_troves):
+        m = self.model
+        rng = self.streams('open_troves', index)
+        shock_opentroves = rng.normal(0, m.sd_opentroves, self.n_paths)
+        if index <= 0:
+            number_opentroves = np.full(self.n_paths, float(m.initial_open))
+        else:
+            number_opentroves = kernels.troves_to_open(shock_opentroves, price_ZUSD_previous, n_troves, self.rate_issuance, m.n_steady, m.alpha)
+        number_opentroves = np.where(self.running, np.round(np.nan_to_num(number_opentroves)), 0).astype(np.int64)
+
+        k = int(number_opentroves.max())
+        issuance_ZUSD_open = np.zeros(self.n_paths)
+        if k > 0:
+            CR_ratios, quantities_ether, rational_inattentions = m.new_troves(self.streams('open_troves', index, 1), (self.n_paths, k))
+            supply_troves = kernels.trove_supply(self.price_ether[:, None], quantities_ether, CR_ratios)
+            opened = np.arange(k) < number_opentroves[:, None]
+            issuance_ZUSD_open = self.rate_issuance * np.where(opened, supply_troves, 0).sum(axis=1)
+            self._append(number_opentroves, ether_quantity=quantities_ether, supply=supply_troves, CR_initial=CR_ratios,
+                         rational_inattention=rational_inattentions, CR_current=CR_ratios)
+        return number_opentroves, issuance_ZUSD_open
+
+    def start(self, n_steps, metrics=RECORDED_METRICS):
+        """Opens the initial troves and records hour 0."""
+        m = self.model
+        self.result = EnsembleResult(range(self.n_paths), n_steps, metrics, label='path')
+        self.steps = np.zeros(self.n_paths, dtype=np.int64)
+        n_open, issuance_ZUSD_open = self._open(0, np.ones(self.n_paths), np.zeros(self.n_paths))
+        supply = self.supply.sum(axis=1)
+        self.price_ZUSD = np.ones(self.n_paths)
+        self.price_ZERO = self.price_ZERO_path.copy()
+        self.stability = 0.5 * supply
+        self.liquidity = 0.5 * supply
+        zeros = np.zeros(self.n_paths)
+        row = {"Price_ZUSD": self.price_ZUSD, "n_troves": self.alive.sum(axis=1), "stability": self.stability,
+               "liquidity": self.liquidity, "n_liquidate": zeros, "n_redempt": zeros,
+               "liquidation_gain": zeros, "airdrop_gain": zeros, "issuance_fee": issuance_ZUSD_open * 1.0, "redemption_fee": zeros}
+        self._record(0, row, self.running)
+
+    def _record(self, index, row, recorded):
+        for name, paths in self.result.paths.items():
+            paths[:, index] = np.where(recorded, row[name], np.nan)
+        self.steps[recorded] = index + 1
+        self._record_windows(index, row)
+
+    def step(self, index):
+        m = self.model
+        n_paths = self.n_paths
+        price_ZUSD_previous = self.price_ZUSD
+        price_ether = self.price_ether = self.price_ether * (1 + self.streams('price_ether', index).normal(0, m.sd_ether, n_paths)) * (1 + m.drift_ether)
+        self.natural_rate = self.natural_rate * (1 + self.streams('natural_rate', index).normal(0, m.sd_natural_rate, n_paths))
+
+    #trove liquidation & return of stability pool
+        alive = self.alive
+        np.divide(price_ether[:, None] * self.ether_quantity, self.supply, out=self.CR_current, where=alive)
+        rows, slots = np.nonzero(alive & (self.CR_current < 1.1))
+        debt_liquidated = np.bincount(rows, self.supply[rows, slots], n_paths)
+        ether_liquidated = np.bincount(rows, self.ether_quantity[rows, slots], n_paths)
+        n_liquidate = np.bincount(rows, minlength=n_paths)
+        self._remove(rows, slots)
+
+        liquidation_gain = kernels.liquidation_gain(ether_liquidated, debt_liquidated, price_ether, price_ZUSD_previous)
+        airdrop_gain = self.price_ZERO * m.quantity_ZERO_airdrop
+        shock_return = self.streams('return_stability', index).normal(0, m.sd_return, n_paths)
+        if index <= m.day:
+            return_stability = m.initial_return * (1 + shock_return)
+        elif index <= m.month:
+            gains = self._window_sum('liquidation_gain', m.day) + self._window_sum('airdrop_gain', m.day)
+            return_stability = np.minimum(0.5, kernels.stability_return(gains, m.day, price_ZUSD_previous, self.stability))
+        else:
+            gains = self._window_sum('liquidation_gain', m.month) + self._window_sum('airdrop_gain', m.month)
+            return_stability = kernels.stability_return(gains, m.month, price_ZUSD_previous, self.stability)
+
+    #close troves
+        rng = self.streams('close_troves', index)
+        shock_closetroves = rng.normal(0, m.sd_closetroves, n_paths)
+        n_troves = alive.sum(axis=1)
+        if index <= 240:
+            number_closetroves = rng.uniform(0, 1, n_paths)
+        else:
+            number_closetroves = kernels.troves_to_close(shock_closetroves, price_ZUSD_previous, n_troves, m.n_steady, m.beta)
+        number_closetroves = np.where(self.running, np.round(np.nan_to_num(number_closetroves)), 0).astype(np.int64)
+        number_closetroves = np.minimum(number_closetroves, n_troves)
+        closing = np.flatnonzero(number_closetroves)
+        if len(closing):
+            # a uniform choice without replacement: the troves with the smallest random keys
+            keys = self.streams('close_troves', index, 1).random((len(closing), self.capacity))
+            keys[~alive[closing]] = 2
+            threshold = np.take_along_axis(np.sort(keys, axis=1), number_closetroves[closing, None] - 1, axis=1)
+            rows, slots = np.nonzero(keys <= threshold)
+            self._remove(closing[rows], slots)
+
+    #adjust troves
+        rng = self.streams('adjust_troves', index)
+        ratio = rng.uniform(0, 1, n_paths)
+        check = kernels.band_check(self.CR_current, self.CR_initial, self.rational_inattention)
+        rows, slots = np.nonzero(alive & kernels.outside_band(check))
+        issuance_ZUSD_adjust = np.zeros(n_paths)
+        if len(rows):
+            # only the few troves outside their inattention band are touched
+            by_debt = self.streams('adjust_troves', index, 1).random(len(rows)) >= ratio[rows]
+            r, s = rows[by_debt], slots[by_debt]
+            supply_new = kernels.trove_supply(price_ether[r], self.ether_quantity[r, s], self.CR_initial[r, s])
+            increased = check[r, s] > 2
+            issuance_ZUSD_adjust = self.rate_issuance * np.bincount(r[increased], (supply_new - self.supply[r, s])[increased], n_paths)
+            self.supply[r, s] = supply_new
+            r, s = rows[~by_debt], slots[~by_debt]
+            self.ether_quantity[r, s] = kernels.trove_collateral(self.CR_initial[r, s], self.supply[r, s], price_ether[r])
+
+    #open troves
+        n_open, issuance_ZUSD_open = self._open(index, price_ZUSD_previous, alive.sum(axis=1))
+        alive = self.alive
+
+    #Stability Pool
+        shock_stability = self.streams('stability_update', index).normal(0, m.sd_stability, n_paths)
+        drift = m.drift_stability if index <= m.month else 1
+        stability_pool = kernels.stability_pool(self.stability, drift, shock_stability, return_stability, self.natural_rate, m.theta)
+
+    #Calculating Price, Liquidity Pool, and Redemption
+        supply = self.supply.sum(axis=1)
+        rng = self.streams('price_stabilizer', index)
+        shock_liquidity = rng.normal(0, m.sd_liquidity, n_paths)
+        shock_redemption = rng.normal(0, m.sd_redemption, n_paths)
+        liquidity_expected = self.liquidity * (m.drift_liquidity + shock_liquidity)
+        liquidity_pool = supply - stability_pool
+        price_ZUSD_current = kernels.clearing_price(price_ZUSD_previous, liquidity_pool, liquidity_expected, m.delta)
+
+        #Ceiling Arbitrageurs
+        ceiling = self.running & (price_ZUSD_current > 1.1 + self.rate_issuance)
+        issuance_ZUSD_stabilizer = np.zeros(n_paths)
+        if ceiling.any():
+            supply_wanted = kernels.supply_at_price(1.1 + self.rate_issuance, price_ZUSD_previous, stability_pool, liquidity_expected, m.delta)
+            supply_trove = (supply_wanted - supply)[:, None]
+            self._append(ceiling.astype(np.int64), ether_quantity=kernels.trove_collateral(1.1, supply_trove, price_ether[:, None]), supply=supply_trove,
+                         CR_initial=np.full_like(supply_trove, 1.1), rational_inattention=np.full_like(supply_trove, 0.1),
+                         CR_current=np.full_like(supply_trove, 1.1))
+            alive = self.alive
+            issuance_ZUSD_stabilizer = np.where(ceiling, self.rate_issuance * supply_trove[:, 0], 0)
+            price_ZUSD_current = np.where(ceiling, 1.1 + self.rate_issuance, price_ZUSD_current)
+            liquidity_pool = np.where(ceiling, supply_wanted - stability_pool, liquidity_pool)
+            n_open = n_open + ceiling
+
+        #Floor Arbitrageurs
+        floor = self.running & (price_ZUSD_current < 1 - self.rate_redemption)
+        redemption_pool = np.zeros(n_paths)
+        n_redempt = np.zeros(n_paths, dtype=np.int64)
+        if floor.any():
+            redemption_ratio = m.redemption_star * (1 + shock_redemption)
+            supply_target = kernels.supply_at_price(1 - self.rate_redemption, price_ZUSD_previous, stability_pool, liquidity_expected, m.delta)
+            redeemed, price_floor = kernels.floor_redemption(supply, supply_target, liquidity_pool, redemption_ratio,
+                                                             price_ZUSD_previous, liquidity_expected, self.rate_redemption, m.delta)
+            redemption_pool = np.where(floor, redeemed, 0)
+            price_ZUSD_current = np.where(floor, price_floor, price_ZUSD_current)
+            n_redempt[floor] = self._redeem(np.flatnonzero(floor), redemption_pool[floor])
+        redemption_fee = self.rate_redemption * redemption_pool
+
+        #negative or undefined (NaN) pools end the run
+        running = self.running.copy()
+        self.running &= liquidity_pool >= 0
+
+    #ZERO Market
+        quantity_ZERO = (100000000/3) * (1 - 0.5 ** (index / m.period))
+        if index <= m.month:
+            price_ZERO_current = self.price_ZERO_path.copy()
+            annualized_earning = (index / m.month) ** 0.5 * self.streams('ZERO_market', index).normal(200000000, 500000, n_paths)
+            self.price_ZERO_path *= (1 + self.streams('price_ZERO', index).normal(0, m.sd_ZERO, n_paths)) * (1 + m.drift_ZERO)
+        else:
+            revenue = self._window_sum('issuance_fee', m.month) + self._window_sum('redemption_fee', m.month)
+            annualized_earning, price_ZERO_current = kernels.ZERO_price(index, revenue, m.period, m.PE_ratio, m.ZERO_total_supply)
+
+    #Summary
+        issuance_fee = price_ZUSD_current * (issuance_ZUSD_adjust + issuance_ZUSD_open + issuance_ZUSD_stabilizer)
+        row = {"Price_ZUSD": price_ZUSD_current, "n_troves": alive.sum(axis=1), "stability": stability_pool,
+               "liquidity": liquidity_pool, "n_liquidate": n_liquidate, "n_redempt": n_redempt,
+               "liquidation_gain": liquidation_gain, "airdrop_gain": airdrop_gain,
+               "issuance_fee": issuance_fee, "redemption_fee": redemption_fee}
+        self._record(index, row, self.running)
+        self.running &= price_ZUSD_current >= 0
+
+        self.price_ZUSD = price_ZUSD_current
+        self.stability = stability_pool
+        self.liquidity = liquidity_pool
+        self.price_ZERO = price_ZERO_current
+        # stopped paths keep no troves, so they cost nothing in the later phases
+        stopped = np.flatnonzero(running & ~self.running)
+        self.alive[stopped] = False
+        self.supply[stopped] = 0
+        self.ether_quantity[stopped] = 0
+
+    def _redeem(self, paths, amounts):
+        """Redeems `amounts[k]` of debt from the riskiest troves of path `paths[k]`; returns the number of troves closed."""
+        alive = self.alive[paths]
+        supply = self.supply[paths]
+        nicr = np.where(alive, self.ether_quantity[paths] / supply, np.inf)
+        order = np.argsort(nicr, axis=1, kind='stable')
+        cumulative = np.cumsum(np.take_along_axis(supply, order, axis=1), axis=1)
+        n_alive = alive.sum(axis=1)
+        n_redeemed = np.minimum((cumulative <= amounts[:, None]).sum(axis=1), n_alive)
+
+        local, ranks = np.nonzero(np.arange(order.shape[1]) < n_redeemed[:, None])
+        self._remove(paths[local], order[local, ranks])
+
+        #Residuals
+        has_partial = n_redeemed < n_alive
+        rows = paths[has_partial]
+        slots = order[has_partial, n_redeemed[has_partial]]
+        covered = np.where(n_redeemed > 0, cumulative[np.arange(len(paths)), np.maximum(n_redeemed - 1, 0)], 0)
+        residual = (amounts - covered)[has_partial]
+        kernels.redeem_residual(self.ether_quantity, self.supply, self.CR_current, (rows, slots), residual, self.price_ether[rows])
+        return n_redeemed
+
+    def run(self, n_steps, metrics=RECORDED_METRICS):
+        """Simulates every path for up to `n_steps` hours; returns an EnsembleResult with one run per path."""
+        self.start(n_steps, metrics)
+        # stopped paths and empty slots produce NaNs and infinities that are masked out
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            for index in range(1, n_steps):
+                if not self.running.any():
+                    break
+                self.step(index)
+        result = self.result
+        for path in range(self.n_paths):
+            steps = self.steps[path]
+            result.summaries[path] = run_summary({name: paths[path, :steps] for name, paths in result.paths.items()})
+        return result
+
+def simulate_batch(n_paths, seed, n_steps, **kwargs):
+    return BatchedSimulation(n_paths, seed, **kwargs).run(n_steps)
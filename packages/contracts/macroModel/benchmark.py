@@ -0,0 +1,180 @@
+"""Scaling benchmark of the macro model.
+
+Runs the full simulation at controlled trove populations and horizons and
+reports, per case, the simulated hours per second, the time per hour of each
+phase, the peak resident memory and the memory allocated per hour. The
+population is set through the initial number of troves (`initial_open`);
+the model then opens and closes troves on its own, so the mean and final
+populations are reported as well. Every case uses the same seed, and the
+counter-based random streams make the draws of a phase depend only on the
+seed and the hour, so timings of two versions of macro_model.py are compared
+on the same work. Each case runs in a fresh process so its peak RSS is its
+own; allocations are traced with tracemalloc in a second, shorter pass, so
+the tracing does not distort the timings.
+
+    python -m macroModel.benchmark [--troves 100 1000 10000 100000 1000000] [--hours 168 720 8760 87600] [--out bench.json]
+    python -m macroModel.benchmark --compare before.json after.json [--tolerance 0.1]
+
+Cases with more than `--budget` trove-hours are skipped.
+"""
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .results import code_version
+
+HOURS = {168: 'week', 720: 'month', 8760: 'year', 87600: 'ten years'}
+
+def _peak_rss():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # kilobytes on Linux, bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+class _TracedHours:
+    # per-hour hook of the traced pass: peak traced memory above the level at the start of the hour
+    def __init__(self, n_hours):
+        self.n_hours = n_hours
+        self.peaks = []
+        self.base = tracemalloc.get_traced_memory()[0]
+
+    def __call__(self, index, data):
+        current, peak = tracemalloc.get_traced_memory()
+        self.peaks.append(peak - self.base)
+        tracemalloc.reset_peak()
+        self.base = current
+        return len(self.peaks) >= self.n_hours
+
+def run_case(n_troves, n_hours, seed=2019, traced_hours=24):
+    """Simulates `n_hours` hours starting from `n_troves` troves; returns the measurements."""
+    from . import kernels, macro_model
+    from .profiler import Profiler
+
+    saved = macro_model.initial_open
+    macro_model.initial_open = n_troves
+    try:
+        profiler = Profiler()
+        start = time.perf_counter()
+        data, troves = macro_model.simulate(seed, n_hours, profiler=profiler)
+        seconds = time.perf_counter() - start
+        peak_rss = _peak_rss()
+
+        tracemalloc.start()
+        traced = _TracedHours(min(traced_hours, n_hours - 1))
+        macro_model.simulate(seed, n_hours, diverged=traced)
+        tracemalloc.stop()
+    finally:
+        macro_model.initial_open = saved
+
+    hours = len(data) - 1
+    return {
+        'troves': n_troves,
+        'hours': n_hours,
+        'completed_hours': hours,
+        'seconds': seconds,
+        'hours_per_second': hours / seconds if seconds > 0 else None,
+        'mean_troves': float(np.mean(data['n_troves'])),
+        'final_troves': len(troves),
+        'peak_rss_bytes': peak_rss,
+        'allocated_bytes_per_hour': float(np.mean(traced.peaks)) if traced.peaks else None,
+        'phase_ms_per_hour': {name: 1e3 * total['seconds'] / max(hours, 1) for name, total in profiler.totals().items()},
+        'kernels': kernels.backend_name,
+    }
+
+def _run_isolated(n_troves, n_hours, seed, traced_hours):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(run_case, n_troves, n_hours, seed, traced_hours).result()
+
+def run_suite(troves, hours, seed=2019, budget=2e8, traced_hours=24, on_result=None):
+    """Runs every (population, horizon) case within `budget` trove-hours; returns the JSON-ready report."""
+    report = {
+        **code_version(),
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'seed': seed,
+        'cases': [],
+        'skipped': [],
+    }
+    for n_troves in troves:
+        for n_hours in hours:
+            if n_troves * n_hours > budget:
+                report['skipped'].append({'troves': n_troves, 'hours': n_hours})
+                continue
+            case = _run_isolated(n_troves, n_hours, seed, traced_hours)
+            report['cases'].append(case)
+            if on_result is not None:
+                on_result(case)
+    return report
+
+def _format_case(case):
+    # the rates are None for runs too short to measure
+    rss = case['peak_rss_bytes']
+    rate = case['hours_per_second']
+    allocated = case['allocated_bytes_per_hour']
+    return (f"{case['troves']:>9} {HOURS.get(case['hours'], case['hours']):>10} {case['completed_hours']:>8} "
+            f"{rate if rate is not None else float('nan'):>10.1f} {case['mean_troves']:>11.0f} "
+            f"{rss / 2**20 if rss else float('nan'):>9.1f} {allocated / 2**10 if allocated is not None else float('nan'):>10.1f}")
+
+HEADER = f"{'troves':>9} {'horizon':>10} {'hours':>8} {'hours/s':>10} {'mean troves':>11} {'RSS MiB':>9} {'KiB/hour':>10}"
+
+def compare(before, after, tolerance=0.1):
+    """Prints hours/s of the cases both reports share; returns the cases that slowed down by more than `tolerance`."""
+    cases = {(case['troves'], case['hours']): case for case in before['cases']}
+    print(f"{'troves':>9} {'horizon':>10} {'before':>10} {'after':>10} {'ratio':>7}")
+    regressions = []
+    for case in after['cases']:
+        old = cases.get((case['troves'], case['hours']))
+        if old is None or not case['hours_per_second'] or not old['hours_per_second']:
+            continue
+        ratio = case['hours_per_second'] / old['hours_per_second']
+        flag = ''
+        if ratio < 1 - tolerance:
+            regressions.append(case)
+            flag = '  slower'
+        print(f"{case['troves']:>9} {HOURS.get(case['hours'], case['hours']):>10} {old['hours_per_second']:>10.1f} "
+              f"{case['hours_per_second']:>10.1f} {ratio:>6.2f}x{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--troves', type=int, nargs='+', default=[100, 1000, 10000, 100000, 1000000])
+    parser.add_argument('--hours', type=int, nargs='+', default=list(HOURS))
+    parser.add_argument('--seed', type=int, default=2019)
+    parser.add_argument('--budget', type=float, default=2e8, help="skip cases above this many trove-hours")
+    parser.add_argument('--traced-hours', type=int, default=24, help="hours of the allocation-tracing pass")
+    parser.add_argument('--out', default=None, help="json file for the report")
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), default=None)
+    parser.add_argument('--tolerance', type=float, default=0.1, help="slowdown flagged by --compare")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        reports = []
+        for path in args.compare:
+            with open(path) as f:
+                reports.append(json.load(f))
+        return 1 if compare(*reports, args.tolerance) else 0
+
+    print(HEADER)
+    report = run_suite(args.troves, args.hours, args.seed, args.budget, args.traced_hours,
+                       on_result=lambda case: print(_format_case(case), flush=True))
+    for case in report['skipped']:
+        print(f"{case['troves']:>9} {HOURS.get(case['hours'], case['hours']):>10}   skipped (over the budget)")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=1)
+
+if __name__ == '__main__':
+    sys.exit(main())
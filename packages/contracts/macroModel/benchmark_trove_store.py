@@ -0,0 +1,102 @@
+"""Per-step cost of the trove bookkeeping in the macro model.
+
+Replays the trove operations of one simulated hour (collateral ratio refresh,
+liquidation, closing, adjustment, opening and redemption) against a
+TroveStore and against the pandas DataFrame it replaced, at a steady
+population of 1k, 10k and 100k troves.
+
+    python -m macroModel.benchmark_trove_store [--steps 200] [--sizes 1000 10000 100000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from .trove_store import COLUMNS, TroveStore
+
+price_ether_initial = 1000
+sd_ether = 0.02
+
+def sample_troves(rng, n, price_ether):
+    CR_initial = 1.1 + 0.1 * rng.chisquare(16, n)
+    ether_quantity = rng.gamma(10, 500, n)
+    return {
+        "Ether_Quantity": ether_quantity,
+        "Supply": price_ether * ether_quantity / CR_initial,
+        "CR_initial": CR_initial,
+        "Rational_inattention": rng.gamma(4, 0.08, n),
+        "CR_current": CR_initial,
+    }
+
+def store_step(troves, rng, price_ether, n_target):
+    troves['CR_current'] = price_ether * troves['Ether_Quantity'] / troves['Supply']
+    troves.remove(troves.cr_index.liquidatable(price_ether))
+
+    n_close = min(len(troves), rng.poisson(1))
+    troves.remove(rng.choice(len(troves), n_close, replace=False))
+
+    candidates = troves.band_index.triggered(troves, price_ether)
+    check = (troves['CR_current'][candidates] - troves['CR_initial'][candidates]) / (troves['CR_initial'][candidates] * troves['Rational_inattention'][candidates])
+    adjusted = candidates[(check < -1) | (check > 2)]
+    troves['Supply'][adjusted] = price_ether * troves['Ether_Quantity'][adjusted] / troves['CR_initial'][adjusted]
+    troves.rekey(adjusted)
+
+    troves.append(**sample_troves(rng, max(0, n_target - len(troves)), price_ether))
+
+    troves.remove(troves.cr_index.slots[:rng.poisson(1)])
+
+def frame_step(troves, rng, price_ether, n_target):
+    troves['CR_current'] = price_ether * troves['Ether_Quantity'] / troves['Supply']
+    troves = troves[troves.CR_current >= 1.1].reset_index(drop=True)
+
+    n_close = min(len(troves), rng.poisson(1))
+    troves = troves.drop(list(rng.choice(len(troves), n_close, replace=False))).reset_index(drop=True)
+
+    check = (troves['CR_current'] - troves['CR_initial']) / (troves['CR_initial'] * troves['Rational_inattention'])
+    adjusted = (check < -1) | (check > 2)
+    troves.loc[adjusted, 'Supply'] = price_ether * troves.loc[adjusted, 'Ether_Quantity'] / troves.loc[adjusted, 'CR_initial']
+
+    new_troves = pd.DataFrame(sample_troves(rng, max(0, n_target - len(troves)), price_ether))
+    troves = pd.concat([troves, new_troves], ignore_index=True)
+
+    troves = troves.sort_values(by='CR_current', ascending=True)
+    troves = troves.iloc[rng.poisson(1):].reset_index(drop=True)
+    return troves
+
+def run(n_troves, steps, seed=0):
+    rng = np.random.default_rng(seed)
+    prices = price_ether_initial * np.cumprod(1 + rng.normal(0, sd_ether, steps))
+    initial = sample_troves(rng, n_troves, price_ether_initial)
+
+    troves = TroveStore(capacity=n_troves)
+    troves.append(**initial)
+    step_rng = np.random.default_rng(seed + 1)
+    start = time.perf_counter()
+    for price in prices:
+        store_step(troves, step_rng, price, n_troves)
+    store_time = (time.perf_counter() - start) / steps
+
+    frame = pd.DataFrame({name: initial[name] for name in COLUMNS})
+    step_rng = np.random.default_rng(seed + 1)
+    start = time.perf_counter()
+    for price in prices:
+        frame = frame_step(frame, step_rng, price, n_troves)
+    frame_time = (time.perf_counter() - start) / steps
+
+    return store_time, frame_time
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--steps', type=int, default=200)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'troves':>8} {'store ms/step':>14} {'pandas ms/step':>15} {'speedup':>8}")
+    for n_troves in args.sizes:
+        store_time, frame_time = run(n_troves, args.steps)
+        print(f"{n_troves:>8} {1e3 * store_time:>14.3f} {1e3 * frame_time:>15.3f} {frame_time / store_time:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
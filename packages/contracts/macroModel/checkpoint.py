@@ -0,0 +1,53 @@
+"""Checkpoints of simulation runs, so long runs can be interrupted and resumed.
+
+A checkpoint holds the complete state of the runs at the end of an hour: the
+troves with their indexes, the recorded metrics with their rolling sums, the
+policies and the sketches, together with the seed, the horizon, the dtype
+and the parameters of the run -- those of the policies and the behavioural
+parameters of the model a sweep may change -- which a resumed run must share
+with the saved one. The random streams need no saving, as every draw is addressed by
+(seed, phase, hour), and the exogenous paths are rebuilt from the seed, so a
+resumed run reproduces the uninterrupted one bit for bit.
+
+Checkpoints are pickled (the arrays in NumPy's binary format) and written
+under a temporary name first, so an interruption while saving leaves the
+previous checkpoint intact. The last checkpoint is kept after the run
+completes; resuming from it returns the finished runs.
+"""
+
+import os
+import pickle
+
+def save(path, state):
+    """Writes `state` to `path`, replacing the previous checkpoint atomically."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    partial = f"{path}.{os.getpid()}.tmp"
+    with open(partial, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(partial, path)
+
+def load(path):
+    """The state saved at `path`, or None if there is no checkpoint yet."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+def _differences(name, saved, expected):
+    # the differing entries of nested dicts and sequences, e.g. one parameter of a policy
+    if isinstance(saved, dict) and isinstance(expected, dict):
+        for key in sorted(saved.keys() | expected.keys(), key=str):
+            yield from _differences(f"{name}[{key!r}]", saved.get(key), expected.get(key))
+    elif isinstance(saved, (list, tuple)) and isinstance(expected, (list, tuple)) and len(saved) == len(expected):
+        for k, (a, b) in enumerate(zip(saved, expected)):
+            yield from _differences(f"{name}[{k}]", a, b)
+    elif saved != expected:
+        yield f"{name} is {saved!r}, expected {expected!r}"
+
+def check(state, **expected):
+    """Raises ValueError if the checkpoint was saved by a different run."""
+    for name, value in expected.items():
+        differences = list(_differences(name, state.get(name), value))
+        if differences:
+            raise ValueError(f"checkpoint of another run: {'; '.join(differences)}")
@@ -0,0 +1,153 @@
+"""Command line entry point of the macro model (`zero-sim`, or `python -m macroModel`).
+
+    zero-sim run --scenario compare --steps 8640 --seed 2019 --out results [--profile profile.json]
+    zero-sim run --precision float32 [--no-check]
+    zero-sim run --sketch
+    zero-sim run --steps 87600 --checkpoint results/run.ckpt [--checkpoint-every 720]
+    zero-sim run --format parquet
+    zero-sim ensemble --runs 200 --out quantiles.csv
+    zero-sim sweep --lhs 64 alpha=0.1:0.5 delta=-30:-10
+    zero-sim benchmark --troves 100 10000 --hours 168 8760 --out bench.json
+
+`run` writes the recorded metrics of each run of the scenario to
+`<out>/<run>.csv` (or, with `--format parquet|arrow`, streams them to
+`<out>/<run>.parquet|.arrow` with the run metadata, see `results`), and with `--sketch` the hourly trove distributions to
+`<out>/<run>_sketch.npz` (see `sketches`); it never renders figures; pandas and the plotting
+libraries are not imported at all. With `--precision float32` the trove
+state and the metrics are kept in float32, and the run is checked against a
+float64 reference run unless `--no-check` is given (see `precision`); the
+command fails if the deviations exceed their tolerances, and refuses the
+scenarios with a policy known to fail them (`base-rate`, `compare`). With
+`--checkpoint` the state of the runs is saved periodically, and running the
+same command again resumes from the last checkpoint (see `checkpoint`).
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from .policies import BaseRatePolicy, FixedRatePolicy
+from .profiler import Profiler
+from .sketches import TroveSketch
+
+#runs of each scenario, simulated in lockstep
+SCENARIOS = {
+    'baseline': ('baseline',),
+    'base-rate': ('base_rate',),
+    'compare': ('baseline', 'base_rate'),
+}
+
+#policy class of each run
+POLICIES = {
+    'baseline': FixedRatePolicy,
+    'base_rate': BaseRatePolicy,
+}
+
+def _policy(model, name):
+    # fee policies built from the current module parameters
+    if name == 'baseline':
+        return model.FixedRatePolicy(model.rate_issuance, model.rate_redemption)
+    return model.BaseRatePolicy(0.98, 0.5, model.base_rate_initial, model.rate_issuance, model.rate_redemption)
+
+def run(args):
+    from . import macro_model
+
+    runs = SCENARIOS[args.scenario]
+    steps = args.steps if args.steps is not None else macro_model.n_sim
+    seed = args.seed if args.seed is not None else macro_model.seed
+    profiler = Profiler(enabled=args.profile is not None)
+    dtype = np.dtype(args.precision)
+    sketches = [TroveSketch(steps) for _ in runs] if args.sketch else None
+    sinks = None
+    if args.format != 'csv':
+        from .results import ResultSink, run_metadata
+        sinks = [ResultSink(os.path.join(args.out, f"{name}.{args.format}"),
+                            run_metadata(seed, steps, policy=name, scenario=args.scenario, precision=args.precision))
+                 for name in runs]
+    reports = None
+    start = time.perf_counter()
+    if dtype != np.float64 and args.check:
+        from .precision import check_accuracy
+        results, reports = check_accuracy(lambda: [_policy(macro_model, name) for name in runs], seed, steps, dtype,
+                                          profiler=profiler, sketches=sketches, checkpoint=args.checkpoint,
+                                          checkpoint_every=args.checkpoint_every, sinks=sinks)
+    else:
+        results = macro_model.simulate_policies([_policy(macro_model, name) for name in runs], seed, steps,
+                                                profiler=profiler, dtype=dtype, sketches=sketches,
+                                                checkpoint=args.checkpoint, checkpoint_every=args.checkpoint_every,
+                                                sinks=sinks)
+    elapsed = time.perf_counter() - start
+
+    os.makedirs(args.out, exist_ok=True)
+    for k, (name, (data, troves)) in enumerate(zip(runs, results)):
+        if sinks is None:
+            path = os.path.join(args.out, f"{name}.csv")
+            data.to_csv(path)
+        else:
+            path = sinks[k].path
+            sinks[k].close()
+        print(f"{name}: {len(data)} of {steps} steps, final ZUSD price {data['Price_ZUSD'][-1]:.4f}, "
+              f"{len(troves)} troves -> {path}")
+        if sketches is not None:
+            sketches[k].save(os.path.join(args.out, f"{name}_sketch.npz"))
+    print(f"simulated in {elapsed:.2f}s")
+    if args.profile is not None:
+        print(profiler.summary())
+        profiler.save(args.profile)
+    if reports is not None:
+        from .precision import format_report, passed
+        for name, report in zip(runs, reports):
+            print(f"{name}: {args.precision} against float64")
+            print(format_report(report))
+        if not all(passed(report) for report in reports):
+            print(f"{args.precision} run outside the accuracy tolerances", file=sys.stderr)
+            return 1
+    return 0
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(prog='zero-sim', description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="simulate one scenario and write its metrics")
+    run_parser.add_argument('--scenario', choices=SCENARIOS, default='baseline')
+    run_parser.add_argument('--steps', type=int, default=None, help="simulated hours (default: n_sim of the model)")
+    run_parser.add_argument('--seed', type=int, default=None)
+    run_parser.add_argument('--out', default='results', help="directory for the result files")
+    run_parser.add_argument('--profile', default=None, metavar='PATH',
+                            help="time the phases of each hour and write them to PATH (.json or .csv)")
+    run_parser.add_argument('--precision', choices=('float64', 'float32'), default='float64',
+                            help="dtype of the trove state and the recorded metrics; float32 only for the baseline scenario")
+    run_parser.add_argument('--no-check', dest='check', action='store_false',
+                            help="skip the float64 reference run of a float32 run")
+    run_parser.add_argument('--sketch', action='store_true',
+                            help="record the hourly trove distributions to <out>/<run>_sketch.npz")
+    run_parser.add_argument('--checkpoint', default=None, metavar='PATH',
+                            help="save the state of the runs to PATH, and resume from it if it exists")
+    run_parser.add_argument('--checkpoint-every', type=int, default=720, metavar='HOURS')
+    run_parser.add_argument('--format', choices=('csv', 'parquet', 'arrow'), default='csv',
+                            help="format of the result files; parquet and arrow are written as the runs advance")
+    commands.add_parser('ensemble', add_help=False, help="Monte Carlo ensemble over seeds")
+    commands.add_parser('sweep', add_help=False, help="parameter sweep")
+    commands.add_parser('benchmark', add_help=False, help="scaling benchmark")
+
+    # ensemble, sweep and benchmark keep their own options
+    if argv and argv[0] in ('ensemble', 'sweep', 'benchmark'):
+        if argv[0] == 'ensemble':
+            from .ensemble import main as command
+        elif argv[0] == 'sweep':
+            from .sweep import main as command
+        else:
+            from .benchmark import main as command
+        return command(argv[1:])
+
+    args = parser.parse_args(argv)
+    if args.precision != 'float64':
+        unsafe = [name for name in SCENARIOS[args.scenario] if not POLICIES[name].float32_safe]
+        if unsafe:
+            run_parser.error(f"--precision {args.precision}: the {', '.join(unsafe)} run fails the accuracy check "
+                             f"in {args.precision} (see macroModel.precision); run the {args.scenario} scenario in float64")
+    return run(args)
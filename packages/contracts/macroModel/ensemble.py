@@ -0,0 +1,148 @@
+"""Monte Carlo ensembles of the macro model.
+
+Runs the baseline simulation for many seeds in a process pool. Each worker
+runs whole simulations and sends back the hourly series of a few metrics
+together with a summary of the run; results are folded in as soon as a run
+finishes, and the ensemble is summarized by per-hour quantiles across runs.
+Runs that stop early (negative or undefined liquidity pool or ZUSD price)
+count as missing from the hour they stopped on.
+
+    python -m macroModel.ensemble --runs 200 [--steps 8640] [--workers 8] [--out quantiles.csv]
+    python -m macroModel.ensemble --runs 1000 --batched [--batch-seed 2019]
+
+`--batched` advances all runs together in one process with the batched
+kernel (see `batched`) instead of one simulation per seed. Its draws are
+laid out per batch, from `--batch-seed`, so its runs are numbered as paths
+of the batch rather than labelled with seeds, and `--first-seed` is
+rejected. With
+`--runs-dir DIR` every worker also streams all the metrics of its runs to
+`DIR/seed-<seed>.parquet`, with the run metadata (see `results`).
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+ENSEMBLE_METRICS = ("Price_ZUSD", "n_troves", "stability", "liquidity")
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+def run_summary(data):
+    """Scalar summary of one run, from its recorded metrics."""
+    price = data['Price_ZUSD']
+    return {
+        'steps': len(price),
+        'final_price_ZUSD': float(price[-1]),
+        'max_peg_deviation': float(np.abs(price - 1).max()),
+        'n_liquidate': int(data['n_liquidate'].sum()),
+        'n_redempt': int(data['n_redempt'].sum()),
+        'min_stability': float(data['stability'].min()),
+        'final_n_troves': int(data['n_troves'][-1]),
+    }
+
+def run_seed(seed, n_steps, metrics=ENSEMBLE_METRICS, runs_dir=None):
+    """Runs one simulation; returns its seed, summary and the hourly series of `metrics`."""
+    from . import macro_model
+    if runs_dir is None:
+        data, _ = macro_model.simulate(seed, n_steps)
+    else:
+        from .results import ResultSink, run_metadata
+        with ResultSink(os.path.join(runs_dir, f"seed-{seed}.parquet"), run_metadata(seed, n_steps)) as sink:
+            data, _ = macro_model.simulate(seed, n_steps, sink=sink)
+    return seed, run_summary(data), {name: data[name].astype(np.float64) for name in metrics}
+
+class EnsembleResult:
+    def __init__(self, seeds, n_steps, metrics=ENSEMBLE_METRICS, label='seed'):
+        """`seeds` identify the runs; `label` names them in the summary frame ('path' for the paths of a batch)."""
+        self.seeds = list(seeds)
+        self.label = label
+        self.n_steps = n_steps
+        self._row = {seed: row for row, seed in enumerate(self.seeds)}
+        self.paths = {name: np.full((len(self.seeds), n_steps), np.nan) for name in metrics}
+        self.summaries = {}
+
+    def add(self, seed, summary, series):
+        row = self._row[seed]
+        for name, values in series.items():
+            self.paths[name][row, :len(values)] = values
+        self.summaries[seed] = summary
+
+    def quantiles(self, q=QUANTILES):
+        """Per-hour quantiles across runs: metric -> array of shape (len(q), n_steps)."""
+        return {name: np.nanquantile(paths, q, axis=0) for name, paths in self.paths.items()}
+
+    def quantile_frame(self, q=QUANTILES):
+        import pandas as pd
+        columns = {(name, quantile): values[k]
+                   for name, values in self.quantiles(q).items() for k, quantile in enumerate(q)}
+        return pd.DataFrame(columns, index=pd.RangeIndex(self.n_steps, name='hour'))
+
+    def summary_frame(self):
+        import pandas as pd
+        return pd.DataFrame.from_dict(self.summaries, orient='index').rename_axis(self.label).sort_index()
+
+def run_ensemble(seeds, n_steps, workers=None, on_result=None, runs_dir=None):
+    """Runs one simulation per seed across `workers` processes (all cores by default).
+
+    `on_result(seed, summary)` is called in the parent as each run completes.
+    """
+    result = EnsembleResult(seeds, n_steps)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(run_seed, seed, n_steps, ENSEMBLE_METRICS, runs_dir) for seed in result.seeds]
+        for future in as_completed(futures):
+            seed, summary, series = future.result()
+            result.add(seed, summary, series)
+            if on_result is not None:
+                on_result(seed, summary)
+    return result
+
+def main(argv=None):
+    from . import macro_model
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=100)
+    parser.add_argument('--first-seed', type=int, default=None, help=f"seed of the first run (default {macro_model.seed})")
+    parser.add_argument('--steps', type=int, default=macro_model.n_sim)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default=None, help="csv file for the per-hour quantiles")
+    parser.add_argument('--batched', action='store_true', help="simulate all runs at once with the batched kernel")
+    parser.add_argument('--batch-seed', type=int, default=None, help=f"seed of the draws of --batched (default {macro_model.seed})")
+    parser.add_argument('--runs-dir', default=None, help="directory for the full metrics of each run, in Parquet")
+    args = parser.parse_args(argv)
+    if args.batched and args.first_seed is not None:
+        parser.error("--batched draws per batch, not per seed: use --batch-seed instead of --first-seed")
+    if not args.batched and args.batch_seed is not None:
+        parser.error("--batch-seed needs --batched")
+
+    first_seed = macro_model.seed if args.first_seed is None else args.first_seed
+    seeds = range(first_seed, first_seed + args.runs)
+    done = []
+    start = time.perf_counter()
+
+    def progress(seed, summary):
+        done.append(seed)
+        print(f"[{len(done)}/{args.runs}] seed {seed}: {summary['steps']} steps, "
+              f"final ZUSD price {summary['final_price_ZUSD']:.4f}, "
+              f"max peg deviation {summary['max_peg_deviation']:.4f}, "
+              f"{summary['n_liquidate']} liquidations")
+
+    if args.batched:
+        from .batched import simulate_batch
+        result = simulate_batch(args.runs, macro_model.seed if args.batch_seed is None else args.batch_seed, args.steps)
+    else:
+        result = run_ensemble(seeds, args.steps, args.workers, on_result=progress, runs_dir=args.runs_dir)
+    elapsed = time.perf_counter() - start
+    summaries = result.summary_frame()
+    print(f"{args.runs} runs in {elapsed:.1f}s ({summaries['steps'].sum() / elapsed:,.0f} steps/s)")
+
+    print(summaries.describe())
+    quantiles = result.quantile_frame()
+    if args.out:
+        quantiles.to_csv(args.out)
+    else:
+        print(quantiles.iloc[::max(1, args.steps // 12)])
+
+if __name__ == '__main__':
+    main()
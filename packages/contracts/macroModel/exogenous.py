@@ -0,0 +1,80 @@
+"""Exogenous paths of the simulations: ether price, natural rate and ZERO price.
+
+Each path is a geometric random walk
+
+    x[i] = x[i-1] * (1 + shock[i]) * (1 + drift[i]),   shock[i] ~ N(0, sd)
+
+built in one go from a block of normal draws and a cumulative product. The
+drift is either a constant or a schedule of `(end, drift)` phases, where each
+drift applies to the steps up to (excluding) `end`.
+
+Paths are cached as .npy files named after a hash of everything that defines
+them and are loaded memory-mapped, so repeated runs and parallel workers skip
+the generation and share the pages. The cache lives in `.cache` next to this
+file unless ZERO_SIM_CACHE points elsewhere; set it to an empty string to
+disable caching.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from .random_streams import RandomStreams
+
+# bump when the way paths are generated changes, so stale cache files are not reused
+PATH_VERSION = 1
+
+def cache_dir():
+    return os.environ.get('ZERO_SIM_CACHE', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'))
+
+def drift_schedule(drift, n_steps):
+    """Per-step drift for a constant `drift` or a list of `(end, drift)` phases."""
+    if np.isscalar(drift):
+        return np.full(n_steps, float(drift))
+    drifts = np.zeros(n_steps)
+    start = 1
+    for end, phase_drift in drift:
+        drifts[start:min(end, n_steps)] = phase_drift
+        start = end
+    return drifts
+
+def _build(n_steps, initial, sd, drift, seed, name):
+    shocks = RandomStreams(seed)(name, 0).normal(0, sd, n_steps - 1)
+    factors = (1 + shocks) * (1 + drift_schedule(drift, n_steps)[1:])
+    path = np.empty(n_steps)
+    path[0] = initial
+    np.cumprod(factors, out=path[1:])
+    path[1:] *= initial
+    return path
+
+def geometric_path(name, n_steps, initial, sd, drift, seed):
+    params = {
+        'name': name, 'n_steps': n_steps, 'initial': initial, 'sd': sd,
+        'drift': drift if np.isscalar(drift) else [list(phase) for phase in drift],
+        'seed': seed, 'version': PATH_VERSION,
+    }
+    directory = cache_dir()
+    if not directory:
+        return _build(n_steps, initial, sd, drift, seed, name)
+
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:20]
+    path_file = os.path.join(directory, f"{name}-{digest}.npy")
+    if not os.path.exists(path_file):
+        os.makedirs(directory, exist_ok=True)
+        # write under a temporary name first so concurrent workers never load a partial file
+        partial_file = f"{path_file}.{os.getpid()}.tmp"
+        with open(partial_file, 'wb') as f:
+            np.save(f, _build(n_steps, initial, sd, drift, seed, name))
+        os.replace(partial_file, path_file)
+    return np.load(path_file, mmap_mode='r')
+
+def ether_price_path(n_steps, initial, sd, drift, seed):
+    return geometric_path('price_ether', n_steps, initial, sd, drift, seed)
+
+def natural_rate_path(n_steps, initial, sd, seed):
+    return geometric_path('natural_rate', n_steps, initial, sd, 0, seed)
+
+def ZERO_price_path(n_steps, initial, sd, drift, seed):
+    return geometric_path('price_ZERO', n_steps, initial, sd, drift, seed)
@@ -0,0 +1,189 @@
+"""Per-trove kernels of the hourly step, on plain arrays.
+
+The parts of the step that walk the troves one by one -- finding the troves
+outside their inattention band, adjusting their debt or collateral, and the
+redemption walk over the riskiest troves -- are written twice: as explicit
+loops, compiled with Numba when it is installed, and as NumPy array
+expressions used otherwise. Both produce the same troves; sums may differ in
+the last bits because NumPy adds pairwise. The random draws stay outside the
+kernels, in the phase functions, so both backends consume the same streams.
+Sums are accumulated in float64 whatever the dtype of the trove columns.
+
+The backend is picked at import: Numba if available, unless the environment
+variable ZERO_SIM_KERNELS is set to `numpy`. `use(backend)` switches it at
+run time; `python` runs the loops uncompiled, which is only meant for tests.
+
+The arithmetic of the phases -- the troves opening and closing, the return
+and size of the stability pool, the clearing price of ZUSD and the
+arbitrage at its ceiling and floor, the ZERO price -- is written once below,
+with the model's parameters as arguments, and shared by `macro_model`, on
+the scalars of one run, and by `batched`, on arrays with one value per path.
+"""
+
+import os
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+HOURS_PER_YEAR = 24 * 365
+
+def band_check(CR_current, CR_initial, rational_inattention):
+    """Deviation of the CR from its target, in units of the inattention band: the trove acts below -1 or above 2."""
+    return (CR_current - CR_initial) / (CR_initial * rational_inattention)
+
+def outside_band(check):
+    return (check < -1) | (check > 2)
+
+def trove_supply(price_ether, ether_quantity, CR):
+    """Debt of a trove with `ether_quantity` of collateral at the ratio `CR`."""
+    return price_ether * ether_quantity / CR
+
+def trove_collateral(CR, supply, price_ether):
+    """Collateral of a trove with `supply` of debt at the ratio `CR`."""
+    return CR * supply / price_ether
+
+def liquidation_gain(ether_liquidated, debt_liquidated, price_ether, price_ZUSD):
+    """Gain of the stability pool from liquidations: the collateral taken over less the debt absorbed."""
+    return ether_liquidated * price_ether - debt_liquidated * price_ZUSD
+
+def stability_return(gains, hours, price_ZUSD, stability_pool):
+    """Annualized return of the stability pool from the liquidation and airdrop `gains` of the last `hours` hours."""
+    return (HOURS_PER_YEAR / hours) * gains / (price_ZUSD * stability_pool)
+
+def troves_to_close(shock, price_ZUSD_previous, n_troves, n_steady, beta):
+    """Troves closing in an hour, before rounding: a steady flow, plus a share of the troves while ZUSD is below the peg."""
+    number = np.maximum(0, n_steady * (1 + shock))
+    return number + np.where(price_ZUSD_previous < 1, beta * (1 - price_ZUSD_previous) * n_troves, 0)
+
+def troves_to_open(shock, price_ZUSD_previous, n_troves, rate_issuance, n_steady, alpha):
+    """Troves opening in an hour, before rounding: a steady flow, plus a share of the troves while ZUSD is above the issuance fee."""
+    number = np.maximum(0, n_steady * (1 + shock))
+    return number + np.where(price_ZUSD_previous > 1 + rate_issuance, alpha * (price_ZUSD_previous - rate_issuance - 1) * n_troves, 0)
+
+def stability_pool(stability_previous, drift, shock, return_previous, natural_rate, theta):
+    """Size of the stability pool, which grows with the excess of its return over the natural rate."""
+    return stability_previous * (drift + shock) * (1 + return_previous - natural_rate) ** theta
+
+def clearing_price(price_ZUSD_previous, liquidity, liquidity_expected, delta):
+    """ZUSD price at which the liquidity pool holds `liquidity`, `liquidity_expected` being the demand at the previous price."""
+    return price_ZUSD_previous * (liquidity / liquidity_expected) ** (1 / delta)
+
+def supply_at_price(price_ZUSD, price_ZUSD_previous, stability_pool, liquidity_expected, delta):
+    """ZUSD supply at which the market clears at `price_ZUSD`: the stability pool and the liquidity demanded at that price."""
+    return stability_pool + liquidity_expected * (price_ZUSD / price_ZUSD_previous) ** delta
+
+def floor_redemption(supply, supply_target, liquidity_pool, redemption_ratio, price_ZUSD_previous, liquidity_expected,
+                     rate_redemption, delta):
+    """Redemption pool and ZUSD price after the floor arbitrage.
+
+    The arbitrageurs redeem the supply down to `supply_target`, restoring
+    the floor price, if that takes less than `redemption_ratio` of the
+    liquidity pool; otherwise they redeem that share, at the price the
+    liquidity pool clears at.
+    """
+    supply_diff = supply - supply_target
+    partial = supply_diff < redemption_ratio * liquidity_pool
+    with np.errstate(invalid='ignore'):
+        price = np.where(partial, 1 - rate_redemption, clearing_price(price_ZUSD_previous, liquidity_pool, liquidity_expected, delta))
+    return np.where(partial, supply_diff, redemption_ratio * liquidity_pool), price
+
+def redeem_residual(ether_quantity, supply, CR_current, troves, residual, price_ether):
+    """Redeems `residual` of debt from the partially redeemed `troves`, an index of the columns."""
+    supply[troves] = supply[troves] - residual
+    ether_quantity[troves] = ether_quantity[troves] - residual / price_ether
+    CR_current[troves] = price_ether * ether_quantity[troves] / supply[troves]
+
+def ZERO_price(index, revenue, period, PE_ratio, total_supply):
+    """Annualized earning of the fee `revenue` of the last 30 days, and the ZERO price at `PE_ratio`, discounted by the age of the system."""
+    annualized_earning = 365 * revenue / 30
+    return annualized_earning, (index / period) * PE_ratio * annualized_earning / total_supply
+
+def _band_exits_numpy(CR_current, CR_initial, rational_inattention):
+    return np.flatnonzero(outside_band(band_check(CR_current, CR_initial, rational_inattention)))
+
+def _band_exits_loop(CR_current, CR_initial, rational_inattention):
+    exits = np.empty(len(CR_current), dtype=np.intp)
+    n = 0
+    for i in range(len(CR_current)):
+        check = (CR_current[i] - CR_initial[i]) / (CR_initial[i] * rational_inattention[i])
+        if check < -1 or check > 2:
+            exits[n] = i
+            n += 1
+    return exits[:n]
+
+def _adjust_numpy(ether_quantity, supply, CR_initial, CR_current, rational_inattention, adjusting, p, ratio, price_ether):
+    by_debt = adjusting[p >= ratio]
+    supply_new = trove_supply(price_ether, ether_quantity[by_debt], CR_initial[by_debt])
+    increased = band_check(CR_current[by_debt], CR_initial[by_debt], rational_inattention[by_debt]) > 2
+    issuance = (supply_new[increased] - supply[by_debt][increased]).sum(dtype=np.float64)
+    supply[by_debt] = supply_new
+    by_collateral = adjusting[p < ratio]
+    ether_quantity[by_collateral] = trove_collateral(CR_initial[by_collateral], supply[by_collateral], price_ether)
+    return issuance
+
+def _adjust_loop(ether_quantity, supply, CR_initial, CR_current, rational_inattention, adjusting, p, ratio, price_ether):
+    issuance = 0.0
+    for k in range(len(adjusting)):
+        i = adjusting[k]
+        if p[k] >= ratio:
+            supply_new = price_ether * ether_quantity[i] / CR_initial[i]
+            check = (CR_current[i] - CR_initial[i]) / (CR_initial[i] * rational_inattention[i])
+            if check > 2:
+                issuance += supply_new - supply[i]
+            supply[i] = supply_new
+        else:
+            ether_quantity[i] = CR_initial[i] * supply[i] / price_ether
+    return issuance
+
+def _redemption_walk_numpy(supply, slots, amount):
+    k = 64
+    while True:
+        cumulative = np.cumsum(supply[slots[:k]], dtype=np.float64)
+        n_redeemed = int(np.searchsorted(cumulative, amount, side='right'))
+        if n_redeemed < len(cumulative) or len(cumulative) == len(slots):
+            break
+        k *= 4
+    return n_redeemed, (cumulative[n_redeemed-1] if n_redeemed > 0 else 0.0)
+
+def _redemption_walk_loop(supply, slots, amount):
+    covered = 0.0
+    for k in range(len(slots)):
+        total = covered + supply[slots[k]]
+        if total > amount:
+            return k, covered
+        covered = total
+    return len(slots), covered
+
+_LOOPS = {'band_exits': _band_exits_loop, 'adjust': _adjust_loop, 'redemption_walk': _redemption_walk_loop}
+_NUMPY = {'band_exits': _band_exits_numpy, 'adjust': _adjust_numpy, 'redemption_walk': _redemption_walk_numpy}
+_compiled = None
+
+def backends():
+    """The backends that can run here."""
+    return ('numba', 'numpy', 'python') if numba is not None else ('numpy', 'python')
+
+def use(backend):
+    """Switches the kernels of this module to `backend`: 'numba', 'numpy' or 'python'."""
+    global _compiled, backend_name, band_exits, adjust, redemption_walk
+    if backend == 'numba':
+        if numba is None:
+            raise ImportError("the numba backend needs numba to be installed")
+        if _compiled is None:
+            _compiled = {name: numba.njit(cache=True)(function) for name, function in _LOOPS.items()}
+        kernels = _compiled
+    elif backend == 'numpy':
+        kernels = _NUMPY
+    elif backend == 'python':
+        kernels = _LOOPS
+    else:
+        raise ValueError(f"unknown kernel backend: {backend}")
+    backend_name = backend
+    band_exits = kernels['band_exits']
+    adjust = kernels['adjust']
+    redemption_walk = kernels['redemption_walk']
+
+use('numba' if numba is not None and os.environ.get('ZERO_SIM_KERNELS') != 'numpy' else 'numpy')
@@ -9,14 +9,19 @@ Original file is located at
 # Parameters and Initialization
 """
 
-import random
+import copy
+
 import numpy as np
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-import matplotlib.pyplot as plt
-import scipy.stats
-from plotly.subplots import make_subplots
+
+from . import checkpoint as checkpoints
+from . import kernels
+from .exogenous import ZERO_price_path, ether_price_path, natural_rate_path
+from .policies import BaseRatePolicy, FixedRatePolicy
+from .profiler import NULL_PROFILER, Profiler
+from .random_streams import RandomStreams
+from .recorder import Recorder, compact_metrics
+from .sketches import TroveSketch
+from .trove_store import TroveStore
 
 #policy functions
 rate_issuance = 0.01
@@ -30,13 +35,11 @@ day=24
 
 #ether price
 price_ether_initial = 1000
-price_ether = [price_ether_initial]
 sd_ether=0.02
 drift_ether = 0
 
 #ZERO price & airdrop
 price_ZERO_initial = 1
-price_ZERO = [price_ZERO_initial]
 sd_ZERO=0.005
 drift_ZERO = 0.0035
 #reduced for now. otherwise the initial return too high
@@ -49,7 +52,6 @@ PE_ratio = 50
 
 #natural rate
 natural_rate_initial = 0.2
-natural_rate = [natural_rate_initial]
 sd_natural_rate=0.002
 
 #stability pool
@@ -90,86 +92,86 @@ alpha = 0.3
 #number of runs in simulation
 n_sim= 8640
 
-"""# Exogenous Factors
-
-Ether Price
-"""
-
-#ether price
-for i in range(1, period):
-  random.seed(2019375+10000*i)
-  shock_ether = random.normalvariate(0,sd_ether)
-  price_ether.append(price_ether[i-1]*(1+shock_ether)*(1+drift_ether))
-
-"""Natural Rate"""
-
-#natural rate
-for i in range(1, period):
-  random.seed(201597+10*i)
-  shock_natural = random.normalvariate(0,sd_natural_rate)
-  natural_rate.append(natural_rate[i-1]*(1+shock_natural))
-
-"""ZERO Price - First Month"""
+#seed of the random streams of the exogenous paths, troves and markets
+seed = 2019
+
+#behavioural parameters a sweep may override; the others fix the clock, the horizon and the initial state
+sweepable = ("rate_issuance", "rate_redemption",
+             "sd_ether", "drift_ether", "sd_ZERO", "drift_ZERO", "quantity_ZERO_airdrop", "PE_ratio", "sd_natural_rate",
+             "sd_return", "sd_stability", "drift_stability", "theta",
+             "sd_liquidity", "sd_redemption", "drift_liquidity", "redemption_star", "delta",
+             "sd_closetroves", "beta",
+             "distribution_parameter1_ether_quantity", "distribution_parameter2_ether_quantity",
+             "distribution_parameter1_CR", "distribution_parameter2_CR", "distribution_parameter3_CR",
+             "distribution_parameter1_inattention", "distribution_parameter2_inattention",
+             "sd_opentroves", "n_steady", "alpha")
+
+"""# Exogenous Factors"""
+
+def exogenous_paths(seed, n_steps=period):
+  """Loads the exogenous paths of a run into the module globals read by the phases.
+
+  The paths cover at least a year, and `n_steps` hours for longer runs; a longer
+  path starts with the same hours as the one-year path.
+  Nothing is loaded at import time: the simulation entry points call this first.
+  """
+  global price_ether, natural_rate, price_ZERO
+  n_path = max(period, n_steps)
+  #ether price
+  price_ether = ether_price_path(n_path, price_ether_initial, sd_ether, drift_ether, seed)
+  #natural rate
+  natural_rate = natural_rate_path(n_path, natural_rate_initial, sd_natural_rate, seed)
+  #ZERO price - first month
+  price_ZERO = ZERO_price_path(month, price_ZERO_initial, sd_ZERO, drift_ZERO, seed)
 
-#ZERO price
-for i in range(1, month):
-  random.seed(2+13*i)
-  shock_ZERO = random.normalvariate(0,sd_ZERO)  
-  price_ZERO.append(price_ZERO[i-1]*(1+shock_ZERO)*(1+drift_ZERO))
 
 """# Troves
 
 Liquidate Troves
 """
 
-def liquidate_troves(troves, index, data):
-  troves['CR_current'] = troves['Ether_Price']*troves['Ether_Quantity']/troves['Supply']
+def liquidate_troves(troves, index, data, streams):
+  troves['CR_current'] = price_ether_current*troves['Ether_Quantity']/troves['Supply']
   price_ZUSD_previous = data.loc[index-1,'Price_ZUSD']
   price_ZERO_previous = data.loc[index-1,'price_ZERO']
   stability_pool_previous = data.loc[index-1, 'stability']
 
-  troves_liquidated = troves[troves.CR_current < 1.1]
-  troves = troves[troves.CR_current >= 1.1]
-  debt_liquidated = troves_liquidated['Supply'].sum()
-  ether_liquidated = troves_liquidated['Ether_Quantity'].sum()
-  n_liquidate = troves_liquidated.shape[0]
-  troves = troves.reset_index(drop = True)
+  troves_liquidated = troves.cr_index.liquidatable(price_ether_current)
+  debt_liquidated = troves['Supply'][troves_liquidated].sum(dtype=np.float64)
+  ether_liquidated = troves['Ether_Quantity'][troves_liquidated].sum(dtype=np.float64)
+  n_liquidate = len(troves_liquidated)
+  troves.remove(troves_liquidated)
 
-  liquidation_gain = ether_liquidated*price_ether_current - debt_liquidated*price_ZUSD_previous
+  liquidation_gain = kernels.liquidation_gain(ether_liquidated, debt_liquidated, price_ether_current, price_ZUSD_previous)
   airdrop_gain = price_ZERO_previous * quantity_ZERO_airdrop
   
-  np.random.seed(2+index)
-  shock_return = np.random.normal(0,sd_return)
+  shock_return = streams('return_stability', index).normal(0,sd_return)
   if index <= day:
    return_stability = initial_return*(1+shock_return)
   elif index<=month:
     #min function to rule out the large fluctuation caused by the large but temporary liquidation gain in a particular period
-    return_stability = min(0.5, 365*(data.loc[index-day:index, 'liquidation_gain'].sum()+data.loc[index-day:index, 'airdrop_gain'].sum())/(price_ZUSD_previous*stability_pool_previous))
+    return_stability = min(0.5, kernels.stability_return(data.window_sum('liquidation_gain', day, index)+data.window_sum('airdrop_gain', day, index), day, price_ZUSD_previous, stability_pool_previous))
   else:
-    return_stability = (365/30)*(data.loc[index-month:index, 'liquidation_gain'].sum()+data.loc[index-month:index, 'airdrop_gain'].sum())/(price_ZUSD_previous*stability_pool_previous)
+    return_stability = kernels.stability_return(data.window_sum('liquidation_gain', month, index)+data.window_sum('airdrop_gain', month, index), month, price_ZUSD_previous, stability_pool_previous)
   
   return[troves, return_stability, debt_liquidated, ether_liquidated, liquidation_gain, airdrop_gain, n_liquidate]
 
 """Close Troves"""
 
-def close_troves(troves, index2, price_ZUSD_previous):
-  np.random.seed(208+index2)
-  shock_closetroves = np.random.normal(0,sd_closetroves)
-  n_troves = troves.shape[0]
+def close_troves(troves, index2, price_ZUSD_previous, streams):
+  rng = streams('close_troves', index2)
+  shock_closetroves = rng.normal(0,sd_closetroves)
+  n_troves = len(troves)
 
   if index2 <= 240:
-    number_closetroves = np.random.uniform(0,1)
-  elif price_ZUSD_previous >=1:
-    number_closetroves = max(0, n_steady * (1+shock_closetroves))
+    number_closetroves = rng.uniform(0,1)
   else:
-    number_closetroves = max(0, n_steady * (1+shock_closetroves)) + beta*(1-price_ZUSD_previous)*n_troves
+    number_closetroves = kernels.troves_to_close(shock_closetroves, price_ZUSD_previous, n_troves, n_steady, beta)
   
   number_closetroves = int(round(number_closetroves))
   
-  random.seed(293+100*index2)
-  drops = list(random.sample(range(len(troves)), number_closetroves))
-  troves = troves.drop(drops)
-  troves = troves.reset_index(drop=True)
+  drops = rng.choice(len(troves), number_closetroves, replace=False)
+  troves.remove(drops)
   if len(troves) < number_closetroves:
     number_closetroves = -999
 
@@ -177,67 +179,50 @@ def close_troves(troves, index2, price_ZUSD_previous):
 
 """Adjust Troves"""
 
-def adjust_troves(troves, index):
-  issuance_ZUSD_adjust = 0
-  random.seed(57984-3*index)
-  ratio = random.uniform(0,1)
-  for i in range(0, troves.shape[0]):
-    random.seed(187*index + 3*i)
-    working_trove = troves.iloc[i,:]
-    p = random.uniform(0,1)
-    check = (working_trove['CR_current']-working_trove['CR_initial'])/(working_trove['CR_initial']*working_trove['Rational_inattention'])
-
-  #A part of the troves are adjusted by adjusting debt
-    if p >= ratio:
-      if check<-1:
-        working_trove['Supply'] = working_trove['Ether_Price']*working_trove['Ether_Quantity']/working_trove['CR_initial']
-      if check>2:
-        supply_new = working_trove['Ether_Price']*working_trove['Ether_Quantity']/working_trove['CR_initial']
-        issuance_ZUSD_adjust = issuance_ZUSD_adjust + rate_issuance * (supply_new - working_trove['Supply'])
-        working_trove['Supply'] = supply_new
-  #Another part of the troves are adjusted by adjusting collaterals
-    if p < ratio and (check < -1 or check > 2):
-      working_trove['Ether_Quantity'] = working_trove['CR_initial']*working_trove['Supply']/working_trove['Ether_Price']
-    
-    troves.loc[i] = working_trove
+def adjust_troves(troves, index, streams, rate_issuance):
+  rng = streams('adjust_troves', index)
+  ratio = rng.uniform(0,1)
+  columns = (troves['Ether_Quantity'], troves['Supply'], troves['CR_initial'], troves['CR_current'], troves['Rational_inattention'])
+
+  #Only the troves outside of their inattention band act, each drawing p in slot order
+  candidates = troves.band_index.triggered(troves, price_ether_current)
+  adjusting = candidates[kernels.band_exits(troves['CR_current'][candidates], troves['CR_initial'][candidates], troves['Rational_inattention'][candidates])]
+  p = rng.uniform(0,1,len(adjusting))
+
+  #A part of the troves are adjusted by adjusting debt (p >= ratio), another part by adjusting collaterals
+  issuance_ZUSD_adjust = rate_issuance * kernels.adjust(*columns, adjusting, p, ratio, price_ether_current)
+  troves.rekey(adjusting)
+
   return[troves, issuance_ZUSD_adjust]
 
 """Open Troves"""
 
-def open_troves(troves, index1, price_ZUSD_previous):
-  random.seed(2019*index1)  
+def new_troves(rng, size):
+  """Target CRs, ether quantities and inattention bands of `size` new troves."""
+  CR_ratios = distribution_parameter1_CR + distribution_parameter2_CR * rng.chisquare(df=distribution_parameter3_CR, size=size)
+  quantities_ether = rng.gamma(distribution_parameter1_ether_quantity, scale=distribution_parameter2_ether_quantity, size=size)
+  rational_inattentions = rng.gamma(distribution_parameter1_inattention, scale=distribution_parameter2_inattention, size=size)
+  return[CR_ratios, quantities_ether, rational_inattentions]
+
+def open_troves(troves, index1, price_ZUSD_previous, streams, rate_issuance):
+  rng = streams('open_troves', index1)
   issuance_ZUSD_open = 0
-  shock_opentroves = random.normalvariate(0,sd_opentroves)
-  n_troves = troves.shape[0]
+  shock_opentroves = rng.normal(0,sd_opentroves)
+  n_troves = len(troves)
 
   if index1<=0:
     number_opentroves = initial_open
-  elif price_ZUSD_previous <=1 + rate_issuance:
-    number_opentroves = max(0, n_steady * (1+shock_opentroves))
   else:
-    number_opentroves = max(0, n_steady * (1+shock_opentroves)) + alpha*(price_ZUSD_previous-rate_issuance-1)*n_troves
+    number_opentroves = kernels.troves_to_open(shock_opentroves, price_ZUSD_previous, n_troves, rate_issuance, n_steady, alpha)
   
   number_opentroves = int(round(float(number_opentroves)))
+  price_ether_current = price_ether[index1]
 
-  for i in range(0, number_opentroves):
-    price_ether_current = price_ether[index1]
-    
-    np.random.seed(2033 + index1 + i*i)
-    CR_ratio = distribution_parameter1_CR + distribution_parameter2_CR * np.random.chisquare(df=distribution_parameter3_CR)
-    
-    np.random.seed(20 + 10 * i + index1)
-    quantity_ether = np.random.gamma(distribution_parameter1_ether_quantity, scale=distribution_parameter2_ether_quantity)
-    
-    np.random.seed(209870- index1 + i*i)
-    rational_inattention = np.random.gamma(distribution_parameter1_inattention, scale=distribution_parameter2_inattention)
-    
-    supply_trove = price_ether_current * quantity_ether / CR_ratio
-    issuance_ZUSD_open = issuance_ZUSD_open + rate_issuance * supply_trove
-
-    new_row = {"Ether_Price": price_ether_current, "Ether_Quantity": quantity_ether, 
-               "CR_initial": CR_ratio, "Supply": supply_trove, 
-               "Rational_inattention": rational_inattention, "CR_current": CR_ratio}
-    troves = troves.append(new_row, ignore_index=True)
+  CR_ratios, quantities_ether, rational_inattentions = new_troves(rng, number_opentroves)
+  supply_troves = kernels.trove_supply(price_ether_current, quantities_ether, CR_ratios)
+  issuance_ZUSD_open = issuance_ZUSD_open + rate_issuance * supply_troves.sum()
+  troves.append(Ether_Quantity=quantities_ether, Supply=supply_troves, CR_initial=CR_ratios,
+                Rational_inattention=rational_inattentions, CR_current=CR_ratios)
 
   return[troves, number_opentroves, issuance_ZUSD_open]
 
@@ -246,51 +231,47 @@ def open_troves(troves, index1, price_ZUSD_previous):
 Stability Pool
 """
 
-def stability_update(stability_pool_previous, return_previous, index):
-  np.random.seed(27+3*index)
-  shock_stability = np.random.normal(0,sd_stability)
+def stability_update(stability_pool_previous, return_previous, index, streams):
+  shock_stability = streams('stability_update', index).normal(0,sd_stability)
   natural_rate_current = natural_rate[index]
-  if index <= month:
-    stability_pool = stability_pool_previous* (drift_stability+shock_stability)* (1+ return_previous- natural_rate_current)**theta
-  else:
-    stability_pool = stability_pool_previous* (1+shock_stability)* (1+ return_previous- natural_rate_current)**theta
+  drift = drift_stability if index <= month else 1
+  stability_pool = kernels.stability_pool(stability_pool_previous, drift, shock_stability, return_previous, natural_rate_current, theta)
   return[stability_pool]
 
 """ZUSD Price, liquidity pool, and redemption"""
 
-def price_stabilizer(troves, index, data, stability_pool, n_open):
+def price_stabilizer(troves, index, data, stability_pool, n_open, streams, rate_issuance, rate_redemption):
   issuance_ZUSD_stabilizer = 0
   redemption_fee = 0
   n_redempt = 0
   redempted = 0
   redemption_pool = 0  
 #Calculating Price
-  supply = troves['Supply'].sum()
-  np.random.seed(20*index)
-  shock_liquidity = np.random.normal(0,sd_liquidity)
-  liquidity_pool_previous = float(data['liquidity'][index-1])
-  price_ZUSD_previous = float(data['Price_ZUSD'][index-1])
-  price_ZUSD_current= price_ZUSD_previous*((supply-stability_pool)/(liquidity_pool_previous*(drift_liquidity+shock_liquidity)))**(1/delta)
-  
+  supply = troves['Supply'].sum(dtype=np.float64)
+  rng = streams('price_stabilizer', index)
+  shock_liquidity = rng.normal(0,sd_liquidity)
+  liquidity_pool_previous = float(data.loc[index-1,'liquidity'])
+  price_ZUSD_previous = float(data.loc[index-1,'Price_ZUSD'])
+  liquidity_expected = liquidity_pool_previous*(drift_liquidity+shock_liquidity)
 
 #Liquidity Pool
   liquidity_pool = supply-stability_pool
+  price_ZUSD_current = kernels.clearing_price(price_ZUSD_previous, liquidity_pool, liquidity_expected, delta)
 
 #Stabilizer
   #Ceiling Arbitrageurs
   if price_ZUSD_current > 1.1 + rate_issuance:
     #supply_current = sum(troves['Supply'])
-    supply_wanted=stability_pool+liquidity_pool_previous*(drift_liquidity+shock_liquidity)*((1.1+rate_issuance)/price_ZUSD_previous)**delta
+    supply_wanted = kernels.supply_at_price(1.1+rate_issuance, price_ZUSD_previous, stability_pool, liquidity_expected, delta)
     supply_trove = supply_wanted - supply
 
     CR_ratio = 1.1
     rational_inattention = 0.1
-    quantity_ether = supply_trove * CR_ratio / price_ether_current
+    quantity_ether = kernels.trove_collateral(CR_ratio, supply_trove, price_ether_current)
     issuance_ZUSD_stabilizer = rate_issuance * supply_trove
 
-    new_row = {"Ether_Price": price_ether_current, "Ether_Quantity": quantity_ether, "CR_initial": CR_ratio,
-               "Supply": supply_trove, "Rational_inattention": rational_inattention, "CR_current": CR_ratio}
-    troves = troves.append(new_row, ignore_index=True)
+    troves.append(Ether_Quantity=quantity_ether, Supply=supply_trove, CR_initial=CR_ratio,
+                  Rational_inattention=rational_inattention, CR_current=CR_ratio)
     price_ZUSD_current = 1.1 + rate_issuance
     #missing in the previous version  
     liquidity_pool = supply_wanted-stability_pool
@@ -299,96 +280,98 @@ def price_stabilizer(troves, index, data, stability_pool, n_open):
 
   #Floor Arbitrageurs
   if price_ZUSD_current < 1 - rate_redemption:
-    np.random.seed(30*index)
-    shock_redemption = np.random.normal(0,sd_redemption)
+    shock_redemption = rng.normal(0,sd_redemption)
     redemption_ratio = redemption_star * (1+shock_redemption)
 
     #supply_current = sum(troves['Supply'])
-    supply_target=stability_pool+liquidity_pool_previous*(drift_liquidity+shock_liquidity)*((1-rate_redemption)/price_ZUSD_previous)**delta
-    supply_diff = supply - supply_target
-    if supply_diff < redemption_ratio * liquidity_pool:
-      redemption_pool=supply_diff
-      #liquidity_pool = liquidity_pool - redemption_pool
-      price_ZUSD_current = 1 - rate_redemption
-    else:
-      redemption_pool=redemption_ratio * liquidity_pool
-      #liquidity_pool = (1-redemption_ratio)*liquidity_pool
-      price_ZUSD_current= price_ZUSD_previous * (liquidity_pool/(liquidity_pool_previous*(drift_liquidity+shock_liquidity)))**(1/delta)
+    supply_target = kernels.supply_at_price(1-rate_redemption, price_ZUSD_previous, stability_pool, liquidity_expected, delta)
+    #the liquidity pool is not reduced by the redemption
+    redemption_pool, price_ZUSD_current = kernels.floor_redemption(supply, supply_target, liquidity_pool, redemption_ratio,
+                                                                   price_ZUSD_previous, liquidity_expected, rate_redemption, delta)
+    redemption_pool, price_ZUSD_current = float(redemption_pool), float(price_ZUSD_current)
     
     #Shutting down the riskiest troves
-    troves = troves.sort_values(by='CR_current', ascending = True)
-    quantity_working_trove = troves['Supply'][troves.index[0]]
-    redempted = quantity_working_trove
-    while redempted <= redemption_pool:
-      troves = troves.drop(troves.index[0])
-      quantity_working_trove = troves['Supply'][troves.index[0]]
-      redempted = redempted + quantity_working_trove
-      n_redempt = n_redempt + 1
+    troves_redempted, wk, residual = troves.cr_index.redemption(troves, redemption_pool)
+    n_redempt = len(troves_redempted)
     
     #Residuals
-    redempted = redempted - quantity_working_trove
-    residual = redemption_pool - redempted
-    wk = troves.index[0]
-    troves['Supply'][wk] = troves['Supply'][wk] - residual
-    troves['Ether_Quantity'][wk] = troves['Ether_Quantity'][wk] - residual/price_ether_current
-    troves['CR_current'][wk] = price_ether_current * troves['Ether_Quantity'][wk] / troves['Supply'][wk]
+    if wk is not None:
+      kernels.redeem_residual(troves['Ether_Quantity'], troves['Supply'], troves['CR_current'], wk, residual, price_ether_current)
+      troves.rekey([wk])
+    troves.remove(troves_redempted)
 
     #Redemption Fee
     redemption_fee = rate_redemption * redemption_pool
     
 
-  troves = troves.reset_index(drop=True)
   return[price_ZUSD_current, liquidity_pool, troves, issuance_ZUSD_stabilizer, redemption_fee, n_redempt, redemption_pool, n_open]
 
 """# ZERO Market"""
 
 
-
-def ZERO_market(index, data):
+def ZERO_market(index, data, streams):
   quantity_ZERO = (100000000/3)*(1-0.5**(index/period))
-  np.random.seed(2+3*index)
   if index <= month: 
     price_ZERO_current = price_ZERO[index-1]
-    annualized_earning = (index/month)**0.5*np.random.normal(200000000,500000)
+    annualized_earning = (index/month)**0.5*streams('ZERO_market', index).normal(200000000,500000)
   else:
-    revenue_issuance = data.loc[index-month:index, 'issuance_fee'].sum()
-    revenue_redemption = data.loc[index-month:index, 'redemption_fee'].sum()
-    annualized_earning = 365*(revenue_issuance+revenue_redemption)/30
-    #discountin factor to factor in the risk in early days
-    discount=index/period
-    price_ZERO_current = discount*PE_ratio*annualized_earning/ZERO_total_supply
+    revenue_issuance = data.window_sum('issuance_fee', month, index)
+    revenue_redemption = data.window_sum('redemption_fee', month, index)
+    #discounted by index/period to factor in the risk in early days
+    annualized_earning, price_ZERO_current = kernels.ZERO_price(index, revenue_issuance+revenue_redemption, period, PE_ratio, ZERO_total_supply)
   
   MC_ZERO_current = price_ZERO_current * quantity_ZERO
   return[price_ZERO_current, annualized_earning, MC_ZERO_current]
 
 """# Simulation Program"""
 
+#Recorded metrics and their types
+metrics = {"Price_ZUSD":np.float64, "Price_Ether":np.float64, "n_open":np.int64, "n_close":np.int64, "n_liquidate":np.int64, "n_redempt":np.int64,
+           "n_troves":np.int64, "stability":np.float64, "liquidity":np.float64, "redemption_pool":np.float64,
+           "supply_ZUSD":np.float64, "return_stability":np.float64, "airdrop_gain":np.float64, "liquidation_gain":np.float64, "issuance_fee":np.float64, "redemption_fee":np.float64,
+           "price_ZERO":np.float64, "MC_ZERO":np.float64, "annualized_earning":np.float64}
+
 #Defining Initials
-initials = {"Price_ZUSD":[1.00], "Price_Ether":[price_ether_initial], "n_open":[initial_open], "n_close":[0], "n_liquidate": [0], "n_redempt":[0], 
-            "n_troves":[initial_open], "stability":[0], "liquidity":[0], "redemption_pool":[0],
-            "supply_ZUSD":[0],  "return_stability":[initial_return], "airdrop_gain":[0], "liquidation_gain":[0],  "issuance_fee":[0], "redemption_fee":[0],
-            "price_ZERO":[price_ZERO_initial], "MC_ZERO":[0], "annualized_earning":[0]}
-data = pd.DataFrame(initials)
-troves= pd.DataFrame({"Ether_Price":[], "Ether_Quantity":[], "CR_initial":[], 
-              "Supply":[], "Rational_inattention":[], "CR_current":[]})
-result_open = open_troves(troves, 0, data['Price_ZUSD'][0])
-troves = result_open[0]
-issuance_ZUSD_open = result_open[2]
-data.loc[0,'issuance_fee'] = issuance_ZUSD_open * initials["Price_ZUSD"][0]
-data.loc[0,'supply_ZUSD'] = troves["Supply"].sum()
-data.loc[0,'liquidity'] = 0.5*troves["Supply"].sum()
-data.loc[0,'stability'] = 0.5*troves["Supply"].sum()
-
-#Simulation Process
-for index in range(1, n_sim):
-#exogenous ether price input
-  price_ether_current = price_ether[index]
-  troves['Ether_Price'] = price_ether_current
+initials = {"Price_ZUSD":1.00, "Price_Ether":price_ether_initial, "n_open":initial_open, "n_close":0, "n_liquidate": 0, "n_redempt":0, 
+            "n_troves":initial_open, "stability":0, "liquidity":0, "redemption_pool":0,
+            "supply_ZUSD":0,  "return_stability":initial_return, "airdrop_gain":0, "liquidation_gain":0,  "issuance_fee":0, "redemption_fee":0,
+            "price_ZERO":price_ZERO_initial, "MC_ZERO":0, "annualized_earning":0}
+
+def start_run(policy, n_steps, streams, dtype=np.float64):
+  """Records hour 0 of a run: the initial troves and pools.
+
+  With a `dtype` other than float64 the trove columns and the recorded metrics
+  are stored compactly; the last month of recorded values, which the phases
+  read back, and all sums stay in float64.
+  """
+  if np.dtype(dtype) == np.float64:
+    data = Recorder(n_steps, {**metrics, **policy.metrics})
+  else:
+    data = Recorder(n_steps, compact_metrics({**metrics, **policy.metrics}, dtype), exact_rows=month+1)
+  data.record(0, {**initials, **policy.initials})
+  troves = TroveStore(dtype=dtype)
+  result_open = open_troves(troves, 0, data.loc[0,'Price_ZUSD'], streams, policy.rate_issuance)
+  troves = result_open[0]
+  issuance_ZUSD_open = result_open[2]
+  data.loc[0,'issuance_fee'] = issuance_ZUSD_open * initials["Price_ZUSD"]
+  data.loc[0,'supply_ZUSD'] = troves["Supply"].sum(dtype=np.float64)
+  data.loc[0,'liquidity'] = 0.5*troves["Supply"].sum(dtype=np.float64)
+  data.loc[0,'stability'] = 0.5*troves["Supply"].sum(dtype=np.float64)
+  return[data, troves]
+
+def simulation_step(index, data, troves, policy, streams, profiler=NULL_PROFILER):
+  """Simulates hour `index` of a run; returns False if the run ends before recording it."""
   price_ZUSD_previous = data.loc[index-1,'Price_ZUSD']
-  price_ZERO_previous = data.loc[index-1,'price_ZERO']
+
+#policy function determines the fee rates
+  with profiler.phase('policy'):
+    policy_row = policy.update(index, data, troves)
+  rate_issuance = policy.rate_issuance
+  rate_redemption = policy.rate_redemption
 
 #trove liquidation & return of stability pool
-  result_liquidation = liquidate_troves(troves, index, data)
+  with profiler.phase('liquidate_troves'):
+    result_liquidation = liquidate_troves(troves, index, data, streams)
   troves = result_liquidation[0]
   return_stability = result_liquidation[1]
   debt_liquidated = result_liquidation[2]
@@ -398,28 +381,33 @@ for index in range(1, n_sim):
   n_liquidate = result_liquidation[6]
 
 #close troves
-  result_close = close_troves(troves, index, price_ZUSD_previous)
+  with profiler.phase('close_troves'):
+    result_close = close_troves(troves, index, price_ZUSD_previous, streams)
   troves = result_close[0]
   n_close = result_close[1]
   #if n_close<0:
   #  break
 
 #adjust troves
-  result_adjustment = adjust_troves(troves, index)
+  with profiler.phase('adjust_troves'):
+    result_adjustment = adjust_troves(troves, index, streams, rate_issuance)
   troves = result_adjustment[0]
   issuance_ZUSD_adjust = result_adjustment[1]
 
 #open troves
-  result_open = open_troves(troves, index, price_ZUSD_previous)
+  with profiler.phase('open_troves'):
+    result_open = open_troves(troves, index, price_ZUSD_previous, streams, rate_issuance)
   troves = result_open[0]
   n_open = result_open[1]  
   issuance_ZUSD_open = result_open[2]
 
 #Stability Pool
-  stability_pool = stability_update(data.loc[index-1,'stability'], return_stability, index)[0]
+  with profiler.phase('stability_update'):
+    stability_pool = stability_update(data.loc[index-1,'stability'], return_stability, index, streams)[0]
 
 #Calculating Price, Liquidity Pool, and Redemption
-  result_price = price_stabilizer(troves, index, data, stability_pool, n_open)
+  with profiler.phase('price_stabilizer'):
+    result_price = price_stabilizer(troves, index, data, stability_pool, n_open, streams, rate_issuance, rate_redemption)
   price_ZUSD_current = result_price[0]
   liquidity_pool = result_price[1]
   troves = result_price[2]
@@ -428,580 +416,143 @@ for index in range(1, n_sim):
   n_redempt = result_price[5]
   redemption_pool = result_price[6]
   n_open=result_price[7]
-  if liquidity_pool<0:
-    break
-
-#ZERO Market
-  result_ZERO = ZERO_market(index, data)
-  price_ZERO_current = result_ZERO[0]
-  annualized_earning = result_ZERO[1]
-  MC_ZERO_current = result_ZERO[2]
-
-#Summary
-  issuance_fee = price_ZUSD_current * (issuance_ZUSD_adjust + issuance_ZUSD_open + issuance_ZUSD_stabilizer)
-  n_troves = troves.shape[0]
-  supply_ZUSD = troves['Supply'].sum()
-  if index >= month:
-    price_ZERO.append(price_ZERO_current)
-
-  new_row = {"Price_ZUSD":float(price_ZUSD_current), "Price_Ether":float(price_ether_current), "n_open":float(n_open), "n_close":float(n_close), 
-             "n_liquidate":float(n_liquidate), "n_redempt": float(n_redempt), "n_troves":float(n_troves),
-              "stability":float(stability_pool), "liquidity":float(liquidity_pool), "redemption_pool":float(redemption_pool), "supply_ZUSD":float(supply_ZUSD),
-             "issuance_fee":float(issuance_fee), "redemption_fee":float(redemption_fee),
-             "airdrop_gain":float(airdrop_gain), "liquidation_gain":float(liquidation_gain), "return_stability":float(return_stability), 
-             "annualized_earning":float(annualized_earning), "MC_ZERO":float(MC_ZERO_current), "price_ZERO":float(price_ZERO_current)
-             }
-  data = data.append(new_row, ignore_index=True)
-  if price_ZUSD_current < 0:
-    break
-
-"""#**Exhibition**"""
-
-data
-
-def linevis(data, measure):
-  fig = px.line(data, x=data.index/720, y=measure, title= measure+' dynamics')
-  fig.show()
-
-fig = make_subplots(specs=[[{"secondary_y": True}]])
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['Price_ZUSD'], name="ZUSD Price"),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['Price_Ether'], name="Ether Price"),
-    secondary_y=True,
-)
-fig.update_layout(
-    title_text="Price Dynamics of ZUSD and Ether"
-)
-fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
-fig.update_yaxes(title_text="ZUSD Price", secondary_y=False)
-fig.update_yaxes(title_text="Ether Price", secondary_y=True)
-fig.show()
-
-fig = make_subplots(specs=[[{"secondary_y": True}]])
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['n_troves'], name="Number of Troves"),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['supply_ZUSD'], name="ZUSD Supply"),
-    secondary_y=True,
-)
-fig.update_layout(
-    title_text="Dynamics of Trove Numbers and ZUSD Supply"
-)
-fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
-fig.update_yaxes(title_text="Number of Troves", secondary_y=False)
-fig.update_yaxes(title_text="ZUSD Supply", secondary_y=True)
-fig.show()
-
-fig = make_subplots(rows=2, cols=1)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['n_open'], name="Number of Troves Opened", mode='markers'),
-    row=1, col=1, secondary_y=False
-)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['n_close'], name="Number of Troves Closed", mode='markers'),
-    row=2, col=1, secondary_y=False
-)
-fig.update_layout(
-    title_text="Dynamics of Number of Troves Opened and Closed"
-)
-fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
-fig.update_yaxes(title_text="Troves Opened", row=1, col=1)
-fig.update_yaxes(title_text="Troves Closed", row=2, col=1)
-fig.show()
-
-fig = make_subplots(specs=[[{"secondary_y": True}]])
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['n_liquidate'], name="Number of Liquidated Troves", mode='markers'),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['n_redempt'], name="Number of Redempted Troves", mode='markers'),
-    secondary_y=False,
-)
-fig.update_layout(
-    title_text="Dynamics of Number of Liquidated and Redempted Troves"
-)
-fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
-fig.update_yaxes(title_text="Number of Liquidated Troves", secondary_y=False)
-fig.update_yaxes(title_text="Number of Redempted Troves", secondary_y=True)
-fig.show()
-
-fig = make_subplots(specs=[[{"secondary_y": True}]])
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['liquidity'], name="Liquidity Pool"),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['stability'], name="Stability Pool"),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=100*data['redemption_pool'], name="100*Redemption Pool"),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['return_stability'], name="Return of Stability Pool"),
-    secondary_y=True,
-)
-fig.update_layout(
-    title_text="Dynamics of Liquidity, Stability, Redemption Pools and Return of Stability Pool"
-)
-fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
-fig.update_yaxes(title_text="Size of Pools", secondary_y=False)
-fig.update_yaxes(title_text="Return", secondary_y=True)
-fig.show()
-
-fig = make_subplots(specs=[[{"secondary_y": True}]])
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['airdrop_gain'], name="Airdrop Gain"),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['liquidation_gain'], name="Liquidation Gain"),
-    secondary_y=True,
-)
-fig.update_layout(
-    title_text="Dynamics of Airdrop and Liquidation Gain"
-)
-fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
-fig.update_yaxes(title_text="Airdrop Gain", secondary_y=False)
-fig.update_yaxes(title_text="Liquidation Gain", secondary_y=True)
-fig.show()
-
-fig = make_subplots(specs=[[{"secondary_y": True}]])
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['issuance_fee'], name="Issuance Fee"),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['redemption_fee'], name="Redemption Fee"),
-    secondary_y=True,
-)
-fig.update_layout(
-    title_text="Dynamics of Issuance Fee and Redemption Fee"
-)
-fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
-fig.update_yaxes(title_text="Issuance Fee", secondary_y=False)
-fig.update_yaxes(title_text="Redemption Fee", secondary_y=True)
-fig.show()
-
-#linevis(data, 'annualized_earning')
-
-fig = make_subplots(specs=[[{"secondary_y": True}]])
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['price_ZERO'], name="ZERO Price"),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['MC_ZERO'], name="ZERO Market Cap"),
-    secondary_y=True,
-)
-fig.update_layout(
-    title_text="Dynamics of the Price and Market Cap of ZERO"
-)
-fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
-fig.update_yaxes(title_text="ZERO Price", secondary_y=False)
-fig.update_yaxes(title_text="ZERO Market Cap", secondary_y=True)
-fig.show()
-
-def trove_histogram(measure):
-  fig = px.histogram(troves, x=measure, title='Distribution of '+measure, nbins=25)
-  fig.show()
-
-troves
-
-trove_histogram('Ether_Quantity')
-trove_histogram('CR_initial')
-trove_histogram('Supply')
-trove_histogram('Rational_inattention')
-trove_histogram('CR_current')
-
-import matplotlib.pyplot as plt
-plt.plot(troves["Ether_Quantity"])
-plt.show()
-
-plt.plot(troves["CR_initial"])
-plt.show()
-
-plt.plot(troves["Supply"])
-plt.show()
-
-plt.plot(troves["CR_current"])
-plt.show()
-
-data.describe()
-
-"""new policy function
-
-issuance fee = redemption fee = base rate
-
-#**Simulation with Policy Function**
-"""
-
-#Defining Initials
-initials = {"Price_ZUSD":[1.00], "Price_Ether":[price_ether_initial], "n_open":[initial_open], "n_close":[0], "n_liquidate": [0], "n_redempt":[0], 
-            "n_troves":[initial_open], "stability":[0], "liquidity":[0], "redemption_pool":[0],
-            "supply_ZUSD":[0],  "return_stability":[initial_return], "airdrop_gain":[0], "liquidation_gain":[0],  "issuance_fee":[0], "redemption_fee":[0],
-            "price_ZERO":[price_ZERO_initial], "MC_ZERO":[0], "annualized_earning":[0], "base_rate":[base_rate_initial]}
-data2 = pd.DataFrame(initials)
-troves2= pd.DataFrame({"Ether_Price":[], "Ether_Quantity":[], "CR_initial":[], 
-              "Supply":[], "Rational_inattention":[], "CR_current":[]})
-result_open = open_troves(troves2, 0, data2['Price_ZUSD'][0])
-troves2 = result_open[0]
-issuance_ZUSD_open = result_open[2]
-data2.loc[0,'issuance_fee'] = issuance_ZUSD_open * initials["Price_ZUSD"][0]
-data2.loc[0,'supply_ZUSD'] = troves2["Supply"].sum()
-data2.loc[0,'liquidity'] = 0.5*troves2["Supply"].sum()
-data2.loc[0,'stability'] = 0.5*troves2["Supply"].sum()
-
-#Simulation Process
-for index in range(1, n_sim):
-#exogenous ether price input
-  price_ether_current = price_ether[index]
-  troves2['Ether_Price'] = price_ether_current
-  price_ZUSD_previous = data2.loc[index-1,'Price_ZUSD']
-  price_ZERO_previous = data2.loc[index-1,'price_ZERO']
-
-#policy function determines base rate
-  base_rate_current = 0.98 * data2.loc[index-1,'base_rate'] + 0.5*(data2.loc[index-1,'redemption_pool']/troves2['Supply'].sum())
-  rate_issuance = base_rate_current
-  rate_redemption = base_rate_current
-
-#trove liquidation & return of stability pool
-  result_liquidation = liquidate_troves(troves2, index, data2)
-  troves2 = result_liquidation[0]
-  return_stability = result_liquidation[1]
-  debt_liquidated = result_liquidation[2]
-  ether_liquidated = result_liquidation[3]
-  liquidation_gain = result_liquidation[4]
-  airdrop_gain = result_liquidation[5]
-  n_liquidate = result_liquidation[6]
-
-#close troves
-  result_close = close_troves(troves2, index, price_ZUSD_previous)
-  troves2 = result_close[0]
-  n_close = result_close[1]
-  #if n_close<0:
-  #  break
-
-#adjust troves
-  result_adjustment = adjust_troves(troves2, index)
-  troves2 = result_adjustment[0]
-  issuance_ZUSD_adjust = result_adjustment[1]
-
-#open troves
-  result_open = open_troves(troves2, index, price_ZUSD_previous)
-  troves2 = result_open[0]
-  n_open = result_open[1]  
-  issuance_ZUSD_open = result_open[2]
-
-#Stability Pool
-  stability_pool = stability_update(data2.loc[index-1,'stability'], return_stability, index)[0]
-
-#Calculating Price, Liquidity Pool, and Redemption
-  result_price = price_stabilizer(troves2, index, data2, stability_pool, n_open)
-  price_ZUSD_current = result_price[0]
-  liquidity_pool = result_price[1]
-  troves2 = result_price[2]
-  issuance_ZUSD_stabilizer = result_price[3]
-  redemption_fee = result_price[4]
-  n_redempt = result_price[5]
-  redemption_pool = result_price[6]
-  n_open=result_price[7]
-  if liquidity_pool<0:
-    break
+  #negative or undefined (NaN) pools end the run
+  if not liquidity_pool>=0:
+    return False
 
 #ZERO Market
-  result_ZERO = ZERO_market(index, data2)
+  with profiler.phase('ZERO_market'):
+    result_ZERO = ZERO_market(index, data, streams)
   price_ZERO_current = result_ZERO[0]
   annualized_earning = result_ZERO[1]
   MC_ZERO_current = result_ZERO[2]
 
 #Summary
   issuance_fee = price_ZUSD_current * (issuance_ZUSD_adjust + issuance_ZUSD_open + issuance_ZUSD_stabilizer)
-  n_troves = troves2.shape[0]
-  supply_ZUSD = troves2['Supply'].sum()
-  if index >= month:
-    price_ZERO.append(price_ZERO_current)
-
-  new_row = {"Price_ZUSD":float(price_ZUSD_current), "Price_Ether":float(price_ether_current), "n_open":float(n_open), "n_close":float(n_close), 
-             "n_liquidate":float(n_liquidate), "n_redempt": float(n_redempt), "n_troves":float(n_troves),
-              "stability":float(stability_pool), "liquidity":float(liquidity_pool), "redemption_pool":float(redemption_pool), "supply_ZUSD":float(supply_ZUSD),
-             "issuance_fee":float(issuance_fee), "redemption_fee":float(redemption_fee),
-             "airdrop_gain":float(airdrop_gain), "liquidation_gain":float(liquidation_gain), "return_stability":float(return_stability), 
-             "annualized_earning":float(annualized_earning), "MC_ZERO":float(MC_ZERO_current), "price_ZERO":float(price_ZERO_current), 
-             "base_rate":float(base_rate_current)}
-  data2 = data2.append(new_row, ignore_index=True)
-  if price_ZUSD_current < 0:
-    break
-
-data2
-
-"""#**Exhibition Part 2**"""
-
-fig = make_subplots(specs=[[{"secondary_y": True}]])
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['Price_ZUSD'], name="ZUSD Price"),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['Price_Ether'], name="Ether Price"),
-    secondary_y=True,
-)
-fig.add_trace(
-    go.Scatter(x=data2.index/720, y=data2['Price_ZUSD'], name="ZUSD Price New", line = dict(dash='dot')),
-    secondary_y=False,
-)
-fig.update_layout(
-    title_text="Price Dynamics of ZUSD and Ether"
-)
-fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
-fig.update_yaxes(title_text="ZUSD Price", secondary_y=False)
-fig.update_yaxes(title_text="Ether Price", secondary_y=True)
-fig.show()
-
-fig = make_subplots(specs=[[{"secondary_y": True}]])
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['n_troves'], name="Number of Troves"),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['supply_ZUSD'], name="ZUSD Supply"),
-    secondary_y=True,
-)
-fig.add_trace(
-    go.Scatter(x=data2.index/720, y=data2['n_troves'], name="Number of Troves New", line = dict(dash='dot')),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data2.index/720, y=data2['supply_ZUSD'], name="ZUSD Supply New", line = dict(dash='dot')),
-    secondary_y=True,
-)
-fig.update_layout(
-    title_text="Dynamics of Trove Numbers and ZUSD Supply"
-)
-fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
-fig.update_yaxes(title_text="Number of Troves", secondary_y=False)
-fig.update_yaxes(title_text="ZUSD Supply", secondary_y=True)
-fig.show()
-
-fig = make_subplots(rows=2, cols=2)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['n_open'], name="Number of Troves Opened", mode='markers'),
-    row=1, col=1, secondary_y=False
-)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['n_close'], name="Number of Troves Closed", mode='markers'),
-    row=2, col=1, secondary_y=False
-)
-fig.add_trace(
-    go.Scatter(x=data2.index/720, y=data2['n_open'], name="Number of Troves Opened New", mode='markers'),
-    row=1, col=2, secondary_y=False
-)
-fig.add_trace(
-    go.Scatter(x=data2.index/720, y=data2['n_close'], name="Number of Troves Closed New", mode='markers'),
-    row=2, col=2, secondary_y=False
-)
-fig.update_layout(
-    title_text="Dynamics of Number of Troves Opened and Closed"
-)
-fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
-fig.update_yaxes(title_text="Troves Opened", row=1, col=1)
-fig.update_yaxes(title_text="Troves Closed", row=2, col=1)
-fig.show()
-
-fig = make_subplots(rows=2, cols=1)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['n_liquidate'], name="Number of Liquidated Troves"),
-    row=1, col=1, secondary_y=False
-)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['n_redempt'], name="Number of Redempted Troves"),
-    row=2, col=1, secondary_y=False
-)
-fig.add_trace(
-    go.Scatter(x=data2.index/720, y=data2['n_liquidate'], name="Number of Liquidated Troves New", line = dict(dash='dot')),
-    row=1, col=1, secondary_y=False
-)
-fig.add_trace(
-    go.Scatter(x=data2.index/720, y=data2['n_redempt'], name="Number of Redempted Troves New", line = dict(dash='dot')),
-    row=2, col=1, secondary_y=False
-)
-fig.update_layout(
-    title_text="Dynamics of Number of Liquidated and Redempted Troves"
-)
-fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
-fig.update_yaxes(title_text="Troves Liquidated", row=1, col=1)
-fig.update_yaxes(title_text="Troves Redempted", row=2, col=1)
-fig.show()
-
-fig = make_subplots(specs=[[{"secondary_y": True}]])
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['liquidity'], name="Liquidity Pool"),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['stability'], name="Stability Pool"),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=100*data['redemption_pool'], name="100*Redemption Pool"),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data2.index/720, y=data2['liquidity'], name="Liquidity Pool New", line = dict(dash='dot')),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data2.index/720, y=data2['stability'], name="Stability Pool New", line = dict(dash='dot')),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data2.index/720, y=100*data2['redemption_pool'], name="100*Redemption Pool New", line = dict(dash='dot')),
-    secondary_y=False,
-)
-fig.update_layout(
-    title_text="Dynamics of Liquidity, Stability, Redemption Pools and Return of Stability Pool"
-)
-fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
-fig.update_yaxes(title_text="Size of Pools", secondary_y=False)
-fig.show()
-
-fig = make_subplots(specs=[[{"secondary_y": True}]])
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['return_stability'], name="Return of Stability Pool"),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data2.index/720, y=data2['return_stability'], name="Return of Stability Pool New", line = dict(dash='dot')),
-    secondary_y=False,
-)
-fig.update_layout(
-    title_text="Dynamics of Liquidity, Stability, Redemption Pools and Return of Stability Pool"
-)
-fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
-fig.update_yaxes(title_text="Return", secondary_y=False)
-fig.show()
-
-fig = make_subplots(specs=[[{"secondary_y": True}]])
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['airdrop_gain'], name="Airdrop Gain"),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['liquidation_gain'], name="Liquidation Gain"),
-    secondary_y=True,
-)
-fig.add_trace(
-    go.Scatter(x=data2.index/720, y=data2['airdrop_gain'], name="Airdrop Gain New", line = dict(dash='dot')),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data2.index/720, y=data2['liquidation_gain'], name="Liquidation Gain New", line = dict(dash='dot')),
-    secondary_y=True,
-)
-fig.update_layout(
-    title_text="Dynamics of Airdrop and Liquidation Gain"
-)
-fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
-fig.update_yaxes(title_text="Airdrop Gain", secondary_y=False)
-fig.update_yaxes(title_text="Liquidation Gain", secondary_y=True)
-fig.show()
-
-fig = make_subplots(rows=2, cols=1)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['issuance_fee'], name="Issuance Fee"),
-    row=1, col=1
-)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['redemption_fee'], name="Redemption Fee"),
-    row=2, col=1
-)
-fig.add_trace(
-    go.Scatter(x=data2.index/720, y=data2['issuance_fee'], name="Issuance Fee New", line = dict(dash='dot')),
-    row=1, col=1
-)
-fig.add_trace(
-    go.Scatter(x=data2.index/720, y=data2['redemption_fee'], name="Redemption Fee New", line = dict(dash='dot')),
-    row=2, col=1
-)
-fig.update_layout(
-    title_text="Dynamics of Issuance Fee and Redemption Fee"
-)
-fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
-fig.update_yaxes(title_text="Issuance Fee", secondary_y=False, row=1, col=1)
-fig.update_yaxes(title_text="Redemption Fee", secondary_y=False, row=2, col=1)
-fig.show()
-
-fig = make_subplots(specs=[[{"secondary_y": True}]])
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['annualized_earning'], name="Annualized Earning"),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data2.index/720, y=data2['annualized_earning'], name="Annualized Earning New", line = dict(dash='dot')),
-    secondary_y=False,
-)
-fig.update_layout(
-    title_text="Dynamics of Annualized Earning"
-)
-fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
-fig.update_yaxes(title_text="Annualized Earning", secondary_y=False)
-fig.show()
-
-fig = make_subplots(specs=[[{"secondary_y": True}]])
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['price_ZERO'], name="ZERO Price"),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=data['MC_ZERO'], name="ZERO Market Cap"),
-    secondary_y=True,
-)
-fig.add_trace(
-    go.Scatter(x=data2.index/720, y=data2['price_ZERO'], name="ZERO Price New", line = dict(dash='dot')),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data2.index/720, y=data2['MC_ZERO'], name="ZERO Market Cap New", line = dict(dash='dot')),
-    secondary_y=True,
-)
-fig.update_layout(
-    title_text="Dynamics of the Price and Market Cap of ZERO"
-)
-fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
-fig.update_yaxes(title_text="ZERO Price", secondary_y=False)
-fig.update_yaxes(title_text="ZERO Market Cap", secondary_y=True)
-fig.show()
-
-fig = make_subplots(specs=[[{"secondary_y": True}]])
-fig.add_trace(
-    go.Scatter(x=data.index/720, y=[0.01] * n_sim, name="Base Rate"),
-    secondary_y=False,
-)
-fig.add_trace(
-    go.Scatter(x=data2.index/720, y=data2['base_rate'], name="Base Rate New"),
-    secondary_y=False,
-)
-fig.update_layout(
-    title_text="Dynamics of Issuance Fee and Redemption Fee"
-)
-fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
-fig.update_yaxes(title_text="Issuance Fee", secondary_y=False)
-fig.update_yaxes(title_text="Redemption Fee", secondary_y=True)
-fig.show()
-
-def trove2_histogram(measure):
-  fig = px.histogram(troves2, x=measure, title='Distribution of '+measure, nbins=25)
-  fig.show()
-
-trove2_histogram('Ether_Quantity')
-trove2_histogram('CR_initial')
-trove2_histogram('Supply')
-trove2_histogram('Rational_inattention')
-trove2_histogram('CR_current')
\ No newline at end of file
+  n_troves = len(troves)
+  supply_ZUSD = troves['Supply'].sum(dtype=np.float64)
+
+  new_row = {"Price_ZUSD":price_ZUSD_current, "Price_Ether":price_ether_current, "n_open":n_open, "n_close":n_close, 
+             "n_liquidate":n_liquidate, "n_redempt": n_redempt, "n_troves":n_troves,
+              "stability":stability_pool, "liquidity":liquidity_pool, "redemption_pool":redemption_pool, "supply_ZUSD":supply_ZUSD,
+             "issuance_fee":issuance_fee, "redemption_fee":redemption_fee,
+             "airdrop_gain":airdrop_gain, "liquidation_gain":liquidation_gain, "return_stability":return_stability, 
+             "annualized_earning":annualized_earning, "MC_ZERO":MC_ZERO_current, "price_ZERO":price_ZERO_current,
+             **policy_row}
+  with profiler.phase('record'):
+    data.record(index, new_row)
+  return price_ZUSD_current >= 0
+
+def run_parameters(policies):
+  """What a resumed run must share with its checkpoint: the parameters of the policies, before their first hour, and the sweepable globals."""
+  return {'policies': [(type(policy).__name__, copy.deepcopy(vars(policy))) for policy in policies],
+          'parameters': {name: globals()[name] for name in sweepable}}
+
+def simulate_policies(policies, seed=seed, n_steps=n_sim, diverged=None, profiler=NULL_PROFILER, dtype=np.float64,
+                      sketches=None, checkpoint=None, checkpoint_every=month, sinks=None):
+  """Runs the simulation once per fee policy, all in lockstep for `n_steps` hours.
+
+  The runs share the exogenous paths and the random streams, so they see the
+  same shocks and differ only through their policies (common random numbers).
+  Returns one `(data, troves)` pair per policy: the recorded metrics, which stop
+  early if the liquidity pool or the ZUSD price turn negative or undefined, or
+  once `diverged(index, data)` holds for a recorded hour, and the final troves.
+  An enabled `profiler` records the time spent in each phase of each hour.
+  `dtype` is the precision of the trove state and of the recorded metrics:
+  float32 halves their memory, see `start_run` and macroModel.precision.
+  `sketches`, one TroveSketch per policy, record the distribution of the
+  troves of every hour the run records (see macroModel.sketches).
+  With a `checkpoint` path the state of the runs is saved there every
+  `checkpoint_every` hours and at the end, and a run started with an existing
+  checkpoint resumes from it, bringing `policies` and `sketches` up to date;
+  the checkpoint must come from a run with the same seed, horizon, dtype, policy
+  parameters and sweepable module parameters (see `run_parameters` and
+  macroModel.checkpoint). `sinks`, one ResultSink per policy (or None),
+  receive the recorded rows in batches as the runs advance (see macroModel.results).
+  """
+  global price_ether_current
+  exogenous_paths(seed, n_steps)
+  streams = RandomStreams(seed)
+  sketches = [None] * len(policies) if sketches is None else sketches
+  sinks = [None] * len(policies) if sinks is None else sinks
+  state = None if checkpoint is None else checkpoints.load(checkpoint)
+  parameters = run_parameters(policies)
+  if state is None:
+    runs = [start_run(policy, n_steps, streams, dtype) + [policy, sketch] for policy, sketch in zip(policies, sketches)]
+    for _, troves, _, sketch in runs:
+      if sketch is not None:
+        sketch.record(0, troves)
+    running = list(runs)
+    start = 1
+  else:
+    checkpoints.check(state, seed=seed, n_steps=n_steps, dtype=np.dtype(dtype).name,
+                      sketches=[sketch is not None for sketch in sketches], **parameters)
+    runs = state['runs']
+    for run, policy, sketch in zip(runs, policies, sketches):
+      #the caller's objects take over the saved state
+      policy.__dict__.update(run[2].__dict__)
+      if sketch is not None:
+        sketch.__dict__.update(run[3].__dict__)
+      run[2:] = [policy, sketch]
+    running = [runs[k] for k in state['running']]
+    start = state['index'] + 1
+
+  def save(index):
+    checkpoints.save(checkpoint, {'seed': seed, 'n_steps': n_steps, 'dtype': np.dtype(dtype).name,
+                                  'sketches': [sketch is not None for sketch in sketches], **parameters,
+                                  'index': index, 'runs': runs, 'running': [k for k, run in enumerate(runs) if any(run is other for other in running)]})
+
+  #Simulation Process
+  index = start - 1
+  for index in range(start, n_steps):
+    if not running:
+      break
+  #exogenous ether price input, shared by all runs
+    price_ether_current = price_ether[index]
+    profiler.step(index)
+    for run in list(running):
+      data, troves, policy, sketch = run
+      if not simulation_step(index, data, troves, policy, streams, profiler):
+        running.remove(run)
+        continue
+      if sketch is not None:
+        with profiler.phase('sketch'):
+          sketch.record(index, troves)
+      if diverged is not None and diverged(index, data):
+        running.remove(run)
+    for (data, _, _, _), sink in zip(runs, sinks):
+      if sink is not None:
+        sink.follow(data)
+    if checkpoint is not None and index % checkpoint_every == 0:
+      save(index)
+
+  if checkpoint is not None and index >= start:
+    save(index)
+  for (data, _, _, _), sink in zip(runs, sinks):
+    if sink is not None:
+      sink.follow(data, final=True)
+  return [(data, troves) for data, troves, _, _ in runs]
+
+def simulate(seed=seed, n_steps=n_sim, diverged=None, policy=None, profiler=NULL_PROFILER, dtype=np.float64, sketch=None,
+             sink=None):
+  """Runs a single simulation, with fixed fees at the module rates unless another `policy` is given."""
+  if policy is None:
+    policy = FixedRatePolicy(rate_issuance, rate_redemption)
+  return simulate_policies([policy], seed, n_steps, diverged, profiler, dtype, [sketch], sinks=[sink])[0]
+
+if __name__ == '__main__':
+  baseline = FixedRatePolicy(rate_issuance, rate_redemption)
+  base_rate = BaseRatePolicy(0.98, 0.5, base_rate_initial, rate_issuance, rate_redemption)
+  profiler = Profiler()
+  sketch = TroveSketch(n_sim)
+  (data, troves), (data2, troves2) = simulate_policies([baseline, base_rate], seed, n_sim, profiler=profiler,
+                                                       sketches=[sketch, None])
+  print(profiler.summary())
+
+  from .plots import exhibition, exhibition_base_rate
+  data = data.to_frame()
+  print(data.describe())
+  exhibition(data, troves, sketch)
+
+  data2 = data2.to_frame()
+  exhibition_base_rate(data, data2, troves2)
@@ -0,0 +1,481 @@
+"""Figures of the macro model runs.
+
+The plotting libraries are imported by the functions that use them, so the
+simulation itself never loads plotly or matplotlib.
+"""
+
+"""#**Exhibition**"""
+
+def distribution_evolution(sketch, measure, title=None):
+  """Plots the quantiles of a trove column over the run, from a TroveSketch."""
+  import plotly.graph_objects as go
+  from .sketches import QUANTILES
+
+  months = sketch.steps[:len(sketch)]/720
+  quantiles = sketch.quantiles(measure, QUANTILES)
+  fig = go.Figure()
+  #shaded bands between symmetric quantiles, the median as a line
+  for k in range(len(QUANTILES)//2):
+    fig.add_trace(go.Scatter(x=months, y=quantiles[:, -1-k], line=dict(width=0), showlegend=False))
+    fig.add_trace(go.Scatter(x=months, y=quantiles[:, k], fill='tonexty', line=dict(width=0),
+                             fillcolor='rgba(31,119,180,%.2f)' % (0.2*(k+1)),
+                             name='%d-%d%%' % (100*QUANTILES[k], 100*QUANTILES[-1-k])))
+  fig.add_trace(go.Scatter(x=months, y=quantiles[:, len(QUANTILES)//2], name='median', line=dict(color='rgb(31,119,180)')))
+  fig.update_layout(title_text=title or 'Distribution of '+measure+' over time')
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(type='log', title_text=measure)
+  fig.show()
+
+def exhibition(data, troves, sketch=None):
+  """Plots the metrics and the final troves of the baseline run, and their evolution if a `sketch` was recorded."""
+  import plotly.graph_objects as go
+  import plotly.express as px
+  import matplotlib.pyplot as plt
+  from plotly.subplots import make_subplots
+
+  def linevis(data, measure):
+    fig = px.line(data, x=data.index/720, y=measure, title= measure+' dynamics')
+    fig.show()
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['Price_ZUSD'], name="ZUSD Price"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['Price_Ether'], name="Ether Price"),
+      secondary_y=True,
+  )
+  fig.update_layout(
+      title_text="Price Dynamics of ZUSD and Ether"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="ZUSD Price", secondary_y=False)
+  fig.update_yaxes(title_text="Ether Price", secondary_y=True)
+  fig.show()
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['n_troves'], name="Number of Troves"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['supply_ZUSD'], name="ZUSD Supply"),
+      secondary_y=True,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Trove Numbers and ZUSD Supply"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Number of Troves", secondary_y=False)
+  fig.update_yaxes(title_text="ZUSD Supply", secondary_y=True)
+  fig.show()
+
+  fig = make_subplots(rows=2, cols=1)
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['n_open'], name="Number of Troves Opened", mode='markers'),
+      row=1, col=1, secondary_y=False
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['n_close'], name="Number of Troves Closed", mode='markers'),
+      row=2, col=1, secondary_y=False
+  )
+  fig.update_layout(
+      title_text="Dynamics of Number of Troves Opened and Closed"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Troves Opened", row=1, col=1)
+  fig.update_yaxes(title_text="Troves Closed", row=2, col=1)
+  fig.show()
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['n_liquidate'], name="Number of Liquidated Troves", mode='markers'),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['n_redempt'], name="Number of Redempted Troves", mode='markers'),
+      secondary_y=False,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Number of Liquidated and Redempted Troves"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Number of Liquidated Troves", secondary_y=False)
+  fig.update_yaxes(title_text="Number of Redempted Troves", secondary_y=True)
+  fig.show()
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['liquidity'], name="Liquidity Pool"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['stability'], name="Stability Pool"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=100*data['redemption_pool'], name="100*Redemption Pool"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['return_stability'], name="Return of Stability Pool"),
+      secondary_y=True,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Liquidity, Stability, Redemption Pools and Return of Stability Pool"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Size of Pools", secondary_y=False)
+  fig.update_yaxes(title_text="Return", secondary_y=True)
+  fig.show()
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['airdrop_gain'], name="Airdrop Gain"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['liquidation_gain'], name="Liquidation Gain"),
+      secondary_y=True,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Airdrop and Liquidation Gain"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Airdrop Gain", secondary_y=False)
+  fig.update_yaxes(title_text="Liquidation Gain", secondary_y=True)
+  fig.show()
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['issuance_fee'], name="Issuance Fee"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['redemption_fee'], name="Redemption Fee"),
+      secondary_y=True,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Issuance Fee and Redemption Fee"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Issuance Fee", secondary_y=False)
+  fig.update_yaxes(title_text="Redemption Fee", secondary_y=True)
+  fig.show()
+
+  #linevis(data, 'annualized_earning')
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['price_ZERO'], name="ZERO Price"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['MC_ZERO'], name="ZERO Market Cap"),
+      secondary_y=True,
+  )
+  fig.update_layout(
+      title_text="Dynamics of the Price and Market Cap of ZERO"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="ZERO Price", secondary_y=False)
+  fig.update_yaxes(title_text="ZERO Market Cap", secondary_y=True)
+  fig.show()
+
+  def trove_histogram(measure):
+    fig = px.histogram(troves.to_frame(), x=measure, title='Distribution of '+measure, nbins=25)
+    fig.show()
+
+
+  trove_histogram('Ether_Quantity')
+  trove_histogram('CR_initial')
+  trove_histogram('Supply')
+  trove_histogram('Rational_inattention')
+  trove_histogram('CR_current')
+
+  if sketch is not None:
+    for measure in sketch.edges:
+      distribution_evolution(sketch, measure)
+
+  plt.plot(troves["Ether_Quantity"])
+  plt.show()
+
+  plt.plot(troves["CR_initial"])
+  plt.show()
+
+  plt.plot(troves["Supply"])
+  plt.show()
+
+  plt.plot(troves["CR_current"])
+  plt.show()
+
+"""#**Exhibition Part 2**"""
+
+def exhibition_base_rate(data, data2, troves2):
+  """Plots the base rate run against the baseline."""
+  import plotly.graph_objects as go
+  import plotly.express as px
+  from plotly.subplots import make_subplots
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['Price_ZUSD'], name="ZUSD Price"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['Price_Ether'], name="Ether Price"),
+      secondary_y=True,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['Price_ZUSD'], name="ZUSD Price New", line = dict(dash='dot')),
+      secondary_y=False,
+  )
+  fig.update_layout(
+      title_text="Price Dynamics of ZUSD and Ether"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="ZUSD Price", secondary_y=False)
+  fig.update_yaxes(title_text="Ether Price", secondary_y=True)
+  fig.show()
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['n_troves'], name="Number of Troves"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['supply_ZUSD'], name="ZUSD Supply"),
+      secondary_y=True,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['n_troves'], name="Number of Troves New", line = dict(dash='dot')),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['supply_ZUSD'], name="ZUSD Supply New", line = dict(dash='dot')),
+      secondary_y=True,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Trove Numbers and ZUSD Supply"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Number of Troves", secondary_y=False)
+  fig.update_yaxes(title_text="ZUSD Supply", secondary_y=True)
+  fig.show()
+
+  fig = make_subplots(rows=2, cols=2)
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['n_open'], name="Number of Troves Opened", mode='markers'),
+      row=1, col=1, secondary_y=False
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['n_close'], name="Number of Troves Closed", mode='markers'),
+      row=2, col=1, secondary_y=False
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['n_open'], name="Number of Troves Opened New", mode='markers'),
+      row=1, col=2, secondary_y=False
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['n_close'], name="Number of Troves Closed New", mode='markers'),
+      row=2, col=2, secondary_y=False
+  )
+  fig.update_layout(
+      title_text="Dynamics of Number of Troves Opened and Closed"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Troves Opened", row=1, col=1)
+  fig.update_yaxes(title_text="Troves Closed", row=2, col=1)
+  fig.show()
+
+  fig = make_subplots(rows=2, cols=1)
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['n_liquidate'], name="Number of Liquidated Troves"),
+      row=1, col=1, secondary_y=False
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['n_redempt'], name="Number of Redempted Troves"),
+      row=2, col=1, secondary_y=False
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['n_liquidate'], name="Number of Liquidated Troves New", line = dict(dash='dot')),
+      row=1, col=1, secondary_y=False
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['n_redempt'], name="Number of Redempted Troves New", line = dict(dash='dot')),
+      row=2, col=1, secondary_y=False
+  )
+  fig.update_layout(
+      title_text="Dynamics of Number of Liquidated and Redempted Troves"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Troves Liquidated", row=1, col=1)
+  fig.update_yaxes(title_text="Troves Redempted", row=2, col=1)
+  fig.show()
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['liquidity'], name="Liquidity Pool"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['stability'], name="Stability Pool"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=100*data['redemption_pool'], name="100*Redemption Pool"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['liquidity'], name="Liquidity Pool New", line = dict(dash='dot')),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['stability'], name="Stability Pool New", line = dict(dash='dot')),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=100*data2['redemption_pool'], name="100*Redemption Pool New", line = dict(dash='dot')),
+      secondary_y=False,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Liquidity, Stability, Redemption Pools and Return of Stability Pool"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Size of Pools", secondary_y=False)
+  fig.show()
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['return_stability'], name="Return of Stability Pool"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['return_stability'], name="Return of Stability Pool New", line = dict(dash='dot')),
+      secondary_y=False,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Liquidity, Stability, Redemption Pools and Return of Stability Pool"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Return", secondary_y=False)
+  fig.show()
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['airdrop_gain'], name="Airdrop Gain"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['liquidation_gain'], name="Liquidation Gain"),
+      secondary_y=True,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['airdrop_gain'], name="Airdrop Gain New", line = dict(dash='dot')),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['liquidation_gain'], name="Liquidation Gain New", line = dict(dash='dot')),
+      secondary_y=True,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Airdrop and Liquidation Gain"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Airdrop Gain", secondary_y=False)
+  fig.update_yaxes(title_text="Liquidation Gain", secondary_y=True)
+  fig.show()
+
+  fig = make_subplots(rows=2, cols=1)
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['issuance_fee'], name="Issuance Fee"),
+      row=1, col=1
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['redemption_fee'], name="Redemption Fee"),
+      row=2, col=1
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['issuance_fee'], name="Issuance Fee New", line = dict(dash='dot')),
+      row=1, col=1
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['redemption_fee'], name="Redemption Fee New", line = dict(dash='dot')),
+      row=2, col=1
+  )
+  fig.update_layout(
+      title_text="Dynamics of Issuance Fee and Redemption Fee"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Issuance Fee", secondary_y=False, row=1, col=1)
+  fig.update_yaxes(title_text="Redemption Fee", secondary_y=False, row=2, col=1)
+  fig.show()
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['annualized_earning'], name="Annualized Earning"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['annualized_earning'], name="Annualized Earning New", line = dict(dash='dot')),
+      secondary_y=False,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Annualized Earning"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Annualized Earning", secondary_y=False)
+  fig.show()
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['price_ZERO'], name="ZERO Price"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['MC_ZERO'], name="ZERO Market Cap"),
+      secondary_y=True,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['price_ZERO'], name="ZERO Price New", line = dict(dash='dot')),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['MC_ZERO'], name="ZERO Market Cap New", line = dict(dash='dot')),
+      secondary_y=True,
+  )
+  fig.update_layout(
+      title_text="Dynamics of the Price and Market Cap of ZERO"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="ZERO Price", secondary_y=False)
+  fig.update_yaxes(title_text="ZERO Market Cap", secondary_y=True)
+  fig.show()
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=[0.01] * len(data), name="Base Rate"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['base_rate'], name="Base Rate New"),
+      secondary_y=False,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Issuance Fee and Redemption Fee"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Issuance Fee", secondary_y=False)
+  fig.update_yaxes(title_text="Redemption Fee", secondary_y=True)
+  fig.show()
+
+  def trove2_histogram(measure):
+    fig = px.histogram(troves2.to_frame(), x=measure, title='Distribution of '+measure, nbins=25)
+    fig.show()
+
+  trove2_histogram('Ether_Quantity')
+  trove2_histogram('CR_initial')
+  trove2_histogram('Supply')
+  trove2_histogram('Rational_inattention')
+  trove2_histogram('CR_current')
@@ -0,0 +1,52 @@
+"""Fee policies of the macro model.
+
+A policy sets the issuance and redemption fee rates of every simulated hour.
+The simulation calls `update(index, data, troves)` at the start of each hour
+with the metrics recorded so far and the current troves; the policy sets
+`rate_issuance` and `rate_redemption` for that hour and returns the values
+of its own `metrics`, which are recorded alongside the model's. The rates
+held before the first update are the ones of hour 0. `float32_safe` tells
+whether a run of the policy passes the accuracy check of the compact float32
+mode (see `precision`); the command line runs the others in float64 only.
+
+Each run needs its own policy instance.
+"""
+
+import numpy as np
+
+class FixedRatePolicy:
+    """Constant issuance and redemption fees."""
+
+    metrics = {}
+    float32_safe = True
+
+    def __init__(self, rate_issuance=0.01, rate_redemption=0.01):
+        self.rate_issuance = rate_issuance
+        self.rate_redemption = rate_redemption
+        self.initials = {}
+
+    def update(self, index, data, troves):
+        return {}
+
+class BaseRatePolicy:
+    """Both fees equal a base rate that decays every hour and rises with redemptions.
+
+        base_rate[t] = decay * base_rate[t-1] + sensitivity * redemption_pool[t-1] / supply
+    """
+
+    metrics = {"base_rate": np.float64}
+    # the redemptions feed back into the fees and amplify the rounding of the trove debts
+    float32_safe = False
+
+    def __init__(self, decay=0.98, sensitivity=0.5, base_rate_initial=0, rate_issuance=0.01, rate_redemption=0.01):
+        self.decay = decay
+        self.sensitivity = sensitivity
+        self.rate_issuance = rate_issuance
+        self.rate_redemption = rate_redemption
+        self.initials = {"base_rate": base_rate_initial}
+
+    def update(self, index, data, troves):
+        base_rate = self.decay * data.loc[index-1, 'base_rate'] + self.sensitivity * (data.loc[index-1, 'redemption_pool'] / troves['Supply'].sum(dtype=np.float64))
+        self.rate_issuance = base_rate
+        self.rate_redemption = base_rate
+        return {"base_rate": base_rate}
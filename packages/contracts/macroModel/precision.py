@@ -0,0 +1,85 @@
+"""Accuracy guardrails of the compact float32 mode.
+
+`simulate_policies(..., dtype=np.float32)` stores the trove columns and the
+recorded metrics in float32, which halves the memory of large populations
+and long horizons, while the price clearing, the pools and every sum over
+the troves stay in float64. The rounding of the trove state still reaches
+the dynamics: a trove sitting on the edge of its inattention band may adjust
+an hour earlier or later, and from then on the runs draw different shocks
+for it. `check_accuracy` runs the same scenario in both precisions and
+reports how far the compact run strays from the float64 reference:
+
+    Price_ZUSD, supply_ZUSD         largest relative deviation over the hours
+    n_liquidate, liquidation_gain   relative deviation of the run totals
+
+A compact run passes if every deviation is within its tolerance and both
+runs end on the same hour. The default tolerances leave room for the usual
+divergence of a year-long run and catch runs whose peg or liquidation
+history changed. Runs with frequent redemptions are the most sensitive: the
+redeemed amount is the small difference between the total supply and its
+target, so the rounding of the trove debts is amplified hour after hour.
+The base-rate policy, which feeds redemptions back into the fees, fails the
+check: it is marked `float32_safe = False`, and the command line refuses to
+run it in float32.
+
+    python -m macroModel run --precision float32 [--no-check]
+"""
+
+import numpy as np
+
+TOLERANCES = {'Price_ZUSD': 5e-3, 'supply_ZUSD': 5e-2, 'n_liquidate': 5e-2, 'liquidation_gain': 5e-2}
+
+def _series_deviation(reference, compact):
+    reference = np.asarray(reference, dtype=np.float64)
+    compact = np.asarray(compact, dtype=np.float64)
+    if len(reference) == 0:
+        return 0.0
+    return float(np.max(np.abs(compact - reference) / np.maximum(np.abs(reference), np.finfo(np.float64).tiny)))
+
+def _total_deviation(reference, compact):
+    reference = float(np.sum(reference, dtype=np.float64))
+    compact = float(np.sum(compact, dtype=np.float64))
+    return abs(compact - reference) / max(abs(reference), 1.0)
+
+def compare(reference, compact, tolerances=TOLERANCES):
+    """Deviations of the recorded metrics of a compact run from its float64 reference.
+
+    Returns a dict: metric -> {'deviation', 'tolerance', 'ok'}, plus 'steps'
+    with the lengths of both runs. The series are compared over the hours both
+    runs recorded.
+    """
+    n = min(len(reference), len(compact))
+    report = {'steps': {'reference': len(reference), 'compact': len(compact), 'ok': len(reference) == len(compact)}}
+    for name, tolerance in tolerances.items():
+        if name in ('n_liquidate', 'liquidation_gain'):
+            deviation = _total_deviation(reference[name][:n], compact[name][:n])
+        else:
+            deviation = _series_deviation(reference[name][:n], compact[name][:n])
+        report[name] = {'deviation': deviation, 'tolerance': tolerance, 'ok': deviation <= tolerance}
+    return report
+
+def passed(report):
+    return all(entry['ok'] for entry in report.values())
+
+def format_report(report):
+    steps = report['steps']
+    lines = [f"{'steps':<18} {steps['compact']:>12} of {steps['reference']:<10} {'ok' if steps['ok'] else 'FAILED'}"]
+    for name, entry in report.items():
+        if name == 'steps':
+            continue
+        lines.append(f"{name:<18} {entry['deviation']:>12.3e} <= {entry['tolerance']:<10.1e} {'ok' if entry['ok'] else 'FAILED'}")
+    return '\n'.join(lines)
+
+def check_accuracy(make_policies, seed, n_steps, dtype=np.float32, tolerances=TOLERANCES, **options):
+    """Runs a scenario in `dtype` and in float64; returns the compact results and one report per run.
+
+    `make_policies()` returns fresh policy instances, as each run needs its
+    own. The other `options` of simulate_policies (profiler, sketches,
+    checkpoint) apply to the compact run only.
+    """
+    from . import macro_model
+
+    results = macro_model.simulate_policies(make_policies(), seed, n_steps, dtype=dtype, **options)
+    references = macro_model.simulate_policies(make_policies(), seed, n_steps)
+    reports = [compare(reference, compact, tolerances) for (reference, _), (compact, _) in zip(references, results)]
+    return results, reports
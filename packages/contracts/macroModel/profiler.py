@@ -0,0 +1,159 @@
+"""Per-phase profiling of simulation steps.
+
+A Profiler records, for every step and phase of a run, the wall time spent,
+the number of calls and -- for the chain simulation -- the JSON-RPC requests
+sent and the time spent waiting for them, so Python time and node time can
+be told apart. Phases are timed with a context manager:
+
+    profiler = Profiler()
+    for index in range(1, n_steps):
+        profiler.step(index)
+        with profiler.phase('liquidate_troves'):
+            ...
+    print(profiler.summary())
+    profiler.to_json('profile.json')
+
+A disabled profiler (the default of the simulation entry points) hands out
+one shared no-op context, so instrumented code costs a method call per phase.
+Phases may nest: the time and the requests of an inner phase count in the
+outer one as well.
+JSON-RPC requests are counted by an RpcCounter installed as web3 middleware.
+"""
+
+import csv
+import json
+import time
+
+class RpcCounter:
+    """Counts the JSON-RPC requests of a web3 provider and the time spent on them."""
+
+    def __init__(self):
+        self.requests = 0
+        self.seconds = 0.0
+        self.methods = {}
+
+    def record(self, method, seconds):
+        """Counts one request, e.g. a JSON-RPC batch sent past the middleware."""
+        self.seconds += seconds
+        self.requests += 1
+        self.methods[method] = self.methods.get(method, 0) + 1
+
+    def middleware(self, make_request, web3):
+        def counted(method, params):
+            start = time.perf_counter()
+            try:
+                return make_request(method, params)
+            finally:
+                self.record(method, time.perf_counter() - start)
+        return counted
+
+    def install(self, web3):
+        # replaces the counter of an earlier run in the same session
+        if 'rpc_counter' in web3.middleware_onion:
+            web3.middleware_onion.replace('rpc_counter', self.middleware)
+        else:
+            web3.middleware_onion.add(self.middleware, name='rpc_counter')
+        return self
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_PHASE = _NullPhase()
+
+class _Phase:
+    __slots__ = ('profiler', 'name', 'start', 'requests', 'rpc_seconds')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        rpc = self.profiler.rpc
+        if rpc is not None:
+            self.requests, self.rpc_seconds = rpc.requests, rpc.seconds
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        rpc = self.profiler.rpc
+        if rpc is not None:
+            self.profiler._add(self.name, elapsed, rpc.requests - self.requests, rpc.seconds - self.rpc_seconds)
+        else:
+            self.profiler._add(self.name, elapsed, 0, 0.0)
+        return False
+
+FIELDS = ('seconds', 'calls', 'rpc_requests', 'rpc_seconds')
+
+class Profiler:
+    def __init__(self, enabled=True, rpc=None):
+        self.enabled = enabled
+        self.rpc = rpc
+        self.current_step = 0
+        # (step, phase) -> [seconds, calls, rpc_requests, rpc_seconds]
+        self.records = {}
+
+    def step(self, index):
+        self.current_step = index
+
+    def phase(self, name):
+        if not self.enabled:
+            return _NULL_PHASE
+        # a fresh context per use: nested and re-entered phases keep their own start
+        return _Phase(self, name)
+
+    def _add(self, name, seconds, rpc_requests, rpc_seconds):
+        record = self.records.get((self.current_step, name))
+        if record is None:
+            self.records[(self.current_step, name)] = [seconds, 1, rpc_requests, rpc_seconds]
+        else:
+            record[0] += seconds
+            record[1] += 1
+            record[2] += rpc_requests
+            record[3] += rpc_seconds
+
+    def totals(self):
+        """Phase -> dict of the FIELDS summed over all steps, in order of first use."""
+        totals = {}
+        for (_, name), record in self.records.items():
+            total = totals.setdefault(name, [0.0, 0, 0, 0.0])
+            for k, value in enumerate(record):
+                total[k] += value
+        return {name: dict(zip(FIELDS, total)) for name, total in totals.items()}
+
+    def summary(self):
+        totals = self.totals()
+        elapsed = sum(total['seconds'] for total in totals.values()) or 1.0
+        lines = [f"{'phase':<20} {'seconds':>10} {'share':>7} {'calls':>8} {'ms/call':>9} {'rpc':>8} {'rpc s':>9}"]
+        for name, total in sorted(totals.items(), key=lambda item: -item[1]['seconds']):
+            lines.append(f"{name:<20} {total['seconds']:>10.3f} {100 * total['seconds'] / elapsed:>6.1f}% {total['calls']:>8} "
+                         f"{1e3 * total['seconds'] / total['calls']:>9.3f} {total['rpc_requests']:>8} {total['rpc_seconds']:>9.3f}")
+        return '\n'.join(lines)
+
+    def to_csv(self, path):
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(('step', 'phase') + FIELDS)
+            for (step, name), record in sorted(self.records.items(), key=lambda item: item[0][0]):
+                writer.writerow([step, name] + record)
+
+    def to_json(self, path):
+        steps = [{'step': step, 'phase': name, **dict(zip(FIELDS, record))} for (step, name), record in self.records.items()]
+        report = {'phases': self.totals(), 'steps': steps}
+        if self.rpc is not None:
+            report['rpc_methods'] = self.rpc.methods
+        with open(path, 'w') as file:
+            json.dump(report, file, indent=1)
+
+    def save(self, path):
+        """Writes the per-step records as JSON or CSV, after the extension of `path`."""
+        if path.endswith('.json'):
+            self.to_json(path)
+        else:
+            self.to_csv(path)
+
+NULL_PROFILER = Profiler(enabled=False)
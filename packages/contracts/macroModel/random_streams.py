@@ -0,0 +1,40 @@
+"""Reproducible random streams for the simulations.
+
+Every draw of a run comes from a counter-based Philox generator whose key is
+(seed, phase) and whose counter starts at (step, trove). A phase therefore
+sees the same numbers for a given step no matter what ran before it, whole
+blocks can be drawn at once instead of reseeding per trove, and runs with
+different seeds (or the same seed in two simulations) never share state, so
+they can run side by side in one process or in parallel workers.
+"""
+
+import zlib
+
+import numpy as np
+
+class RandomStreams:
+    def __init__(self, seed):
+        self.seed = int(seed) % 2**64
+        self._generators = {}
+
+    def __call__(self, phase, step, trove=0):
+        """Returns the generator of `phase` positioned at the start of the (step, trove) stream.
+
+        The generator object is reused per phase: finish drawing from it before
+        asking for the next stream of the same phase.
+        """
+        stream = self._generators.get(phase)
+        if stream is None:
+            key = np.array([self.seed, zlib.crc32(phase.encode())], dtype=np.uint64)
+            stream = self._generators[phase] = (np.random.Generator(np.random.Philox(key=key)), key)
+        generator, key = stream
+        # the first counter word is the one Philox advances while drawing
+        generator.bit_generator.state = {
+            'bit_generator': 'Philox',
+            'state': {'counter': np.array([0, step, trove, 0], dtype=np.uint64), 'key': key},
+            'buffer': np.zeros(4, dtype=np.uint64),
+            'buffer_pos': 4,
+            'has_uint32': 0,
+            'uinteger': 0,
+        }
+        return generator
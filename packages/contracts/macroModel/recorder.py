@@ -0,0 +1,141 @@
+"""Preallocated time series of the per-step metrics of a simulation run.
+
+Every metric gets a typed NumPy array sized to the number of steps up front,
+and each step writes its row by index; a row past the end grows all the
+arrays geometrically, as for a run resumed for more steps. The phases keep reading it the way
+they read the pandas DataFrame before: `data['liquidity'][index-1]`,
+`data.loc[index-1, 'Price_ZUSD']` and label slices such as
+`data.loc[index-month:index, 'issuance_fee']`, which include their end point
+and stop at the last recorded step. `to_frame` builds the DataFrame once, at
+the end of the run, and `to_csv` writes the rows out without pandas.
+
+Trailing-window sums, which the phases need every step, come from
+`window_sum` in constant time instead of re-adding the window.
+
+The columns may use compact dtypes such as float32 to halve the memory of
+long runs. With `exact_rows`, the floating-point values of the last
+`exact_rows` rows are also kept in float64, and reading a single row through
+`loc`, or feeding a window sum, returns them unrounded, so the state a run
+carries from one step to the next does not lose precision.
+"""
+
+import csv
+
+import numpy as np
+
+from .rolling_window import RollingSum
+
+def compact_metrics(metrics, dtype=np.float32):
+    """`metrics` with the floating-point columns in `dtype` and the integer ones in int32."""
+    return {name: dtype if np.dtype(kind).kind == 'f' else np.int32 if np.dtype(kind).kind == 'i' else kind
+            for name, kind in metrics.items()}
+
+class _Loc:
+    def __init__(self, recorder):
+        self._recorder = recorder
+
+    def _rows(self, rows):
+        if isinstance(rows, slice):
+            # label based, like DataFrame.loc: the stop is included
+            start = 0 if rows.start is None else max(0, rows.start)
+            stop = len(self._recorder) if rows.stop is None else min(len(self._recorder), rows.stop + 1)
+            return slice(start, stop)
+        if not 0 <= rows < len(self._recorder):
+            raise KeyError(rows)
+        return rows
+
+    def __getitem__(self, key):
+        rows, name = key
+        if isinstance(rows, slice):
+            return self._recorder.columns[name][self._rows(rows)]
+        return self._recorder.value(name, self._rows(rows))
+
+    def __setitem__(self, key, value):
+        rows, name = key
+        if not isinstance(rows, slice):
+            self._recorder.extend_to(rows + 1)
+            self._recorder.set_value(name, rows, value)
+        else:
+            self._recorder.columns[name][self._rows(rows)] = value
+
+class Recorder:
+    def __init__(self, n_steps, metrics, exact_rows=0):
+        """`metrics` maps each metric name to the dtype of its array."""
+        self.columns = {name: np.zeros(n_steps, dtype=dtype) for name, dtype in metrics.items()}
+        self.loc = _Loc(self)
+        self._n = 0
+        self._windows = {}
+        # float64 ring of the last rows of the compact floating-point columns
+        self.exact_rows = exact_rows
+        self._exact = {name: np.zeros(exact_rows) for name, column in self.columns.items()
+                       if exact_rows and column.dtype.kind == 'f' and column.dtype != np.float64}
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, name):
+        return self.columns[name][:self._n]
+
+    @property
+    def capacity(self):
+        return len(next(iter(self.columns.values()), ()))
+
+    def reserve(self, capacity):
+        if capacity <= self.capacity:
+            return
+        new_capacity = max(capacity, 2 * self.capacity)
+        for name, column in self.columns.items():
+            grown = np.zeros(new_capacity, dtype=column.dtype)
+            grown[:self._n] = column[:self._n]
+            self.columns[name] = grown
+
+    def extend_to(self, n):
+        self.reserve(n)
+        self._n = max(self._n, n)
+
+    def record(self, index, row):
+        for name, value in row.items():
+            self.set_value(name, index, value)
+        self.extend_to(index + 1)
+
+    def set_value(self, name, index, value):
+        if index >= len(self.columns[name]):
+            self.reserve(index + 1)
+        self.columns[name][index] = value
+        exact = self._exact.get(name)
+        if exact is not None:
+            exact[index % self.exact_rows] = value
+
+    def value(self, name, index):
+        """The value of `name` at row `index`, unrounded if the row is among the last `exact_rows`."""
+        exact = self._exact.get(name)
+        if exact is not None and index >= self._n - self.exact_rows:
+            return exact[index % self.exact_rows]
+        return self.columns[name][index]
+
+    def window_sum(self, name, window, end):
+        """Sum of `name` over the rows `[end-window, end)`.
+
+        Rows are fed into a RollingSum as `end` advances, so they must not change
+        once a window has moved past them.
+        """
+        rolling = self._windows.get((name, window))
+        if rolling is None:
+            rolling = self._windows[(name, window)] = RollingSum(window)
+        if end < len(rolling):
+            # going back in time: no running state for that, add it up
+            return self.columns[name][max(0, end - window):end].sum()
+        for row in range(len(rolling), end):
+            rolling.push(self.value(name, row))
+        return rolling.sum()
+
+    def to_csv(self, path):
+        """Writes the recorded rows with a leading step column, without going through pandas."""
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['step', *self.columns])
+            writer.writerows(zip(range(self._n), *(column[:self._n].tolist() for column in self.columns.values())))
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame({name: column[:self._n] for name, column in self.columns.items()})
@@ -0,0 +1,132 @@
+"""Columnar result files of simulation runs (Parquet or Arrow IPC).
+
+A ResultSink writes the recorded metrics of a run incrementally: rows are
+buffered and flushed as Arrow record batches every `batch_steps` steps, to a
+Parquet file (zstd-compressed) or, for paths ending in `.arrow`, an Arrow
+IPC file, which notebooks can memory-map and read without copying. The run
+metadata -- seed, model parameters, code version and anything the caller
+adds -- is stored in the schema under the `zero_sim` key.
+
+    with ResultSink('results/baseline.parquet', run_metadata(seed, n_steps)) as sink:
+        simulate_policies([policy], seed, n_steps, sinks=[sink])
+    table, metadata = read_results('results/baseline.parquet')
+
+The simulation hands the sink its Recorder (`follow`), so the rows are only
+copied once per batch; rows can also be written one at a time (`write`).
+pyarrow is an optional dependency (`pip install zero-sim[arrow]`), imported
+when a sink is opened.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+
+import numpy as np
+
+def _arrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("writing Parquet or Arrow results needs pyarrow: pip install zero-sim[arrow]") from None
+    return pyarrow
+
+def code_version():
+    """Digest of macro_model.py and the git commit it was run from."""
+    source = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'macro_model.py')
+    with open(source, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(source), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'macro_model_sha256': digest, 'commit': commit}
+
+def model_parameters():
+    """The scalar parameters of the macro model module, as currently set."""
+    from . import macro_model
+    return {name: value for name, value in vars(macro_model).items()
+            if not name.startswith('_') and type(value) in (int, float)}
+
+def run_metadata(seed, n_steps, **extra):
+    return {'seed': seed, 'n_steps': n_steps, 'parameters': model_parameters(), **code_version(), **extra}
+
+class ResultSink:
+    def __init__(self, path, metadata=None, batch_steps=4096, compression=None):
+        """Opens `path` for writing; Parquet unless it ends in `.arrow`.
+
+        `compression` defaults to zstd for Parquet and none for Arrow, whose
+        compressed buffers could not be memory-mapped.
+        """
+        self.pa = _arrow()
+        self.path = path
+        self.format = 'arrow' if path.endswith('.arrow') else 'parquet'
+        self.compression = compression if compression is not None else ('zstd' if self.format == 'parquet' else None)
+        self.metadata = metadata or {}
+        self.batch_steps = batch_steps
+        self.rows = 0
+        self._buffer = []
+        self._writer = None
+
+    def _open(self, schema):
+        # the schema is taken from the first batch
+        self._schema = schema.with_metadata({'zero_sim': json.dumps(self.metadata, default=str)})
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if self.format == 'parquet':
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(self.path, self._schema, compression=self.compression or 'none')
+        else:
+            options = self.pa.ipc.IpcWriteOptions(compression=self.compression)
+            self._writer = self.pa.ipc.new_file(self.path, self._schema, options=options)
+
+    def _write_batch(self, columns):
+        if self._writer is None:
+            self._open(self.pa.RecordBatch.from_pydict(columns).schema)
+        batch = self.pa.RecordBatch.from_pydict(columns, schema=self._schema)
+        self._writer.write_batch(batch)
+        self.rows += batch.num_rows
+
+    def write(self, step, row):
+        """Buffers one row of metrics; flushes once `batch_steps` rows are buffered."""
+        self._buffer.append({'step': step, **row})
+        if len(self._buffer) >= self.batch_steps:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            names = self._buffer[0].keys()
+            self._write_batch({name: np.array([row[name] for row in self._buffer]) for name in names})
+            self._buffer = []
+
+    def follow(self, recorder, final=False):
+        """Writes the rows `recorder` holds beyond those already written, in batches of `batch_steps`."""
+        while len(recorder) - self.rows >= self.batch_steps or (final and len(recorder) > self.rows):
+            stop = min(len(recorder), self.rows + self.batch_steps)
+            columns = {'step': np.arange(self.rows, stop)}
+            columns.update((name, column[self.rows:stop]) for name, column in recorder.columns.items())
+            self._write_batch(columns)
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+def read_results(path):
+    """Reads a result file; returns the Arrow table and the run metadata. Arrow files are memory-mapped."""
+    pa = _arrow()
+    if path.endswith('.arrow'):
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    else:
+        import pyarrow.parquet as pq
+        table = pq.read_table(path, memory_map=True)
+    metadata = (table.schema.metadata or {}).get(b'zero_sim')
+    return table, json.loads(metadata) if metadata else {}
@@ -0,0 +1,54 @@
+"""Running sum over a trailing window of a per-step metric.
+
+The last `window` values live in a ring buffer. Each push adds the new value
+and subtracts the one falling out of the window with a compensated
+(Neumaier) sum, so reading the window total is O(1) per step instead of
+re-adding the whole window. To keep rounding from accumulating over long
+runs, the total is recomputed exactly from the ring every `resync_every`
+pushes (once per window by default).
+"""
+
+import math
+
+import numpy as np
+
+class RollingSum:
+    def __init__(self, window, resync_every=None):
+        if window <= 0:
+            raise ValueError("window must be positive")
+        self.window = window
+        self.resync_every = resync_every or window
+        self._values = np.zeros(window)
+        self._count = 0
+        self._total = 0.0
+        self._compensation = 0.0
+
+    def __len__(self):
+        # number of values pushed so far, including those already out of the window
+        return self._count
+
+    def _add(self, value):
+        total = self._total + value
+        if abs(self._total) >= abs(value):
+            self._compensation += (self._total - total) + value
+        else:
+            self._compensation += (value - total) + self._total
+        self._total = total
+
+    def push(self, value):
+        value = float(value)
+        slot = self._count % self.window
+        if self._count >= self.window:
+            self._add(-self._values[slot])
+        self._values[slot] = value
+        self._add(value)
+        self._count += 1
+        if self._count % self.resync_every == 0:
+            self.resync()
+
+    def resync(self):
+        self._total = math.fsum(self._values)
+        self._compensation = 0.0
+
+    def sum(self):
+        return self._total + self._compensation
@@ -0,0 +1,158 @@
+"""Parameter sweeps over the behavioural constants of the macro model.
+
+A design is a list of points, each a dict of overrides for the
+behavioural globals of macro_model named in `macro_model.sweepable`
+(alpha, beta, delta, ...). Every point is simulated for one or more seeds
+in a process pool; the worker sets the overrides, runs the baseline
+simulation and restores the globals afterwards. A point
+stops as soon as the simulation hits its own failure conditions (negative
+liquidity pool or ZUSD price) or the optional `diverged(index, data)` test,
+so doomed configurations do not run for the whole horizon. Results come
+back as one row per (point, seed).
+
+    python -m macroModel.sweep --grid alpha=0.1,0.3,0.5 beta=0.1,0.2 [--steps 8640] [--seeds 3]
+    python -m macroModel.sweep --lhs 64 alpha=0.1:0.5 delta=-30:-10 [--max-peg-deviation 0.5] [--out sweep.csv]
+"""
+
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .ensemble import run_summary
+
+def grid(**values):
+    """Full factorial design over the given values of each parameter."""
+    names = list(values)
+    return [dict(zip(names, combination)) for combination in itertools.product(*values.values())]
+
+def random_design(n, bounds, seed=0):
+    """`n` points drawn uniformly within `bounds`, a dict of name -> (low, high)."""
+    rng = np.random.default_rng(seed)
+    samples = {name: rng.uniform(low, high, n) for name, (low, high) in bounds.items()}
+    return [{name: float(samples[name][k]) for name in bounds} for k in range(n)]
+
+def latin_hypercube(n, bounds, seed=0):
+    """`n` points within `bounds` such that each parameter has exactly one point in each of n equal strata."""
+    rng = np.random.default_rng(seed)
+    samples = {}
+    for name, (low, high) in bounds.items():
+        strata = (rng.permutation(n) + rng.uniform(0, 1, n)) / n
+        samples[name] = low + (high - low) * strata
+    return [{name: float(samples[name][k]) for name in bounds} for k in range(n)]
+
+class PegDeviation:
+    """Divergence test: the ZUSD price is more than `max_deviation` away from the peg."""
+
+    def __init__(self, max_deviation):
+        self.max_deviation = max_deviation
+
+    def __call__(self, index, data):
+        return abs(data['Price_ZUSD'][index] - 1) > self.max_deviation
+
+class _Divergence:
+    # remembers whether the user test stopped the run, to tell it apart from the model's own failures
+    def __init__(self, test):
+        self.test = test
+        self.hit = False
+
+    def __call__(self, index, data):
+        self.hit = self.test(index, data)
+        return self.hit
+
+def run_point(point_id, point, seed, n_steps, diverged=None):
+    """Simulates one point of a design for one seed; returns a row of the result table."""
+    from . import macro_model
+    unknown = [name for name in point if name not in macro_model.sweepable]
+    if unknown:
+        raise ValueError(f"not a behavioural parameter of the macro model: {unknown}; sweepable: {', '.join(macro_model.sweepable)}")
+    saved = {name: getattr(macro_model, name) for name in point}
+    divergence = _Divergence(diverged) if diverged is not None else None
+    try:
+        for name, value in point.items():
+            setattr(macro_model, name, value)
+        data, _ = macro_model.simulate(seed, n_steps, diverged=divergence)
+    finally:
+        for name, value in saved.items():
+            setattr(macro_model, name, value)
+
+    if divergence is not None and divergence.hit:
+        status = 'diverged'
+    elif len(data) < n_steps:
+        status = 'failed'
+    else:
+        status = 'completed'
+    return {'point': point_id, **point, 'seed': seed, 'status': status, **run_summary(data)}
+
+def run_sweep(points, n_steps, seeds=(2019,), workers=None, diverged=None, on_result=None):
+    """Runs every point of the design for every seed; returns a DataFrame with one row per run.
+
+    `diverged(index, data)` must be picklable, e.g. a module-level function or a PegDeviation.
+    `on_result(row)` is called in the parent as each run completes.
+    """
+    import pandas as pd
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(run_point, point_id, point, seed, n_steps, diverged)
+                   for point_id, point in enumerate(points) for seed in seeds]
+        for future in as_completed(futures):
+            row = future.result()
+            rows.append(row)
+            if on_result is not None:
+                on_result(row)
+    return pd.DataFrame(rows).sort_values(['point', 'seed'], ignore_index=True)
+
+def _parse_values(specs):
+    values = {}
+    for spec in specs:
+        name, _, listed = spec.partition('=')
+        values[name] = [float(value) for value in listed.split(',')]
+    return values
+
+def _parse_bounds(specs):
+    bounds = {}
+    for spec in specs:
+        name, _, interval = spec.partition('=')
+        low, high = interval.split(':')
+        bounds[name] = (float(low), float(high))
+    return bounds
+
+def main(argv=None):
+    from . import macro_model
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    design = parser.add_mutually_exclusive_group(required=True)
+    design.add_argument('--grid', nargs='+', metavar='NAME=V1,V2,...')
+    design.add_argument('--random', type=int, metavar='N')
+    design.add_argument('--lhs', type=int, metavar='N')
+    parser.add_argument('bounds', nargs='*', metavar='NAME=LOW:HIGH', help="parameter bounds of --random and --lhs")
+    parser.add_argument('--design-seed', type=int, default=0)
+    parser.add_argument('--seeds', type=int, default=1, help="number of seeds per point")
+    parser.add_argument('--steps', type=int, default=macro_model.n_sim)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-peg-deviation', type=float, default=None)
+    parser.add_argument('--out', default=None, help="csv file for the result table")
+    args = parser.parse_args(argv)
+
+    if args.grid:
+        points = grid(**_parse_values(args.grid))
+    elif args.random:
+        points = random_design(args.random, _parse_bounds(args.bounds), args.design_seed)
+    else:
+        points = latin_hypercube(args.lhs, _parse_bounds(args.bounds), args.design_seed)
+    seeds = range(macro_model.seed, macro_model.seed + args.seeds)
+    diverged = PegDeviation(args.max_peg_deviation) if args.max_peg_deviation is not None else None
+
+    def progress(row):
+        print(f"point {row['point']} seed {row['seed']}: {row['status']} after {row['steps']} steps")
+
+    results = run_sweep(points, args.steps, seeds, args.workers, diverged, on_result=progress)
+    if args.out:
+        results.to_csv(args.out, index=False)
+    else:
+        print(results.to_string())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import numpy as np
+
+from macroModel import macro_model
+from macroModel.batched import BatchedSimulation
+
+N_STEPS = 240
+SEEDS = range(1, 25)
+METRICS = ('Price_ZUSD', 'n_troves', 'liquidity')
+
+def mean_and_error(values):
+    values = np.asarray(values, dtype=np.float64)
+    return values.mean(), values.std(ddof=1) / np.sqrt(len(values))
+
+def test_batch_agrees_with_reference():
+    # the batch does not replay the seeds of simulate: compare the ensemble means of the per-run time averages
+    result = BatchedSimulation(256, 11).run(N_STEPS)
+    batch = {name: np.nanmean(result.paths[name], axis=1) for name in METRICS}
+    reference = {name: [] for name in METRICS}
+    for seed in SEEDS:
+        # some seeds end early, on an undefined price
+        with np.errstate(invalid='ignore'):
+            data, _ = macro_model.simulate(seed, N_STEPS)
+        for name in METRICS:
+            reference[name].append(np.mean(data[name]))
+
+    for name in METRICS:
+        batch_mean, batch_error = mean_and_error(batch[name])
+        reference_mean, reference_error = mean_and_error(reference[name])
+        # within four standard errors of the difference: the liquidity pool, the widest, to about 40%
+        tolerance = 4 * np.hypot(batch_error, reference_error)
+        assert abs(batch_mean - reference_mean) < tolerance, (name, batch_mean, reference_mean, tolerance)
+
+def test_vacant_slots_hold_no_debt():
+    simulation = BatchedSimulation(16, 5, capacity=8)
+    simulation.start(2 * N_STEPS)
+    opened = simulation.alive.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for index in range(1, 2 * N_STEPS):
+            alive = simulation.alive.copy()
+            simulation.step(index)
+            if alive.shape != simulation.alive.shape:
+                alive = np.pad(alive, ((0, 0), (0, simulation.capacity - alive.shape[1])))
+            opened += (simulation.alive & ~alive).sum(axis=1)
+            vacant = ~simulation.alive
+            assert not simulation.supply[vacant].any()
+            assert not simulation.ether_quantity[vacant].any()
+            # stopped paths keep no troves
+            assert not simulation.alive[~simulation.running].any()
+            recorded = (simulation.steps == index + 1) & simulation.running
+            np.testing.assert_array_equal(simulation.result.paths['n_troves'][recorded, index], simulation.alive[recorded].sum(axis=1))
+    # the slots of closed troves were reused rather than appended
+    assert opened.max() > simulation.capacity
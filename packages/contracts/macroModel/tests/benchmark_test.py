@@ -0,0 +1,47 @@
+import json
+
+from macroModel import benchmark
+from macroModel.benchmark import HEADER, _format_case, compare
+
+def case(troves, hours, hours_per_second, **values):
+    return {'troves': troves, 'hours': hours, 'completed_hours': hours - 1, 'hours_per_second': hours_per_second,
+            'mean_troves': troves, 'peak_rss_bytes': 3 * 2**20, 'allocated_bytes_per_hour': 2 * 2**10, **values}
+
+def test_format_case_renders_missing_measurements_as_nan():
+    line = _format_case(case(100, 168, 250.0))
+    assert len(line) == len(HEADER)
+    assert line.split() == ['100', 'week', '167', '250.0', '100', '3.0', '2.0']
+
+    # too short to measure, and no RSS on this platform
+    line = _format_case(case(10000, 1, None, completed_hours=0, peak_rss_bytes=None, allocated_bytes_per_hour=None))
+    assert len(line) == len(HEADER)
+    assert line.split() == ['10000', '1', '0', 'nan', '10000', 'nan', 'nan']
+
+def test_compare_flags_slowdowns_and_skips_cases_without_rates(capsys):
+    before = {'cases': [case(100, 168, 100.0), case(1000, 168, 100.0), case(1000, 8760, 100.0), case(10000, 1, 100.0)]}
+    after = {'cases': [
+        case(100, 168, 120.0),           # faster
+        case(1000, 168, 85.0),           # slower, beyond the tolerance
+        case(1000, 8760, 95.0),          # slower, within it
+        case(10000, 1, None),            # too short to measure: skipped
+        case(100000, 168, 1.0),          # not in the earlier report: skipped
+    ]}
+    regressions = compare(before, after, tolerance=0.1)
+    assert regressions == [after['cases'][1]]
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split() == ['troves', 'horizon', 'before', 'after', 'ratio']
+    assert [line.split() for line in lines[1:]] == [
+        ['100', 'week', '100.0', '120.0', '1.20x'],
+        ['1000', 'week', '100.0', '85.0', '0.85x', 'slower'],
+        ['1000', 'year', '100.0', '95.0', '0.95x'],
+    ]
+
+def test_compare_command_fails_on_a_regression(tmp_path, capsys):
+    paths = []
+    for name, rate in (('before', 100.0), ('after', 50.0)):
+        path = tmp_path / f"{name}.json"
+        path.write_text(json.dumps({'cases': [case(100, 168, rate)]}))
+        paths.append(str(path))
+    assert benchmark.main(['--compare', *paths]) == 1
+    assert benchmark.main(['--compare', paths[0], paths[0]]) == 0
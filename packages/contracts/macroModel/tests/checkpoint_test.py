@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from macroModel import macro_model
+from macroModel.policies import BaseRatePolicy, FixedRatePolicy
+
+class Interrupted(Exception):
+    pass
+
+def interrupt_at(hour):
+    def diverged(index, data):
+        if index == hour:
+            raise Interrupted
+        return False
+    return diverged
+
+def test_resumed_run_matches_uninterrupted_run(tmp_path):
+    path = str(tmp_path / 'run.ckpt')
+    expected = macro_model.simulate_policies([FixedRatePolicy(), BaseRatePolicy()], 2019, 600)
+    with pytest.raises(Interrupted):
+        macro_model.simulate_policies([FixedRatePolicy(), BaseRatePolicy()], 2019, 600, diverged=interrupt_at(370),
+                                      checkpoint=path, checkpoint_every=100)
+    policies = [FixedRatePolicy(), BaseRatePolicy()]
+    resumed = macro_model.simulate_policies(policies, 2019, 600, checkpoint=path, checkpoint_every=100)
+    for (data, troves), (expected_data, expected_troves) in zip(resumed, expected):
+        assert len(data) == len(expected_data)
+        for name in data.columns:
+            np.testing.assert_array_equal(data[name], expected_data[name], err_msg=name)
+        np.testing.assert_array_equal(troves['Supply'], expected_troves['Supply'])
+    assert policies[1].rate_issuance == expected[1][0].loc[len(expected[1][0]) - 1, 'base_rate']
+
+    with pytest.raises(ValueError):
+        macro_model.simulate_policies([FixedRatePolicy()], 2019, 600, checkpoint=path)
+
+def test_resuming_with_other_parameters_is_refused(tmp_path, monkeypatch):
+    path = str(tmp_path / 'run.ckpt')
+    macro_model.simulate_policies([FixedRatePolicy(), BaseRatePolicy()], 2019, 200, checkpoint=path)
+
+    # the same policies, with another decay or fee
+    with pytest.raises(ValueError, match=r"policies\[1\]\[1\]\['decay'\] is 0.98, expected 0.9"):
+        macro_model.simulate_policies([FixedRatePolicy(), BaseRatePolicy(decay=0.9)], 2019, 200, checkpoint=path)
+    with pytest.raises(ValueError, match='rate_issuance'):
+        macro_model.simulate_policies([FixedRatePolicy(0.02), BaseRatePolicy()], 2019, 200, checkpoint=path)
+    # a swept module parameter
+    monkeypatch.setattr(macro_model, 'alpha', 2 * macro_model.alpha)
+    with pytest.raises(ValueError, match=r"parameters\['alpha'\]"):
+        macro_model.simulate_policies([FixedRatePolicy(), BaseRatePolicy()], 2019, 200, checkpoint=path)
+    monkeypatch.undo()
+
+    # the finished runs are returned as they were saved
+    data, _ = macro_model.simulate_policies([FixedRatePolicy(), BaseRatePolicy()], 2019, 200, checkpoint=path)[1]
+    assert len(data) == 200
@@ -0,0 +1,50 @@
+import csv
+import os
+import subprocess
+import sys
+
+import pytest
+
+from macroModel.cli import main
+from macroModel.tests.recorder_test import DATAFRAME_COLUMNS
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def test_run_writes_the_csv_of_each_run(tmp_path):
+    assert main(['run', '--steps', '24', '--seed', '2019', '--out', str(tmp_path)]) == 0
+    assert sorted(os.listdir(tmp_path)) == ['baseline.csv']
+    with open(tmp_path / 'baseline.csv', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['step', *DATAFRAME_COLUMNS]
+    assert [int(row[0]) for row in rows[1:]] == list(range(24))
+
+    assert main(['run', '--scenario', 'compare', '--steps', '24', '--out', str(tmp_path / 'compare')]) == 0
+    assert sorted(os.listdir(tmp_path / 'compare')) == ['base_rate.csv', 'baseline.csv']
+
+def imported_by(*argv):
+    # a fresh interpreter, so that the modules imported by the other tests do not count
+    script = ("import sys\n"
+              "from macroModel.cli import main\n"
+              "try:\n"
+              f"    main({list(argv)!r})\n"
+              "except SystemExit:\n"
+              "    pass\n"
+              "print(' '.join(sys.modules))\n")
+    result = subprocess.run([sys.executable, '-c', script], cwd=PACKAGE_ROOT, capture_output=True, text=True, check=True)
+    return set(result.stdout.split('\n')[-2].split())
+
+def test_help_does_not_import_pandas_or_matplotlib():
+    for argv in (['--help'], ['run', '--help']):
+        modules = imported_by(*argv)
+        assert 'macroModel.cli' in modules
+        assert 'pandas' not in modules and 'matplotlib' not in modules, argv
+
+def test_float32_is_refused_for_policies_that_fail_the_check(tmp_path, capsys):
+    for scenario in ('base-rate', 'compare'):
+        with pytest.raises(SystemExit) as exit:
+            main(['run', '--scenario', scenario, '--precision', 'float32', '--steps', '24', '--out', str(tmp_path)])
+        assert exit.value.code == 2
+        assert 'base_rate run fails the accuracy check in float32' in capsys.readouterr().err
+    assert not os.listdir(tmp_path)
+    assert main(['run', '--precision', 'float32', '--steps', '24', '--out', str(tmp_path)]) == 0
+    assert 'Price_ZUSD' in capsys.readouterr().out
@@ -0,0 +1,21 @@
+import numpy as np
+
+from macroModel import macro_model
+from macroModel.ensemble import ENSEMBLE_METRICS, run_ensemble, run_summary
+
+SEEDS = range(2019, 2025)
+N_STEPS = 48
+
+def test_summaries_do_not_depend_on_the_number_of_workers():
+    serial = run_ensemble(SEEDS, N_STEPS, workers=1)
+    parallel = run_ensemble(SEEDS, N_STEPS, workers=3)
+    assert serial.summaries == parallel.summaries
+    for name in ENSEMBLE_METRICS:
+        np.testing.assert_array_equal(serial.paths[name], parallel.paths[name])
+    # and they are the summaries of the runs simulated one by one
+    for seed in SEEDS:
+        # some seeds end early, on an undefined price
+        with np.errstate(invalid='ignore'):
+            data, _ = macro_model.simulate(seed, N_STEPS)
+        assert serial.summaries[seed] == run_summary(data)
+    assert list(serial.summary_frame().index) == list(SEEDS)
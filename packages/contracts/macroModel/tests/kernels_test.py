@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from macroModel import kernels, macro_model
+
+@pytest.fixture
+def backend(request):
+    previous = kernels.backend_name
+    kernels.use(request.param)
+    yield request.param
+    kernels.use(previous)
+
+def random_troves(rng, n):
+    CR_initial = 1.1 + 0.1 * rng.chisquare(16, n)
+    ether_quantity = rng.gamma(10, 500, n)
+    supply = 1000 * ether_quantity / CR_initial
+    CR_current = CR_initial * rng.lognormal(0, 0.3, n)
+    return [ether_quantity, supply, CR_initial, CR_current, rng.gamma(4, 0.08, n)]
+
+@pytest.mark.parametrize('backend', kernels.backends(), indirect=True)
+def test_adjustment_matches_numpy(backend):
+    rng = np.random.default_rng(1)
+    for n in (0, 1, 50, 2000):
+        columns = random_troves(rng, n)
+        expected = [column.copy() for column in columns]
+        exits = kernels.band_exits(columns[3], columns[2], columns[4])
+        np.testing.assert_array_equal(exits, kernels._band_exits_numpy(expected[3], expected[2], expected[4]))
+
+        p = rng.uniform(0, 1, len(exits))
+        issuance = kernels.adjust(*columns, exits, p, 0.4, 950.0)
+        expected_issuance = kernels._adjust_numpy(*expected, exits, p, 0.4, 950.0)
+        assert issuance == pytest.approx(expected_issuance, rel=1e-12, abs=1e-6)
+        for column, expected_column in zip(columns, expected):
+            np.testing.assert_array_equal(column, expected_column)
+
+@pytest.mark.parametrize('backend', kernels.backends(), indirect=True)
+def test_redemption_walk_matches_numpy(backend):
+    rng = np.random.default_rng(2)
+    supply = rng.gamma(2, 1e5, 500)
+    slots = rng.permutation(500)
+    for amount in (0.0, supply[slots[0]], 3e6, 4e7, supply.sum() * 2):
+        assert kernels.redemption_walk(supply, slots, amount) == kernels._redemption_walk_numpy(supply, slots, amount)
+
+@pytest.mark.parametrize('backend', kernels.backends(), indirect=True)
+def test_simulation_matches_reference(backend):
+    data, troves = macro_model.simulate(2019, 400)
+    kernels.use('numpy')
+    reference, reference_troves = macro_model.simulate(2019, 400)
+    assert len(data) == len(reference)
+    for name in macro_model.metrics:
+        np.testing.assert_allclose(data[name], reference[name], rtol=1e-9, err_msg=name)
+    np.testing.assert_allclose(troves['Supply'], reference_troves['Supply'], rtol=1e-9)
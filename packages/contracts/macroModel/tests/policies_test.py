@@ -0,0 +1,27 @@
+import numpy as np
+
+from macroModel import macro_model
+from macroModel.policies import BaseRatePolicy, FixedRatePolicy
+
+N_STEPS = 200
+
+def assert_same_run(run, expected):
+    (data, troves), (expected_data, expected_troves) = run, expected
+    assert len(data) == len(expected_data)
+    for name in expected_data.columns:
+        np.testing.assert_array_equal(data[name], expected_data[name], err_msg=name)
+    np.testing.assert_array_equal(troves['Supply'], expected_troves['Supply'])
+
+def test_fixed_rate_policy_reproduces_simulate():
+    solo = macro_model.simulate(2019, N_STEPS)
+    [run] = macro_model.simulate_policies([FixedRatePolicy(macro_model.rate_issuance, macro_model.rate_redemption)], 2019, N_STEPS)
+    assert_same_run(run, solo)
+    # other rates change the run
+    [other] = macro_model.simulate_policies([FixedRatePolicy(0.05, 0.05)], 2019, N_STEPS)
+    assert not np.array_equal(other[0]['issuance_fee'], solo[0]['issuance_fee'])
+
+def test_lockstep_runs_match_solo_runs():
+    baseline, base_rate = macro_model.simulate_policies([FixedRatePolicy(), BaseRatePolicy()], 2019, N_STEPS)
+    assert_same_run(baseline, macro_model.simulate(2019, N_STEPS))
+    assert_same_run(base_rate, macro_model.simulate(2019, N_STEPS, policy=BaseRatePolicy()))
+    assert 'base_rate' in base_rate[0].columns and 'base_rate' not in baseline[0].columns
@@ -0,0 +1,28 @@
+import numpy as np
+
+from macroModel import macro_model
+from macroModel.precision import check_accuracy, passed
+from macroModel.recorder import Recorder
+
+def test_recorder_keeps_recent_rows_exact():
+    data = Recorder(10, {'x': np.float32}, exact_rows=3)
+    for index in range(10):
+        data.record(index, {'x': 1 + index / 3})
+    assert data['x'].dtype == np.float32
+    assert data.loc[9, 'x'] == 1 + 9 / 3
+    assert data.loc[2, 'x'] == np.float32(1 + 2 / 3)
+    assert data.window_sum('x', 2, 9) == (1 + 7 / 3) + (1 + 8 / 3)
+
+def test_float32_run_stays_close_to_float64():
+    results, reports = check_accuracy(lambda: [macro_model.FixedRatePolicy()], 2019, 400)
+    data, troves = results[0]
+    assert troves['Supply'].dtype == np.float32
+    assert data['Price_ZUSD'].dtype == np.float32
+    assert passed(reports[0]), reports[0]
+
+def test_base_rate_policy_is_not_float32_safe():
+    # the policies the command line refuses to run in float32 do fail the check
+    assert macro_model.FixedRatePolicy.float32_safe and not macro_model.BaseRatePolicy.float32_safe
+    make_policies = lambda: [macro_model.BaseRatePolicy(0.98, 0.5, macro_model.base_rate_initial)]
+    _, reports = check_accuracy(make_policies, 2019, 800)
+    assert not passed(reports[0])
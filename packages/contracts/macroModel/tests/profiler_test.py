@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from macroModel import profiler as profiling
+from macroModel.profiler import NULL_PROFILER, Profiler, RpcCounter
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(profiling.time, 'perf_counter', clock)
+    return clock
+
+def node(clock, seconds):
+    # a provider whose every request takes `seconds` of the clock
+    def make_request(method, params):
+        clock.advance(seconds)
+        return {'method': method}
+    return make_request
+
+def test_nested_and_reentered_phases_keep_their_own_timing(clock):
+    profiler = Profiler()
+    profiler.step(1)
+    with profiler.phase('outer'):
+        clock.advance(1)
+        with profiler.phase('inner'):
+            clock.advance(2)
+        # the same phase again, inside itself
+        with profiler.phase('outer'):
+            clock.advance(4)
+        clock.advance(8)
+    profiler.step(2)
+    with profiler.phase('inner'):
+        clock.advance(16)
+
+    # seconds, calls, rpc requests, rpc seconds
+    assert profiler.records == {
+        (1, 'inner'): [2, 1, 0, 0.0],
+        (1, 'outer'): [4 + (1 + 2 + 4 + 8), 2, 0, 0.0],
+        (2, 'inner'): [16, 1, 0, 0.0],
+    }
+    assert profiler.totals()['inner'] == {'seconds': 18, 'calls': 2, 'rpc_requests': 0, 'rpc_seconds': 0.0}
+
+def test_requests_are_attributed_to_the_phases_that_sent_them(clock, tmp_path):
+    rpc = RpcCounter()
+    send = rpc.middleware(node(clock, 0.5), web3=None)
+    profiler = Profiler(rpc=rpc)
+    profiler.step(3)
+    with profiler.phase('open_troves'):
+        send('eth_sendTransaction', [])
+        clock.advance(1)
+        with profiler.phase('hints'):
+            send('eth_call', [])
+            send('eth_call', [])
+    with profiler.phase('log_state'):
+        clock.advance(2)
+    # a batch sent past the middleware
+    with profiler.phase('log_state'):
+        rpc.record('batch', 0.25)
+
+    assert profiler.records[(3, 'hints')] == [1.0, 1, 2, 1.0]
+    assert profiler.records[(3, 'open_troves')] == [2.5, 1, 3, 1.5]
+    assert profiler.records[(3, 'log_state')] == [2.0, 2, 1, 0.25]
+    assert rpc.requests == 4 and rpc.seconds == 1.75
+    assert rpc.methods == {'eth_sendTransaction': 1, 'eth_call': 2, 'batch': 1}
+
+    path = tmp_path / 'profile.json'
+    profiler.save(str(path))
+    report = json.loads(path.read_text())
+    assert report['rpc_methods'] == rpc.methods
+    assert report['phases']['open_troves']['rpc_requests'] == 3
+
+def test_disabled_profiler_records_nothing(clock):
+    with NULL_PROFILER.phase('open_troves'):
+        with NULL_PROFILER.phase('open_troves'):
+            clock.advance(1)
+    assert NULL_PROFILER.records == {}
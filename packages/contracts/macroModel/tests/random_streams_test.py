@@ -0,0 +1,56 @@
+import numpy as np
+
+from macroModel.random_streams import RandomStreams
+
+# the phases the simulations draw from
+PHASES = ('price_ether', 'natural_rate', 'price_ZERO', 'return_stability', 'close_troves', 'adjust_troves',
+          'open_troves', 'stability_update', 'price_stabilizer', 'ZERO_market', 'shadow_check')
+
+def test_block_and_single_draws_are_the_same():
+    streams = RandomStreams(2019)
+    for step, trove in ((0, 0), (1, 0), (4321, 0), (17, 3), (2**40, 2**20)):
+        block = streams('open_troves', step, trove).uniform(0, 1, 1000)
+        normals = streams('open_troves', step, trove).normal(0, 1, 50)
+        # one at a time, interleaved with the draws of other phases, which must not disturb them
+        generator = streams('open_troves', step, trove)
+        single = []
+        for k in range(1000):
+            streams('close_troves', step, trove).uniform()
+            single.append(generator.uniform())
+        np.testing.assert_array_equal(block, single)
+        generator = streams('open_troves', step, trove)
+        np.testing.assert_array_equal(normals, [generator.normal() for _ in range(50)])
+
+def test_draws_do_not_depend_on_what_was_drawn_before():
+    first = RandomStreams(7)
+    expected = {(phase, step): first(phase, step).normal(0, 1, 8) for phase in PHASES for step in range(5)}
+    second = RandomStreams(7)
+    rng = np.random.default_rng(0)
+    for k in rng.permutation(len(expected)):
+        phase, step = list(expected)[k]
+        second(phase, step).uniform(0, 1, rng.integers(1, 100))
+        np.testing.assert_array_equal(second(phase, step).normal(0, 1, 8), expected[phase, step])
+
+def test_two_streams_in_one_process_are_independent():
+    a, b, other = RandomStreams(11), RandomStreams(11), RandomStreams(12)
+    alone = [RandomStreams(11)('price_ether', step).normal() for step in range(200)]
+    interleaved_a, interleaved_b = [], []
+    for step in range(200):
+        interleaved_a.append(a('price_ether', step).normal())
+        other('price_ether', step).normal(0, 1, 3)
+        interleaved_b.append(b('price_ether', step).normal())
+    assert interleaved_a == alone and interleaved_b == alone
+    # another seed gives other numbers, uncorrelated with these
+    others = [other('price_ether', step).normal() for step in range(200)]
+    assert not np.isin(others, alone).any()
+    assert abs(np.corrcoef(alone, others)[0, 1]) < 0.25
+
+def test_phases_do_not_collide():
+    streams = RandomStreams(2019)
+    draws = {phase: np.concatenate([streams(phase, step, trove).random(64) for step in range(3) for trove in range(3)])
+             for phase in PHASES}
+    values = np.concatenate(list(draws.values()))
+    # no phase, step or trove repeats the numbers of another
+    assert len(np.unique(values)) == len(values)
+    for phase in PHASES[1:]:
+        assert abs(np.corrcoef(draws[PHASES[0]], draws[phase])[0, 1]) < 0.15
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from macroModel import macro_model
+from macroModel.recorder import Recorder
+
+# the columns of the DataFrame the model appended its rows to before the Recorder, in order
+DATAFRAME_COLUMNS = ["Price_ZUSD", "Price_Ether", "n_open", "n_close", "n_liquidate", "n_redempt",
+                     "n_troves", "stability", "liquidity", "redemption_pool",
+                     "supply_ZUSD", "return_stability", "airdrop_gain", "liquidation_gain", "issuance_fee", "redemption_fee",
+                     "price_ZERO", "MC_ZERO", "annualized_earning"]
+COUNTERS = {"n_open", "n_close", "n_liquidate", "n_redempt", "n_troves"}
+
+def test_writes_past_the_preallocated_length_grow_the_columns():
+    data = Recorder(4, {'x': np.float64, 'n': np.int64}, exact_rows=2)
+    for index in range(11):
+        data.record(index, {'x': index / 2, 'n': index})
+    assert len(data) == 11 and data.capacity >= 11
+    np.testing.assert_array_equal(data['x'], np.arange(11) / 2)
+    assert data['n'].dtype == np.int64
+    np.testing.assert_array_equal(data['n'], np.arange(11))
+
+    # a single value set through loc extends the rows, like a DataFrame
+    data.loc[20, 'x'] = 7.0
+    assert len(data) == 21
+    assert data.loc[20, 'x'] == 7.0 and data.loc[15, 'x'] == 0
+    # label slices include their end point and stop at the last row
+    np.testing.assert_array_equal(data.loc[8:10, 'n'], [8, 9, 10])
+    assert len(data.loc[18:40, 'x']) == 3
+    with pytest.raises(KeyError):
+        data.loc[21, 'x']
+    assert data.window_sum('x', 3, 11) == 4 + 4.5 + 5
+
+def test_frame_keeps_the_dataframe_schema():
+    data, _ = macro_model.simulate(2019, 50)
+    frame = data.to_frame()
+    assert list(frame.columns) == DATAFRAME_COLUMNS
+    assert len(frame) == 50
+    # the counters were float64 in the appended frame; they are integers now
+    for name in DATAFRAME_COLUMNS:
+        assert frame[name].dtype == (np.int64 if name in COUNTERS else np.float64), name
+    assert frame.index.tolist() == list(range(50))
+    np.testing.assert_array_equal(frame['Price_ZUSD'].to_numpy(), data['Price_ZUSD'])
+
+def baseline_sum(values, window, end):
+    # the sum the phases took before the running sums, over the label slice clipped at row 0
+    return sum(values[max(0, end - window):end].tolist())
+
+def recorded(values):
+    data = Recorder(len(values), {'gain': np.float64})
+    for index, value in enumerate(values):
+        data.record(index, {'gain': value})
+    return data
+
+@pytest.mark.parametrize('window', [macro_model.day, macro_model.month])
+def test_window_sum_matches_the_baseline_sum(window):
+    rng = np.random.default_rng(8)
+    n = 3 * macro_model.month + 50
+    # ends before the first full window, and on and around every resync of the running sum
+    ends = sorted({*range(0, 2 * window), *(k * window + d for k in range(1, n // window + 1) for d in (-1, 0, 1)), n})
+    ends = [end for end in ends if end <= n]
+
+    # sums of multiples of 1/64 are exact in any order: the results are identical
+    values = rng.integers(-10**6, 10**6, n) / 64
+    data = recorded(values)
+    for end in ends:
+        assert data.window_sum('gain', window, end) == baseline_sum(values, window, end), end
+
+    # heavy-tailed gains: equal up to the rounding of the baseline's own sum
+    values = rng.normal(0, 1e4, n) * np.where(rng.uniform(0, 1, n) < 0.01, 1e4, 1)
+    data = recorded(values)
+    for end in ends:
+        scale = np.abs(values[max(0, end - window):end]).sum()
+        assert abs(data.window_sum('gain', window, end) - baseline_sum(values, window, end)) <= 1e-12 * scale, end
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('pyarrow')
+from macroModel import macro_model
+from macroModel.results import ResultSink, read_results, run_metadata
+
+@pytest.mark.parametrize('extension', ['parquet', 'arrow'])
+def test_streamed_results_match_the_recorded_run(tmp_path, extension):
+    path = str(tmp_path / f"run.{extension}")
+    with ResultSink(path, run_metadata(2019, 500), batch_steps=64) as sink:
+        data, _ = macro_model.simulate(2019, 500, sink=sink)
+        assert sink.rows == 500
+    table, metadata = read_results(path)
+    assert metadata['seed'] == 2019 and metadata['parameters']['delta'] == macro_model.delta
+    np.testing.assert_array_equal(table['step'].to_numpy(), np.arange(500))
+    for name in data.columns:
+        np.testing.assert_array_equal(table[name].to_numpy(), data[name], err_msg=name)
+
+def test_rows_written_one_at_a_time(tmp_path):
+    path = str(tmp_path / 'rows.parquet')
+    with ResultSink(path, {'run': 'chain'}, batch_steps=3) as sink:
+        for step in range(1, 8):
+            sink.write(step, {'price_ZUSD': 1 + step / 100, 'num_troves': step})
+    table, metadata = read_results(path)
+    assert metadata == {'run': 'chain'}
+    assert table['step'].to_pylist() == list(range(1, 8))
+    assert table['num_troves'].to_pylist() == list(range(1, 8))
@@ -0,0 +1,19 @@
+import numpy as np
+
+from macroModel.sketches import TroveSketch
+
+def test_quantiles_within_a_bin():
+    rng = np.random.default_rng(4)
+    sketch = TroveSketch(6, every=2)
+    populations = {}
+    for index in range(6):
+        troves = {name: rng.lognormal(np.log(np.sqrt(edges[0] * edges[-1])), 1.0, 5000) for name, edges in sketch.edges.items()}
+        sketch.record(index, troves)
+        populations[index] = troves
+    assert len(sketch) == 3
+    for name, edges in sketch.edges.items():
+        width = edges[1] / edges[0]
+        quantiles = sketch.quantiles(name, (0.1, 0.5, 0.9))
+        for row, index in enumerate(sketch.steps):
+            expected = np.quantile(populations[index][name], (0.1, 0.5, 0.9))
+            assert np.all(quantiles[row] / expected < width) and np.all(expected / quantiles[row] < width)
@@ -0,0 +1,54 @@
+import pytest
+
+from macroModel import macro_model
+from macroModel.ensemble import run_summary
+from macroModel.sweep import grid, run_point, run_sweep
+
+N_STEPS = 48
+
+STRUCTURAL = ('month', 'day', 'period', 'n_sim', 'initial_open', 'seed', 'ZERO_total_supply')
+
+def module_globals():
+    # the parameters, not the state a run leaves in the module (price_ether_current)
+    return {name: getattr(macro_model, name) for name in macro_model.sweepable + STRUCTURAL}
+
+def test_point_sets_its_parameters_and_restores_them():
+    before = module_globals()
+    point = {'alpha': 0.6, 'beta': 0.05, 'delta': -25}
+    row = run_point(3, point, 2019, N_STEPS)
+    assert module_globals() == before
+
+    for name, value in point.items():
+        setattr(macro_model, name, value)
+    try:
+        data, _ = macro_model.simulate(2019, N_STEPS)
+    finally:
+        for name in point:
+            setattr(macro_model, name, before[name])
+    assert row == {'point': 3, **point, 'seed': 2019, 'status': 'completed', **run_summary(data)}
+    # the parameters change the run
+    assert row != run_point(3, {'alpha': before['alpha']}, 2019, N_STEPS)
+
+def test_only_sweepable_parameters_are_accepted():
+    before = module_globals()
+    for name in STRUCTURAL + ('no_such_parameter',):
+        assert name not in macro_model.sweepable
+        with pytest.raises(ValueError, match=name):
+            run_point(0, {'alpha': 0.5, name: 1}, 2019, N_STEPS)
+    assert module_globals() == before
+
+def fail(index, data):
+    raise RuntimeError("stop")
+
+def test_globals_are_restored_when_a_run_fails():
+    before = module_globals()
+    with pytest.raises(RuntimeError):
+        run_point(0, {'alpha': 0.9, 'theta': 0.5}, 2019, N_STEPS, diverged=fail)
+    assert module_globals() == before
+
+def test_sweep_has_one_row_per_point_and_seed():
+    points = grid(alpha=[0.1, 0.5], beta=[0.2])
+    results = run_sweep(points, N_STEPS, seeds=(2019, 2020), workers=2)
+    assert list(results[['point', 'seed']].itertuples(index=False, name=None)) == [(0, 2019), (0, 2020), (1, 2019), (1, 2020)]
+    assert list(results['alpha']) == [0.1, 0.1, 0.5, 0.5]
+    assert results.loc[0].to_dict() == run_point(0, points[0], 2019, N_STEPS)
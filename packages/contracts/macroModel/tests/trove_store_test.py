@@ -0,0 +1,195 @@
+import numpy as np
+import pytest
+
+from macroModel import kernels
+from macroModel.trove_store import COLUMNS, InattentionBandIndex, TroveStore
+
+def sample_troves(rng, n, price_ether):
+    CR_initial = 1.1 + 0.1 * rng.chisquare(16, n)
+    ether_quantity = rng.gamma(10, 500, n)
+    return {
+        "Ether_Quantity": ether_quantity,
+        "Supply": price_ether * ether_quantity / CR_initial,
+        "CR_initial": CR_initial,
+        "Rational_inattention": rng.gamma(4, 0.08, n),
+        "CR_current": CR_initial,
+    }
+
+def out_of_band(troves):
+    check = (troves['CR_current'] - troves['CR_initial']) / (troves['CR_initial'] * troves['Rational_inattention'])
+    return np.flatnonzero((check < -1) | (check > 2))
+
+def test_band_index_finds_every_trove_out_of_its_band():
+    rng = np.random.default_rng(3)
+    troves = TroveStore()
+    troves.band_index = InattentionBandIndex(merge_fraction=1/16, min_troves=0)
+    troves._indexes = [troves.cr_index, troves.band_index]
+    troves.append(**sample_troves(rng, 2000, 1000))
+    price = 1000
+    for step in range(300):
+        price *= 1 + rng.normal(0, 0.01)
+        troves['CR_current'] = price * troves['Ether_Quantity'] / troves['Supply']
+        troves.remove(troves.cr_index.liquidatable(price))
+        troves.remove(rng.choice(len(troves), min(len(troves), rng.poisson(5)), replace=False))
+
+        candidates = troves.band_index.triggered(troves, price)
+        expected = out_of_band(troves)
+        assert np.all(np.diff(candidates) > 0)
+        assert np.isin(expected, candidates).all()
+
+        adjusted = expected[rng.uniform(0, 1, len(expected)) < 0.5]
+        troves['Supply'][adjusted] = price * troves['Ether_Quantity'][adjusted] / troves['CR_initial'][adjusted]
+        troves.rekey(adjusted)
+        troves.append(**sample_troves(rng, rng.poisson(5), price))
+
+def consistent_store(troves, rows, ids, price):
+    # `rows` holds every trove ever appended, by id; `ids` the id in each slot
+    n = len(troves)
+    assert len(ids) == n and len(set(ids)) == n
+    for k, name in enumerate(COLUMNS):
+        np.testing.assert_array_equal(troves[name], rows[ids, k] if n else np.empty(0))
+    # the CR index holds every slot once, riskiest first, under its current key
+    slots = troves.cr_index.slots
+    np.testing.assert_array_equal(np.sort(slots), np.arange(n))
+    keys = troves['Ether_Quantity'][slots] / troves['Supply'][slots]
+    np.testing.assert_array_equal(troves.cr_index._keys, keys)
+    assert np.all(np.diff(keys) >= 0)
+    # and the band index finds every trove out of its band
+    CR = price * troves['Ether_Quantity'] / troves['Supply']
+    check = (CR - troves['CR_initial']) / (troves['CR_initial'] * troves['Rational_inattention'])
+    candidates = troves.band_index.triggered(troves, price)
+    assert np.all(candidates < n)
+    assert np.isin(np.flatnonzero((check < -1) | (check > 2)), candidates).all()
+
+def append(troves, rows, ids, values):
+    slots = troves.append(**values)
+    new = np.column_stack([values[name] for name in COLUMNS])
+    ids.extend(range(len(rows), len(rows) + len(new)))
+    return np.concatenate([rows, new]), slots
+
+def remove(troves, ids, slots):
+    removed = {ids[slot] for slot in slots}
+    holes, movers = troves.remove(slots)
+    moved = [ids[mover] for mover in movers]
+    for hole, id_ in zip(holes, moved):
+        ids[hole] = id_
+    del ids[len(troves):]
+    assert removed.isdisjoint(ids)
+    return holes, movers
+
+def band_store(capacity):
+    troves = TroveStore(capacity=capacity)
+    troves.band_index = InattentionBandIndex(merge_fraction=1/16, min_troves=0)
+    troves._indexes = [troves.cr_index, troves.band_index]
+    return troves
+
+def test_remove_keeps_columns_and_indexes_consistent():
+    rng = np.random.default_rng(5)
+    troves = band_store(4)
+    rows, ids = np.empty((0, len(COLUMNS))), []
+    price = 1000
+    rows, _ = append(troves, rows, ids, sample_troves(rng, 3, price))
+
+    # the last row: nothing moves
+    holes, movers = remove(troves, ids, [len(troves) - 1])
+    assert len(holes) == len(movers) == 0
+    consistent_store(troves, rows, ids, price)
+
+    # duplicates count once
+    rows, _ = append(troves, rows, ids, sample_troves(rng, 6, price))
+    remove(troves, ids, [0, 0, 2, 2, 0])
+    assert len(troves) == 6
+    consistent_store(troves, rows, ids, price)
+
+    # across the reallocation of the columns when they grow
+    capacity = troves.capacity
+    rows, slots = append(troves, rows, ids, sample_troves(rng, 3 * capacity, price))
+    assert troves.capacity > capacity
+    remove(troves, ids, np.concatenate([slots[:3], slots[-2:], [0]]))
+    consistent_store(troves, rows, ids, price)
+
+    # everything, then an empty store that grows again
+    remove(troves, ids, np.arange(len(troves)))
+    consistent_store(troves, rows, ids, price)
+    rows, _ = append(troves, rows, ids, sample_troves(rng, 5, price))
+    consistent_store(troves, rows, ids, price)
+
+def test_random_removals_keep_columns_and_indexes_consistent():
+    rng = np.random.default_rng(6)
+    troves = band_store(8)
+    rows, ids = np.empty((0, len(COLUMNS))), []
+    price = 1000
+    for step in range(200):
+        rows, _ = append(troves, rows, ids, sample_troves(rng, rng.poisson(4), price))
+        if len(troves):
+            # with repeats, and often the last rows
+            n = len(troves)
+            remove(troves, ids, np.concatenate([rng.integers(0, n, rng.poisson(4)), np.arange(max(0, n - rng.integers(0, 3)), n)]))
+        price *= 1 + rng.normal(0, 0.02)
+        consistent_store(troves, rows, ids, price)
+
+@pytest.fixture
+def backend(request):
+    previous = kernels.backend_name
+    kernels.use(request.param)
+    yield request.param
+    kernels.use(previous)
+
+def rows_of(troves, slots):
+    # the troves as sortable (key, supply) pairs: copies of a trove are interchangeable
+    slots = np.asarray(slots, dtype=np.intp)
+    return sorted(zip(troves['Ether_Quantity'][slots] / troves['Supply'][slots], troves['Supply'][slots]))
+
+def check_cr_index(troves, rng, price):
+    keys = troves['Ether_Quantity'] / troves['Supply']
+    order = np.argsort(keys, kind='stable')
+    np.testing.assert_array_equal(np.sort(troves.cr_index.slots), np.arange(len(troves)))
+    np.testing.assert_array_equal(keys[troves.cr_index.slots], keys[order])
+
+    liquidatable = troves.cr_index.liquidatable(price)
+    np.testing.assert_array_equal(np.sort(liquidatable), np.flatnonzero(keys < 1.1 / price))
+
+    cumulative = np.cumsum(troves['Supply'][order])
+    total = cumulative[-1] if len(troves) else 0.0
+    for amount in (0.0, *rng.uniform(0, 1.2 * total, 4), 2 * total + 1):
+        redeemed, partial, residual = troves.cr_index.redemption(troves, amount)
+        n = int(np.searchsorted(cumulative, amount, side='right'))
+        assert rows_of(troves, redeemed) == rows_of(troves, order[:n])
+        if n < len(troves):
+            assert rows_of(troves, [partial]) == rows_of(troves, order[n:n + 1])
+        else:
+            assert partial is None
+        assert residual == amount - (cumulative[n - 1] if n > 0 else 0.0)
+
+@pytest.mark.parametrize('backend', kernels.backends(), indirect=True)
+def test_cr_index_matches_brute_force(backend):
+    rng = np.random.default_rng(7)
+    troves = TroveStore(capacity=4)
+    price = 1000
+    check_cr_index(troves, rng, price)
+    for step in range(150):
+        troves.append(**sample_troves(rng, rng.poisson(6), price))
+        if len(troves):
+            # ties: exact copies of live troves
+            copies = rng.integers(0, len(troves), rng.poisson(2))
+            troves.append(**{name: troves[name][copies].copy() for name in COLUMNS})
+            troves.remove(rng.integers(0, len(troves), rng.poisson(3)))
+        if len(troves):
+            changed = rng.integers(0, len(troves), rng.poisson(3))
+            troves['Supply'][changed] *= rng.uniform(0.7, 1.3, len(changed))
+            troves.rekey(changed)
+        price *= 1 + rng.normal(0, 0.05)
+        check_cr_index(troves, rng, price)
+
+        # a redemption as price_stabilizer makes it, then the index must follow
+        if len(troves):
+            redeemed, partial, residual = troves.cr_index.redemption(troves, rng.uniform(0, troves['Supply'].sum()))
+            if partial is not None:
+                supply, ether = troves['Supply'][partial], troves['Ether_Quantity'][partial]
+                kernels.redeem_residual(troves['Ether_Quantity'], troves['Supply'], troves['CR_current'], partial, residual, price)
+                assert troves['Supply'][partial] == supply - residual
+                assert troves['Ether_Quantity'][partial] == ether - residual / price
+                assert troves['CR_current'][partial] == price * troves['Ether_Quantity'][partial] / troves['Supply'][partial]
+                troves.rekey([partial])
+            troves.remove(redeemed)
+            check_cr_index(troves, rng, price)
@@ -0,0 +1,306 @@
+"""Columnar trove store for the macro model.
+
+Troves are kept as rows spread over preallocated NumPy columns. Appending
+grows the columns geometrically, so a burst of new troves costs amortized
+O(1) per trove, and removal fills the freed slots with the last rows of the
+store (swap-remove), so it costs O(number of removed troves) instead of
+rebuilding the whole table.
+
+Row order is not stable: removing a trove may move another trove into its
+slot. The ordering by collateral ratio that liquidation and redemption need
+is kept separately, in a CollateralRatioIndex that the store updates on every
+append and removal, and so are the ether price bands that trigger trove
+adjustments (InattentionBandIndex). Phases that change Ether_Quantity or
+Supply in place must call `rekey` on the troves they touched.
+"""
+
+import numpy as np
+
+from . import kernels
+
+COLUMNS = ("Ether_Quantity", "Supply", "CR_initial", "Rational_inattention", "CR_current")
+
+class CollateralRatioIndex:
+    """Troves ordered by nominal collateral ratio, Ether_Quantity/Supply, riskiest first.
+
+    The nominal ratio is the inverse of a trove's liquidation price per unit of
+    minimum collateral ratio, and at a common ether price it orders troves
+    exactly like CR_current. Keys and slots are kept in sorted arrays: inserts
+    are merged in with searchsorted and removals are compressed out, so the
+    population is never re-sorted.
+    """
+
+    def __init__(self):
+        self._keys = np.empty(0)
+        self._slots = np.empty(0, dtype=np.intp)
+
+    def __len__(self):
+        return len(self._slots)
+
+    @property
+    def slots(self):
+        return self._slots
+
+    def insert(self, troves, slots):
+        if len(slots) == 0:
+            return
+        keys = troves['Ether_Quantity'][slots] / troves['Supply'][slots]
+        order = np.argsort(keys, kind='stable')
+        keys, slots = keys[order], np.asarray(slots, dtype=np.intp)[order]
+        positions = np.searchsorted(self._keys, keys, side='right')
+        self._keys = np.insert(self._keys, positions, keys)
+        self._slots = np.insert(self._slots, positions, slots)
+
+    def _drop(self, slots):
+        m = len(slots)
+        if m <= len(self._slots) and np.array_equal(np.sort(self._slots[:m]), slots):
+            # liquidations and redemptions take the riskiest troves, i.e. a prefix
+            self._keys, self._slots = self._keys[m:], self._slots[m:]
+        else:
+            keep = ~np.isin(self._slots, slots, assume_unique=True)
+            self._keys, self._slots = self._keys[keep], self._slots[keep]
+
+    def discard(self, slots, holes, movers, n):
+        """Drops the removed `slots` and follows the troves the store moved from `movers` to `holes`."""
+        if len(slots) == 0:
+            return
+        self._drop(slots)
+        moved = np.flatnonzero(self._slots >= n)
+        if len(moved):
+            self._slots[moved] = holes[np.searchsorted(movers, self._slots[moved])]
+
+    def rekey(self, troves, slots):
+        slots = np.unique(np.asarray(slots, dtype=np.intp))
+        if len(slots) == 0:
+            return
+        self._drop(slots)
+        self.insert(troves, slots)
+
+    def liquidatable(self, price_ether, MCR=1.1):
+        """Slots of the troves whose collateral ratio is below `MCR` at `price_ether`."""
+        return self._slots[:np.searchsorted(self._keys, MCR / price_ether, side='left')]
+
+    def redemption(self, troves, amount):
+        """Walks the riskiest troves until `amount` of debt is covered.
+
+        Returns `(redeemed, partial, residual)`: the slots of the troves redeemed
+        in full, the slot of the trove that covers the residual (or None if the
+        amount exceeds the total debt) and that residual.
+        """
+        n_redeemed, redeemed = kernels.redemption_walk(troves['Supply'], self._slots, amount)
+        partial = self._slots[n_redeemed] if n_redeemed < len(self._slots) else None
+        return self._slots[:n_redeemed], partial, amount - redeemed
+
+def _merge(keys, slots, new_keys, new_slots):
+    if 8 * len(new_keys) > len(keys):
+        keys, slots = np.concatenate([keys, new_keys]), np.concatenate([slots, new_slots])
+        order = np.argsort(keys)
+        return keys[order], slots[order]
+    order = np.argsort(new_keys)
+    positions = np.searchsorted(keys, new_keys[order], side='right')
+    return np.insert(keys, positions, new_keys[order]), np.insert(slots, positions, new_slots[order])
+
+class InattentionBandIndex:
+    """Ether price bands within which the troves stay inattentive.
+
+    A trove adjusts once its collateral ratio leaves
+    [CR_initial*(1-Rational_inattention), CR_initial*(1+2*Rational_inattention)],
+    that is once the ether price leaves the band [lower, upper] given by
+    `band`. The ends of the bands are kept sorted, so the troves a new price
+    has pushed out of their band are a suffix of the lower ends and a prefix
+    of the upper ends. Troves appended, moved or re-keyed since the last merge
+    wait in a pending list that is checked directly, and the slots they or
+    removed troves occupied are marked dirty so that their old entries are
+    skipped; once `merge_fraction` of the troves have changed, the pending
+    bands are merged into the sorted ones in one pass. In quiet hours a query
+    touches the pending troves and those past the price only, not every
+    trove. The bands are widened by a relative `margin`, so the result may
+    hold a few troves still inside their band: callers recheck the exact
+    condition on the candidates. Below `min_troves` troves a query returns
+    every slot, which is cheaper than keeping the bands sorted.
+    """
+
+    def __init__(self, merge_fraction=1/64, margin=1e-9, min_troves=16384):
+        self.merge_fraction = merge_fraction
+        self.margin = margin
+        self.min_troves = min_troves
+        self._sorted = False
+        self._lower = self._upper = np.empty(0)
+        self._lower_slots = self._upper_slots = np.empty(0, dtype=np.intp)
+        self._pending = []
+        self._is_pending = np.zeros(0, dtype=bool)
+        self._dirty = np.zeros(0, dtype=bool)
+        self._changes = 0
+
+    @staticmethod
+    def band(troves, slots):
+        """Lower and upper end of the ether price band of the troves in `slots`."""
+        price_per_ratio = troves['Supply'][slots] / troves['Ether_Quantity'][slots]
+        CR_initial, inattention = troves['CR_initial'][slots], troves['Rational_inattention'][slots]
+        return CR_initial * (1 - inattention) * price_per_ratio, CR_initial * (1 + 2 * inattention) * price_per_ratio
+
+    def _touch(self, slots, pending):
+        if len(slots) == 0:
+            return
+        top = int(np.max(slots)) + 1
+        if top > len(self._dirty):
+            size = max(top, 2 * len(self._dirty))
+            self._dirty = np.concatenate([self._dirty, np.zeros(size - len(self._dirty), dtype=bool)])
+            self._is_pending = np.concatenate([self._is_pending, np.zeros(size - len(self._is_pending), dtype=bool)])
+        self._dirty[slots] = True
+        self._is_pending[slots] = pending
+        if pending:
+            self._pending.append(slots)
+        self._changes += len(slots)
+
+    def _pending_slots(self):
+        # the pending list may repeat slots and hold troves removed since
+        if sum(map(len, self._pending)) > len(self._is_pending) // 8:
+            slots = np.flatnonzero(self._is_pending)
+        else:
+            slots = np.unique(np.concatenate(self._pending)) if self._pending else np.empty(0, dtype=np.intp)
+            slots = slots[self._is_pending[slots]]
+        self._pending = [slots]
+        return slots
+
+    def _clear(self):
+        self._pending = []
+        self._is_pending[:] = False
+        self._dirty[:] = False
+        self._changes = 0
+
+    def _rebuild(self, troves):
+        slots = np.arange(len(troves))
+        lower, upper = self.band(troves, slots)
+        self._lower, self._lower_slots = _merge(np.empty(0), slots[:0], lower, slots)
+        self._upper, self._upper_slots = _merge(np.empty(0), slots[:0], upper, slots)
+        self._clear()
+        self._sorted = True
+
+    def _merge_pending(self, troves):
+        pending = self._pending_slots()
+        keep_lower, keep_upper = ~self._dirty[self._lower_slots], ~self._dirty[self._upper_slots]
+        lower, upper = self.band(troves, pending)
+        self._lower, self._lower_slots = _merge(self._lower[keep_lower], self._lower_slots[keep_lower], lower, pending)
+        self._upper, self._upper_slots = _merge(self._upper[keep_upper], self._upper_slots[keep_upper], upper, pending)
+        self._clear()
+
+    def insert(self, troves, slots):
+        self._touch(np.asarray(slots, dtype=np.intp), True)
+
+    def discard(self, slots, holes, movers, n):
+        self._touch(slots, False)
+        self._touch(movers, False)
+        # the moved troves are looked up under their new slots
+        self._touch(holes, True)
+
+    def rekey(self, troves, slots):
+        self._touch(np.asarray(slots, dtype=np.intp), True)
+
+    def triggered(self, troves, price_ether):
+        """Sorted slots of the troves whose band may not contain `price_ether`."""
+        if len(troves) < self.min_troves:
+            self._clear()
+            self._sorted = False
+            return np.arange(len(troves))
+        if not self._sorted:
+            self._rebuild(troves)
+        elif self._changes > self.merge_fraction * len(troves):
+            self._merge_pending(troves)
+        low, high = price_ether * (1 - self.margin), price_ether * (1 + self.margin)
+        below = self._lower_slots[np.searchsorted(self._lower, low, side='right'):]
+        above = self._upper_slots[:np.searchsorted(self._upper, high, side='left')]
+        pending = self._pending_slots()
+        lower, upper = self.band(troves, pending)
+        return np.unique(np.concatenate([below[~self._dirty[below]], above[~self._dirty[above]],
+                                         pending[(lower > low) | (upper < high)]]))
+
+class TroveStore:
+    def __init__(self, capacity=1024, dtype=np.float64):
+        self._n = 0
+        self._dtype = np.dtype(dtype)
+        self._columns = {name: np.empty(max(1, capacity), dtype=self._dtype) for name in COLUMNS}
+        self.cr_index = CollateralRatioIndex()
+        # the bands of compact columns are rounded to their precision
+        self.band_index = InattentionBandIndex(margin=max(1e-9, 16 * np.finfo(self._dtype).eps))
+        self._indexes = [self.cr_index, self.band_index]
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def capacity(self):
+        return len(self._columns[COLUMNS[0]])
+
+    @property
+    def shape(self):
+        return (self._n, len(COLUMNS))
+
+    def __getitem__(self, name):
+        # a writable view on the live rows, so `troves['Supply'][i] = x` updates the store
+        return self._columns[name][:self._n]
+
+    def __setitem__(self, name, values):
+        self._columns[name][:self._n] = values
+
+    def reserve(self, capacity):
+        if capacity <= self.capacity:
+            return
+        new_capacity = max(capacity, 2 * self.capacity)
+        for name in COLUMNS:
+            column = np.empty(new_capacity, dtype=self._dtype)
+            column[:self._n] = self._columns[name][:self._n]
+            self._columns[name] = column
+
+    def append(self, **values):
+        """Appends one or more troves, given as scalars or equally sized arrays per column.
+
+        Returns the slots of the new troves.
+        """
+        missing = set(COLUMNS) - set(values)
+        if missing:
+            raise ValueError(f"missing trove columns: {sorted(missing)}")
+        count = max(np.size(values[name]) for name in COLUMNS)
+        start = self._n
+        self.reserve(start + count)
+        for name in COLUMNS:
+            self._columns[name][start:start + count] = values[name]
+        self._n = start + count
+        slots = np.arange(start, start + count)
+        for index in self._indexes:
+            index.insert(self, slots)
+        return slots
+
+    def remove(self, slots):
+        """Removes the troves in `slots` by moving the last live rows into the freed slots.
+
+        Returns `(holes, movers)`: the row previously in slot `movers[k]` now lives in slot `holes[k]`.
+        """
+        slots = np.unique(np.asarray(slots, dtype=np.intp))
+        if len(slots) == 0:
+            return slots, slots
+        if slots[0] < 0 or slots[-1] >= self._n:
+            raise IndexError("trove slot out of range")
+        new_n = self._n - len(slots)
+        holes = slots[slots < new_n]
+        tail = np.arange(new_n, self._n)
+        movers = tail[~np.isin(tail, slots, assume_unique=True)]
+        for name in COLUMNS:
+            column = self._columns[name]
+            column[holes] = column[movers]
+        self._n = new_n
+        for index in self._indexes:
+            index.discard(slots, holes, movers, new_n)
+        return holes, movers
+
+    def remove_where(self, mask):
+        return self.remove(np.flatnonzero(mask))
+
+    def rekey(self, slots):
+        """Tells the indexes that the troves in `slots` were changed in place."""
+        for index in self._indexes:
+            index.rekey(self, slots)
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame({name: self[name].copy() for name in COLUMNS})
@@ -0,0 +1 @@
+"""Early market-clearing prototypes of the ZUSD peg: `model` and `model_v2`, each with `run`, `plot` and `main`."""
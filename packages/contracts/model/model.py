@@ -1,5 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
 
 
 
@@ -69,7 +68,7 @@ def get_new_redeemed_amount(data, params):
         return max(redeemed, max_redeemable)
 
 # Decay base fee correctly
-def get_new_base_fee(data, redeemed_amount):
+def get_new_base_fee(data, params, redeemed_amount):
     if data.token_supply[-1] == 0:
         return 0
 
@@ -163,85 +162,100 @@ def sublinear_ETH_price(last_price, steepness, i):
 
 # ### Script
 
-params = ModelParams() 
-data = Data() # initialize data timeseries
-
-for i in range(1, 100):
-    # update exogenous ETH price
-    last_ETH_price =  data.ETH_price[-1]
-
-    # ETH_price = last_ETH_price
-    # ETH_price = randomwalk_ETH_price(last_ETH_price)
-    # ETH_price = oscillating_ETH_price(500, 10, i)
-    # ETH_price = quadratic_ETH_price(10, i)
-    # ETH_price = linear_increasing_ETH_price(last_ETH_price, 100)
-    # ETH_price = linear_decreasing_ETH_price(last_ETH_price, 1)
-    ETH_price = sublinear_ETH_price(last_ETH_price, 10, i)
+def run(params=None, steps=100, verbose=False):
+    """Runs the model for `steps` steps and returns its time series; `verbose` prints every step."""
+    params = params or ModelParams()
+    data = Data() # initialize data timeseries
+
+    for i in range(1, steps):
+        # update exogenous ETH price
+        last_ETH_price =  data.ETH_price[-1]
+
+        # ETH_price = last_ETH_price
+        # ETH_price = randomwalk_ETH_price(last_ETH_price)
+        # ETH_price = oscillating_ETH_price(500, 10, i)
+        # ETH_price = quadratic_ETH_price(10, i)
+        # ETH_price = linear_increasing_ETH_price(last_ETH_price, 100)
+        # ETH_price = linear_decreasing_ETH_price(last_ETH_price, 1)
+        ETH_price = sublinear_ETH_price(last_ETH_price, 10, i)
     
-    # print(ETH_price)
+        # print(ETH_price)
 
-    momentum = get_new_momentum(data, params, ETH_price)
-    redeemed_amount = get_new_redeemed_amount(data, params)
-    base_fee = get_new_base_fee(data, redeemed_amount)
+        momentum = get_new_momentum(data, params, ETH_price)
+        redeemed_amount = get_new_redeemed_amount(data, params)
+        base_fee = get_new_base_fee(data, params, redeemed_amount)
 
-    data.innate_token_demand = get_innate_token_demand()
+        data.innate_token_demand = get_innate_token_demand()
 
-    # clear the market
-    token_price = get_new_token_price(data, params, redeemed_amount, momentum)
+        # clear the market
+        token_price = get_new_token_price(data, params, redeemed_amount, momentum)
 
-    token_demand = get_new_token_demand(data, params, token_price, momentum)
-    trove_issuance = get_new_trove_issuance(data, params, token_price, momentum)
-    token_supply = get_new_token_supply(trove_issuance, redeemed_amount)
+        token_demand = get_new_token_demand(data, params, token_price, momentum)
+        trove_issuance = get_new_trove_issuance(data, params, token_price, momentum)
+        token_supply = get_new_token_supply(trove_issuance, redeemed_amount)
     
-    # display all new data
-    print(f'step: {i}')
-    print(f'ETH price: {ETH_price}')
-    print(f'momentum: {momentum}')
-    print(f'redeemed amount: {redeemed_amount}')
-    print(f'base fee: {base_fee}')
-    print(f'token price: {token_price}')
-    print(f'token demand: {token_demand}')
-    print(f'trove_issuance: {trove_issuance}')
-    print(f'token_supply: {token_supply}')
-
-    # update all time series
-    data.ETH_price.append(ETH_price)
-    data.momentum.append(momentum)
-    data.redeemed_amount.append(redeemed_amount)
-    data.base_fee.append(base_fee)
-    data.token_price.append(token_price)
-    data.token_demand.append(token_demand)
-    data.trove_issuance.append(trove_issuance)
-    data.token_supply.append(token_supply)
-
-# print(f'length redeemed amt is  + {len(data.redeemed_amount)}')
-# print(*data.redeemed_amount)
-# print(*data.base_fee)
-# print(*data.token_price)
-# print(*data.momentum)
-
-# Plot results
-
-fig = plt.figure()
-ax1 = fig.add_subplot(221)
-ax1.set_title('Token price')
-plt.plot(data.token_price)
-
-ax2 = fig.add_subplot(222)
-ax2.set_title('Redeemed amount')
-plt.plot(data.redeemed_amount)
-
-ax3 = fig.add_subplot(223)
-ax3.set_title('ETH Price')
-plt.plot(data.ETH_price)
-
-ax4 = fig.add_subplot(224)
-ax4.set_title('Base Fee')
-plt.plot(data.base_fee)
-
-
-# plt.plot(data.momentum)
-# plt.plot(data.token_demand)
-
-
-plt.show()
\ No newline at end of file
+        # display all new data
+        if verbose:
+            print(f'step: {i}')
+            print(f'ETH price: {ETH_price}')
+            print(f'momentum: {momentum}')
+            print(f'redeemed amount: {redeemed_amount}')
+            print(f'base fee: {base_fee}')
+            print(f'token price: {token_price}')
+            print(f'token demand: {token_demand}')
+            print(f'trove_issuance: {trove_issuance}')
+            print(f'token_supply: {token_supply}')
+
+        # update all time series
+        data.ETH_price.append(ETH_price)
+        data.momentum.append(momentum)
+        data.redeemed_amount.append(redeemed_amount)
+        data.base_fee.append(base_fee)
+        data.token_price.append(token_price)
+        data.token_demand.append(token_demand)
+        data.trove_issuance.append(trove_issuance)
+        data.token_supply.append(token_supply)
+
+    # print(f'length redeemed amt is  + {len(data.redeemed_amount)}')
+    # print(*data.redeemed_amount)
+    # print(*data.base_fee)
+    # print(*data.token_price)
+    # print(*data.momentum)
+    return data
+
+def plot(data, params):
+    import matplotlib.pyplot as plt
+
+    # Plot results
+    fig = plt.figure()
+    ax1 = fig.add_subplot(221)
+    ax1.set_title('Token price')
+    plt.plot(data.token_price)
+
+    ax2 = fig.add_subplot(222)
+    ax2.set_title('Redeemed amount')
+    plt.plot(data.redeemed_amount)
+
+    ax3 = fig.add_subplot(223)
+    ax3.set_title('ETH Price')
+    plt.plot(data.ETH_price)
+
+    ax4 = fig.add_subplot(224)
+    ax4.set_title('Base Fee')
+    plt.plot(data.base_fee)
+
+
+    # plt.plot(data.momentum)
+    # plt.plot(data.token_demand)
+    return fig
+
+def main():
+    import matplotlib.pyplot as plt
+
+    params = ModelParams()
+    data = run(params, verbose=True)
+    plot(data, params)
+    plt.show()
+
+if __name__ == '__main__':
+    main()
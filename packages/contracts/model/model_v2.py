@@ -1,5 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
 
 # model parameters
 class ModelParams:
@@ -64,7 +63,7 @@ def get_new_redeemed_amount(data, params):
        
 
 # Decay base fee correctly
-def get_new_base_fee(data, redeemed_amount):
+def get_new_base_fee(data, params, redeemed_amount):
     if data.token_supply[-1] == 0:
         return 0
 
@@ -167,94 +166,110 @@ def sublinear_ETH_price(last_price, steepness, i):
     
 # ### Script
 
-# Initialize model parameters and data timeseries
-params = ModelParams() 
-data = Data()
-
-# Run the model
-for i in range(1, 250):
-    last_ETH_price =  data.ETH_price[-1]
-
-    # update exogenous ETH price
-
-    # ETH_price = last_ETH_price
-    ETH_price = randomwalk_ETH_price(last_ETH_price)
-    # ETH_price = oscillating_ETH_price(500, 100, i)
-    # ETH_price = quadratic_ETH_price(500, 10, i)
-    # ETH_price = linear_increasing_ETH_price(last_ETH_price, 3)
-    # ETH_price = linear_decreasing_ETH_price(800, 1, i)
-    # ETH_price = one_over_i_ETH_price(1000, i)
-    # ETH_price = sublinear_ETH_price(last_ETH_price, 10, i)
+def run(params=None, steps=250, verbose=False):
+    """Runs the model for `steps` steps and returns its time series; `verbose` prints every step."""
+    # Initialize model parameters and data timeseries
+    params = params or ModelParams()
+    data = Data()
+
+    # Run the model
+    for i in range(1, steps):
+        last_ETH_price =  data.ETH_price[-1]
+
+        # update exogenous ETH price
+
+        # ETH_price = last_ETH_price
+        ETH_price = randomwalk_ETH_price(last_ETH_price)
+        # ETH_price = oscillating_ETH_price(500, 100, i)
+        # ETH_price = quadratic_ETH_price(500, 10, i)
+        # ETH_price = linear_increasing_ETH_price(last_ETH_price, 3)
+        # ETH_price = linear_decreasing_ETH_price(800, 1, i)
+        # ETH_price = one_over_i_ETH_price(1000, i)
+        # ETH_price = sublinear_ETH_price(last_ETH_price, 10, i)
     
-    momentum = get_new_momentum(data, params, ETH_price)
-    redeemed_amount = get_new_redeemed_amount(data, params)
-    base_fee = get_new_base_fee(data, redeemed_amount)
+        momentum = get_new_momentum(data, params, ETH_price)
+        redeemed_amount = get_new_redeemed_amount(data, params)
+        base_fee = get_new_base_fee(data, params, redeemed_amount)
 
-    data.token_demand = get_token_demand()
+        data.token_demand = get_token_demand()
 
-    # clear the market
-    token_price = get_new_token_price(data, params, redeemed_amount, momentum)
-    token_demand = get_new_token_demand(data, params, token_price, momentum)
-    trove_issuance = get_new_trove_issuance(data, params, token_price, momentum)
-    token_supply = get_new_token_supply(trove_issuance, redeemed_amount)
+        # clear the market
+        token_price = get_new_token_price(data, params, redeemed_amount, momentum)
+        token_demand = get_new_token_demand(data, params, token_price, momentum)
+        trove_issuance = get_new_trove_issuance(data, params, token_price, momentum)
+        token_supply = get_new_token_supply(trove_issuance, redeemed_amount)
     
-    # if price > 1.1, correct it via the price ceiling and QTM
-    excess_issuance = get_excess_issuance(token_price, token_supply)
+        # if price > 1.1, correct it via the price ceiling and QTM
+        excess_issuance = get_excess_issuance(token_price, token_supply)
     
-    if token_price > 1.1:
-        token_price = 1.1
+        if token_price > 1.1:
+            token_price = 1.1
 
-    trove_issuance = trove_issuance + excess_issuance
-    token_supply = get_new_token_supply(trove_issuance, 0)
+        trove_issuance = trove_issuance + excess_issuance
+        token_supply = get_new_token_supply(trove_issuance, 0)
     
-    # Log all new values
-    print(f'step: {i}')
-    print(f'ETH price: {ETH_price}')
-    print(f'momentum: {momentum}')
-    print(f'redeemed amount: {redeemed_amount}')
-    print(f'base fee: {base_fee}')
-    print(f'token price: {token_price}')
-    print(f'token demand: {token_demand}')
-    print(f'trove_issuance: {trove_issuance}')
-    print(f'token_supply: {token_supply}')
-
-    # update all timeseries arrays
-    data.ETH_price.append(ETH_price)
-    data.momentum.append(momentum)
-    data.redeemed_amount.append(redeemed_amount)
-    data.base_fee.append(base_fee)
-    data.token_price.append(token_price)
-    data.token_demand = token_demand
-    data.trove_issuance.append(trove_issuance)
-    data.token_supply.append(token_supply)
-
-### Graph the results
-
-fig = plt.figure()
-ax1 = fig.add_subplot(221)
-ax1.set_title('Token price')
-plt.ylim(0.0, 1.5)
-plt.plot(data.token_price)
-
-ax2 = fig.add_subplot(222)
-ax2.set_title('Redeemed amount')
-plt.ylim(0.0, 10)
-plt.plot(data.redeemed_amount)
-
-ax3 = fig.add_subplot(223)
-ax3.set_title('ETH Price')
-plt.ylim(0, 1000)
-plt.plot(data.ETH_price)
-
-ax4 = fig.add_subplot(224)
-ax4.set_title('Base fee')
-plt.ylim(0.0, 0.05)
-plt.plot(data.base_fee)
-
-# plt.plot(data.momentum)
-# plt.plot(data.token_demand)
-
-params_string = f'Parameters:  D={params.D}  T={params.T}  F={params.F}  L={params.lookback}  r_max={params.max_redemption_fraction}'
-plt.figtext(0.5, 0.05, params_string, ha="center", fontsize=10)
-
-plt.show()
\ No newline at end of file
+        # Log all new values
+        if verbose:
+            print(f'step: {i}')
+            print(f'ETH price: {ETH_price}')
+            print(f'momentum: {momentum}')
+            print(f'redeemed amount: {redeemed_amount}')
+            print(f'base fee: {base_fee}')
+            print(f'token price: {token_price}')
+            print(f'token demand: {token_demand}')
+            print(f'trove_issuance: {trove_issuance}')
+            print(f'token_supply: {token_supply}')
+
+        # update all timeseries arrays
+        data.ETH_price.append(ETH_price)
+        data.momentum.append(momentum)
+        data.redeemed_amount.append(redeemed_amount)
+        data.base_fee.append(base_fee)
+        data.token_price.append(token_price)
+        data.token_demand = token_demand
+        data.trove_issuance.append(trove_issuance)
+        data.token_supply.append(token_supply)
+    return data
+
+def plot(data, params):
+    import matplotlib.pyplot as plt
+
+    ### Graph the results
+    fig = plt.figure()
+    ax1 = fig.add_subplot(221)
+    ax1.set_title('Token price')
+    plt.ylim(0.0, 1.5)
+    plt.plot(data.token_price)
+
+    ax2 = fig.add_subplot(222)
+    ax2.set_title('Redeemed amount')
+    plt.ylim(0.0, 10)
+    plt.plot(data.redeemed_amount)
+
+    ax3 = fig.add_subplot(223)
+    ax3.set_title('ETH Price')
+    plt.ylim(0, 1000)
+    plt.plot(data.ETH_price)
+
+    ax4 = fig.add_subplot(224)
+    ax4.set_title('Base fee')
+    plt.ylim(0.0, 0.05)
+    plt.plot(data.base_fee)
+
+    # plt.plot(data.momentum)
+    # plt.plot(data.token_demand)
+
+    params_string = f'Parameters:  D={params.D}  T={params.T}  F={params.F}  L={params.lookback}  r_max={params.max_redemption_fraction}'
+    plt.figtext(0.5, 0.05, params_string, ha="center", fontsize=10)
+    return fig
+
+def main():
+    import matplotlib.pyplot as plt
+
+    params = ModelParams()
+    data = run(params, verbose=True)
+    plot(data, params)
+    plt.show()
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,7 @@
 from brownie import Wei
 
+from multicall import MulticallReader
+
 ZERO_ADDRESS = '0x' + '0'.zfill(40)
 MAX_BYTES_32 = '0x' + 'F' * 64
 
@@ -11,38 +13,53 @@ def get_zusd_amount_from_net_debt(contracts, net_debt):
     borrowing_rate = contracts.troveManager.getBorrowingRateWithDecay()
     return Wei(net_debt * Wei(1e18) / (Wei(1e18) + borrowing_rate))
 
-def logGlobalState(contracts):
+def logGlobalState(contracts, reader=None):
     print('\n ---- Global state ----')
-    num_troves = contracts.sortedTroves.getSize()
+    reader = reader or MulticallReader(contracts.multicall)
+    state = reader.read({
+        'num_troves': (contracts.sortedTroves.getSize,),
+        'activePoolColl': (contracts.activePool.getETH,),
+        'activePoolDebt': (contracts.activePool.getZUSDDebt,),
+        'defaultPoolColl': (contracts.defaultPool.getETH,),
+        'defaultPoolDebt': (contracts.defaultPool.getZUSDDebt,),
+        'SP_ZUSD': (contracts.stabilityPool.getTotalZUSDDeposits,),
+        'SP_ETH': (contracts.stabilityPool.getETH,),
+        'price': (contracts.priceFeedTestnet.getPrice,),
+        'stakes_snapshot': (contracts.troveManager.totalStakesSnapshot,),
+        'coll_snapshot': (contracts.troveManager.totalCollateralSnapshot,),
+        'last_trove': (contracts.sortedTroves.getLast,),
+    })
+    price_ether_current = state['price']
+    # the calls taking the price or the last trove
+    state.update(reader.read({
+        'TCR': (contracts.troveManager.getTCR, price_ether_current),
+        'recovery_mode': (contracts.troveManager.checkRecoveryMode, price_ether_current),
+        'last_ICR': (contracts.troveManager.getCurrentICR, state['last_trove'], price_ether_current),
+    }))
+    num_troves = state['num_troves']
     print('Num troves      ', num_troves)
-    activePoolColl = contracts.activePool.getETH()
-    activePoolDebt = contracts.activePool.getZUSDDebt()
-    defaultPoolColl = contracts.defaultPool.getETH()
-    defaultPoolDebt = contracts.defaultPool.getZUSDDebt()
-    total_debt = (activePoolDebt + defaultPoolDebt).to("ether")
-    total_coll = (activePoolColl + defaultPoolColl).to("ether")
+    total_debt = (state['activePoolDebt'] + state['defaultPoolDebt']).to("ether")
+    total_coll = (state['activePoolColl'] + state['defaultPoolColl']).to("ether")
     print('Total Debt      ', total_debt)
     print('Total Coll      ', total_coll)
-    SP_ZUSD = contracts.stabilityPool.getTotalZUSDDeposits().to("ether")
-    SP_ETH = contracts.stabilityPool.getETH().to("ether")
+    SP_ZUSD = state['SP_ZUSD'].to("ether")
+    SP_ETH = state['SP_ETH'].to("ether")
     print('SP ZUSD         ', SP_ZUSD)
     print('SP ETH          ', SP_ETH)
-    price_ether_current = contracts.priceFeedTestnet.getPrice()
     ETH_price = price_ether_current.to("ether")
     print('ETH price       ', ETH_price)
-    TCR = contracts.troveManager.getTCR(price_ether_current).to("ether")
+    TCR = state['TCR'].to("ether")
     print('TCR             ', TCR)
-    recovery_mode = contracts.troveManager.checkRecoveryMode(price_ether_current)
+    recovery_mode = state['recovery_mode']
     print('Rec. Mode       ', recovery_mode)
-    stakes_snapshot = contracts.troveManager.totalStakesSnapshot()
-    coll_snapshot = contracts.troveManager.totalCollateralSnapshot()
+    stakes_snapshot = state['stakes_snapshot']
+    coll_snapshot = state['coll_snapshot']
     print('Stake snapshot  ', stakes_snapshot.to("ether"))
     print('Coll snapshot   ', coll_snapshot.to("ether"))
     if stakes_snapshot > 0:
         print('Snapshot ratio  ', coll_snapshot / stakes_snapshot)
-    last_trove = contracts.sortedTroves.getLast()
-    last_ICR = contracts.troveManager.getCurrentICR(last_trove, price_ether_current).to("ether")
-    #print('Last trove      ', last_trove)
+    last_ICR = state['last_ICR'].to("ether")
+    #print('Last trove      ', state['last_trove'])
     print('Last trove’s ICR', last_ICR)
     print(' ----------------------\n')
 
@@ -0,0 +1,87 @@
+"""Gas of SortedTroves inserts with the hints of the shadow trove state.
+
+The simulation used to ask the node for hints: computeNominalCR, then
+findInsertPosition from a neighbour found by bisecting the target CRs of the
+troves (or from getApproxHint), for a NICR computed without the gas
+compensation and the borrowing fee -- so the hints pointed near, not at, the
+insert position and SortedTroves walked the rest of the list. The shadow
+state finds the exact position without requests.
+
+With 100, 500 and 1000 troves open, estimates the gas of opening a sample of
+new troves with no hints, with the hints found as before and with the
+shadow's hints, and checks the shadow's are valid insert positions:
+
+    ZERO_SIM_BENCHMARK=1 brownie test tests-py/hints_benchmark_test.py -s
+
+The medians are printed and written to tests/hints_benchmark.csv.
+"""
+
+import csv
+import os
+import statistics
+
+import numpy as np
+import pytest
+
+from brownie import *
+from helpers import *
+from simulation_helpers import *
+from simulation_test import contracts
+
+TROVES = [int(n) for n in os.environ.get('ZERO_SIM_BENCHMARK_TROVES', '100,500,1000').split(',')]
+SAMPLE = 20
+
+pytestmark = pytest.mark.skipif(not os.environ.get('ZERO_SIM_BENCHMARK'), reason="set ZERO_SIM_BENCHMARK=1 to run")
+
+def random_trove(rng):
+    debt = MIN_NET_DEBT * (1 + rng.gamma(2.0))
+    coll = (1.5 + rng.chisquare(4) / 4) * debt / price_ether[0]
+    return coll, debt
+
+def chain_hints(contracts, coll, debt):
+    # as the simulation found hints before, from the NICR of the net debt
+    NICR = contracts.hintHelpers.computeNominalCR(floatToWei(coll), floatToWei(debt))
+    approxHint = contracts.hintHelpers.getApproxHint(NICR, 100, 0)
+    return contracts.sortedTroves.findInsertPosition(NICR, approxHint[0], approxHint[0])
+
+def test_insert_gas(contracts):
+    rng = np.random.default_rng(seed)
+    price = floatToWei(price_ether[0])
+    shadow = ShadowTroves(contracts)
+    contracts.priceFeedTestnet.setPrice(price, { 'from': accounts[0] })
+    contracts.borrowerOperations.openTrove(MAX_FEE, Wei(10e24), ZERO_ADDRESS, ZERO_ADDRESS,
+                                           { 'from': accounts[0], 'value': floatToWei(30000.0) })
+
+    rows = []
+    n_open = 0
+    for n_troves in TROVES:
+        # the sample opens from the last accounts
+        n_troves = min(n_troves, len(accounts) - 1 - SAMPLE)
+        while n_open < n_troves:
+            coll, debt = random_trove(rng)
+            hints = get_hints(shadow, floatToWei(coll), floatToWei(debt) + shadow.gas_compensation)
+            contracts.borrowerOperations.openTrove(MAX_FEE, get_zusd_amount_from_net_debt(contracts, floatToWei(debt)), hints[0], hints[1],
+                                                   { 'from': accounts[n_open + 1], 'value': floatToWei(coll) })
+            n_open += 1
+        assert shadow.check(contracts, [], price, tail=len(shadow)) == []
+
+        gas = {'none': [], 'chain': [], 'shadow': []}
+        for k in range(SAMPLE):
+            coll, debt = random_trove(rng)
+            zusd = get_zusd_amount_from_net_debt(contracts, floatToWei(debt))
+            fee = contracts.troveManager.getBorrowingFee(zusd)
+            NICR = nominal_CR(floatToWei(coll), zusd + fee + shadow.gas_compensation)
+            hints = {'none': (ZERO_ADDRESS, ZERO_ADDRESS), 'chain': chain_hints(contracts, coll, debt),
+                     'shadow': get_hints(shadow, floatToWei(coll), zusd + fee + shadow.gas_compensation)}
+            assert contracts.sortedTroves.validInsertPosition(NICR, *hints['shadow'])
+            for name, (upper, lower) in hints.items():
+                gas[name].append(contracts.borrowerOperations.openTrove.estimate_gas(
+                    MAX_FEE, zusd, upper, lower, { 'from': accounts[len(accounts) - 1 - k], 'value': floatToWei(coll) }))
+        for name, used in gas.items():
+            rows.append({'troves': n_troves, 'hints': name, 'gas': statistics.median(used)})
+            print(f"{n_troves:>6} troves {name:>8} hints: {rows[-1]['gas']:>9.0f} gas")
+
+    with open('tests/hints_benchmark.csv', 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
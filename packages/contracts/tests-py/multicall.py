@@ -0,0 +1,40 @@
+"""Batched view calls of the chain simulation, through the Multicall test contract.
+
+Each view call brownie makes is a JSON-RPC request to the node; the
+simulation reads the pools, the balances of many accounts and the state of
+the system several times an hour. A Multicall resolves a whole group of
+view calls in one eth_call:
+
+    multicall = MulticallReader(contracts.multicall)
+    balances = multicall.call([(contracts.zusdToken.balanceOf, a) for a in addresses])
+    state = multicall.read({'TCR': (contracts.troveManager.getTCR, price), 'SP_ZUSD': (contracts.stabilityPool.getTotalZUSDDeposits,)})
+
+A call is a bound brownie view method followed by its arguments; the
+results are decoded as brownie returns them (uints as Wei, structs as
+tuples). A group larger than `chunk` calls is split over several
+eth_calls, so each stays within the block gas limit. Loops that may stop early read balances lazily, a chunk
+at a time (`balances`).
+"""
+
+class MulticallReader:
+    def __init__(self, contract, chunk=200):
+        self.contract = contract
+        self.chunk = chunk
+
+    def call(self, calls):
+        """Results of the view `calls` [(method, *args), ...], in order."""
+        results = []
+        for start in range(0, len(calls), self.chunk):
+            group = calls[start:start + self.chunk]
+            _, data = self.contract.aggregate([(method._address, method.encode_input(*args)) for method, *args in group])
+            results.extend(method.decode_output(output) for (method, *_), output in zip(group, data))
+        return results
+
+    def read(self, calls):
+        """Results of the named view `calls` {name: (method, *args)}, by name."""
+        return dict(zip(calls, self.call(list(calls.values()))))
+
+    def balances(self, token, addresses):
+        """Iterator over the `token` balances of `addresses`, read one chunk at a time as it is consumed."""
+        for start in range(0, len(addresses), self.chunk):
+            yield from self.call([(token.balanceOf, address) for address in addresses[start:start + self.chunk]])
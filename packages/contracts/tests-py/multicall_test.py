@@ -0,0 +1,44 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from multicall import MulticallReader
+
+class View:
+    """A brownie view method of a fake contract: encodes its arguments, decodes by calling `function`."""
+    def __init__(self, address, function):
+        self._address = address
+        self.function = function
+
+    def encode_input(self, *args):
+        return (self, args)
+
+    def decode_output(self, output):
+        return output
+
+class Aggregator:
+    def __init__(self):
+        self.requests = 0
+
+    def aggregate(self, calls):
+        self.requests += 1
+        return 0, [method.function(*args) for _, (method, args) in calls]
+
+def test_calls_are_resolved_in_order_and_chunked():
+    aggregator = Aggregator()
+    multicall = MulticallReader(aggregator, chunk=3)
+    double = View('0x1', lambda x: 2 * x)
+    total = View('0x2', lambda: 7)
+    assert multicall.call([(double, i) for i in range(5)] + [(total,)]) == [0, 2, 4, 6, 8, 7]
+    assert aggregator.requests == 2
+    assert multicall.read({'total': (total,), 'double': (double, 4)}) == {'total': 7, 'double': 8}
+    assert aggregator.requests == 3
+
+def test_balances_are_read_lazily():
+    aggregator = Aggregator()
+    multicall = MulticallReader(aggregator, chunk=2)
+    token = type('Token', (), {'balanceOf': View('0x3', lambda address: len(address))})()
+    balances = multicall.balances(token, ['a', 'bb', 'ccc', 'dddd', 'eeeee'])
+    assert aggregator.requests == 0
+    assert [next(balances) for _ in range(3)] == [1, 2, 3]
+    assert aggregator.requests == 2
@@ -0,0 +1,58 @@
+"""The redemption hints of the shadow trove state against HintHelpers.
+
+Opens troves, redistributes a few liquidations so the others carry pending
+rewards, then compares ShadowTroves.redemption_hints with
+getRedemptionHints for a range of amounts and iteration limits, and redeems
+with the shadow's hints: the partial redemption must go through and leave
+the shadow in step with SortedTroves.
+
+    brownie test tests-py/redemption_hints_test.py
+"""
+
+import numpy as np
+
+from brownie import *
+from helpers import *
+from simulation_helpers import *
+from simulation_test import contracts
+
+N_TROVES = 60
+
+def test_redemption_hints_match_hint_helpers(contracts):
+    rng = np.random.default_rng(seed)
+    price = floatToWei(price_ether[0])
+    shadow = ShadowTroves(contracts)
+    contracts.priceFeedTestnet.setPrice(price, { 'from': accounts[0] })
+    contracts.borrowerOperations.openTrove(MAX_FEE, Wei(1e24), ZERO_ADDRESS, ZERO_ADDRESS,
+                                           { 'from': accounts[0], 'value': floatToWei(30000.0) })
+    for i in range(1, N_TROVES + 1):
+        debt = MIN_NET_DEBT * (1 + rng.gamma(2.0))
+        # a few troves close to the MCR, liquidated when the price drops
+        CR = 1.15 if i % 10 == 0 else 1.5 + rng.chisquare(4) / 4
+        coll = CR * debt / price_ether[0]
+        hints = get_hints(shadow, floatToWei(coll), floatToWei(debt) + shadow.gas_compensation)
+        contracts.borrowerOperations.openTrove(MAX_FEE, get_zusd_amount_from_net_debt(contracts, floatToWei(debt)), hints[0], hints[1],
+                                               { 'from': accounts[i], 'value': floatToWei(coll) })
+
+    # with the stability pool empty, the liquidated troves are redistributed
+    contracts.priceFeedTestnet.setPrice(price * 95 // 100, { 'from': accounts[0] })
+    contracts.troveManager.liquidateTroves(N_TROVES, { 'from': accounts[0] })
+    contracts.priceFeedTestnet.setPrice(price, { 'from': accounts[0] })
+    assert shadow.L_ETH > 0
+    assert shadow.check(contracts, [], price, tail=len(shadow)) == []
+
+    for amount in (1e18, 500e18, 2500e18, 20000e18, 200000e18):
+        for max_iterations in (0, 1, 5, 70):
+            expected = contracts.hintHelpers.getRedemptionHints(Wei(amount), price, max_iterations)
+            assert shadow.redemption_hints(Wei(amount), price, max_iterations)[:3] == tuple(expected)
+
+    chain.sleep(contracts.troveManager.BOOTSTRAP_PERIOD() + 1)
+    chain.mine()
+    amount = Wei(7000e18)
+    first, NICR, truncated, upper, lower = shadow.redemption_hints(amount, price, 70)
+    assert 0 < truncated <= amount and NICR > 0
+    tx = contracts.troveManager.redeemCollateral(truncated, first, upper, lower, NICR, 70, MAX_FEE, { 'from': accounts[0] })
+    # the last trove redeemed from is the partial one, reinserted at the hinted NICR
+    partial = [event for event in tx.events['TroveUpdated'] if event['_debt'] > 0][-1]['_borrower']
+    assert contracts.troveManager.getNominalICR(partial) == NICR
+    assert shadow.check(contracts, [partial], price, tail=len(shadow)) == []
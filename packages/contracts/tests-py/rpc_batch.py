@@ -0,0 +1,167 @@
+"""JSON-RPC transport of the chain simulation: persistent connection and batches.
+
+web3 sends every request of the simulation on its own, and brownie reads
+one value per request. An RpcTransport keeps one connection to the local
+node open -- a keep-alive HTTP session, or the node's IPC socket for a path
+ending in `.ipc` -- and can send a list of requests as one JSON-RPC batch
+array, answered in one round trip:
+
+    transport = use_transport(web3, os.environ.get('ZERO_SIM_RPC'))
+    reader = BatchReader(transport)
+    balances = reader.call([(contracts.zusdToken.balanceOf, a) for a in addresses])
+
+`use_transport` also routes brownie's own requests through the transport,
+keeping the web3 middlewares (the RpcCounter of the profiler counts a batch
+as one request, under 'batch'). BatchReader has the interface of
+MulticallReader, with eth_calls batched on the wire instead of aggregated by
+a contract: no deployment is needed and a failing call raises an RpcError
+naming its method, where a reverted aggregate does not tell which call
+failed, but the node still executes one call per read. DirectReader makes
+the same reads one request at a time, as brownie does.
+"""
+
+import itertools
+import json
+import socket
+import time
+
+import requests
+from web3.providers.base import BaseProvider
+
+class RpcError(Exception):
+    pass
+
+class RpcTransport:
+    def __init__(self, uri, timeout=60):
+        self.uri = uri
+        self.timeout = timeout
+        self.counter = None
+        self._ids = itertools.count(1)
+        if uri.endswith('.ipc'):
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.settimeout(timeout)
+            self._socket.connect(uri)
+            self._decoder = json.JSONDecoder()
+            self._session = None
+        else:
+            self._socket = None
+            self._session = requests.Session()
+            self._session.headers.update({'Content-Type': 'application/json'})
+
+    def _message(self, method, params):
+        return {'jsonrpc': '2.0', 'id': next(self._ids), 'method': method, 'params': params}
+
+    def _send(self, payload):
+        if self._session is not None:
+            response = self._session.post(self.uri, data=json.dumps(payload), timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        self._socket.sendall(json.dumps(payload).encode())
+        # bytes until parsed: a chunk may end inside a multi-byte character
+        buffer = b''
+        while True:
+            chunk = self._socket.recv(1 << 16)
+            if not chunk:
+                raise ConnectionError(f"{self.uri} closed the connection")
+            buffer += chunk
+            try:
+                return self._decoder.decode(buffer.decode())
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                continue
+
+    def send(self, method, params):
+        """The response (a dict with `result` or `error`) of one request."""
+        return self._send(self._message(method, params))
+
+    def batch(self, calls):
+        """Results of the requests `calls` [(method, params), ...], sent as one batch; raises RpcError on any error."""
+        if not calls:
+            return []
+        messages = [self._message(method, params) for method, params in calls]
+        start = time.perf_counter()
+        responses = self._send(messages)
+        if self.counter is not None:
+            self.counter.record('batch', time.perf_counter() - start)
+        if isinstance(responses, dict):
+            # the node rejected the batch as a whole
+            raise RpcError(responses.get('error'))
+        # the responses of a batch may come in any order
+        by_id = {response['id']: response for response in responses}
+        results = []
+        for message in messages:
+            response = by_id[message['id']]
+            if 'error' in response:
+                raise RpcError(f"{message['method']}: {response['error']}")
+            results.append(response['result'])
+        return results
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+        else:
+            self._socket.close()
+
+class TransportProvider(BaseProvider):
+    """web3 provider sending the requests of brownie through an RpcTransport."""
+
+    def __init__(self, transport):
+        super().__init__()
+        self.transport = transport
+        self.endpoint_uri = transport.uri
+
+    def make_request(self, method, params):
+        return self.transport.send(method, params)
+
+    def isConnected(self):
+        try:
+            return 'result' in self.transport.send('web3_clientVersion', [])
+        except (OSError, requests.RequestException, ValueError):
+            return False
+
+    is_connected = isConnected
+
+def use_transport(web3, uri=None):
+    """Routes the requests of `web3` through an RpcTransport to `uri` (by default, the current endpoint); returns it."""
+    if isinstance(web3.provider, TransportProvider) and uri in (None, web3.provider.endpoint_uri):
+        return web3.provider.transport
+    transport = RpcTransport(uri or web3.provider.endpoint_uri)
+    web3.provider = TransportProvider(transport)
+    return transport
+
+class BatchReader:
+    def __init__(self, transport, chunk=500, block='latest'):
+        self.transport = transport
+        self.chunk = chunk
+        self.block = block
+
+    def call(self, calls):
+        """Results of the view `calls` [(method, *args), ...], in order."""
+        results = []
+        for start in range(0, len(calls), self.chunk):
+            group = calls[start:start + self.chunk]
+            outputs = self.transport.batch([
+                ('eth_call', [{'to': method._address, 'data': method.encode_input(*args)}, self.block])
+                for method, *args in group])
+            results.extend(method.decode_output(output) for (method, *_), output in zip(group, outputs))
+        return results
+
+    def read(self, calls):
+        """Results of the named view `calls` {name: (method, *args)}, by name."""
+        return dict(zip(calls, self.call(list(calls.values()))))
+
+    def balances(self, token, addresses):
+        """Iterator over the `token` balances of `addresses`, read one chunk at a time as it is consumed."""
+        for start in range(0, len(addresses), self.chunk):
+            yield from self.call([(token.balanceOf, address) for address in addresses[start:start + self.chunk]])
+
+class DirectReader:
+    """The reads of BatchReader, one request each."""
+
+    def call(self, calls):
+        return [method(*args) for method, *args in calls]
+
+    def read(self, calls):
+        return {name: method(*args) for name, (method, *args) in calls.items()}
+
+    def balances(self, token, addresses):
+        return (token.balanceOf(address) for address in addresses)
@@ -0,0 +1,83 @@
+"""Latency of the reads of a simulation iteration, one request per read vs batched.
+
+With 100, 500 and 1000 active troves (as many as the node has accounts
+for), times the reads an iteration used to make one by one -- the global
+state plus the ICR, debt and collateral, and ZUSD balance of every trove --
+made directly, as JSON-RPC batches and through the Multicall contract.
+Opening the troves takes a while, so the benchmark only runs on request:
+
+    ZERO_SIM_BENCHMARK=1 brownie test tests-py/rpc_benchmark_test.py -s
+
+The medians are printed and written to tests/rpc_benchmark.csv.
+"""
+
+import csv
+import os
+import statistics
+import time
+
+import numpy as np
+import pytest
+
+from brownie import *
+from helpers import *
+from simulation_helpers import *
+from simulation_test import contracts
+
+TROVES = [int(n) for n in os.environ.get('ZERO_SIM_BENCHMARK_TROVES', '100,500,1000').split(',')]
+REPEATS = 5
+
+pytestmark = pytest.mark.skipif(not os.environ.get('ZERO_SIM_BENCHMARK'), reason="set ZERO_SIM_BENCHMARK=1 to run")
+
+def iteration_reads(contracts, troves, price):
+    calls = [(contracts.sortedTroves.getSize,), (contracts.activePool.getETH,), (contracts.activePool.getZUSDDebt,),
+             (contracts.defaultPool.getETH,), (contracts.defaultPool.getZUSDDebt,),
+             (contracts.stabilityPool.getTotalZUSDDeposits,), (contracts.stabilityPool.getETH,),
+             (contracts.priceFeedTestnet.getPrice,), (contracts.troveManager.getTCR, price),
+             (contracts.troveManager.checkRecoveryMode, price), (contracts.sortedTroves.getLast,)]
+    for trove in troves:
+        calls += [(contracts.troveManager.getCurrentICR, trove, price),
+                  (contracts.troveManager.getEntireDebtAndColl, trove),
+                  (contracts.zusdToken.balanceOf, trove)]
+    return calls
+
+def test_read_latency(contracts):
+    rpc = RpcCounter().install(web3)
+    use_transport(web3, RPC).counter = rpc
+    rng = np.random.default_rng(seed)
+    price = floatToWei(price_ether[0])
+    shadow = ShadowTroves(contracts)
+    contracts.priceFeedTestnet.setPrice(price, { 'from': accounts[0] })
+    contracts.borrowerOperations.openTrove(MAX_FEE, Wei(10e24), ZERO_ADDRESS, ZERO_ADDRESS,
+                                           { 'from': accounts[0], 'value': floatToWei(30000.0) })
+
+    rows = []
+    troves = []
+    for n_troves in TROVES:
+        n_troves = min(n_troves, len(accounts) - 1)
+        while len(troves) < n_troves:
+            account = accounts[len(troves) + 1]
+            debt = MIN_NET_DEBT * (1 + rng.gamma(2.0))
+            coll = (1.5 + rng.chisquare(4) / 4) * debt / price_ether[0]
+            hints = get_hints(shadow, floatToWei(coll), floatToWei(debt) + shadow.gas_compensation)
+            contracts.borrowerOperations.openTrove(MAX_FEE, floatToWei(debt), hints[0], hints[1],
+                                                   { 'from': account, 'value': floatToWei(coll) })
+            troves.append(account)
+
+        calls = iteration_reads(contracts, troves, price)
+        for reads in ('direct', 'batch', 'multicall'):
+            reader = view_reader(contracts, reads)
+            seconds = []
+            requests = rpc.requests
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                reader.call(calls)
+                seconds.append(time.perf_counter() - start)
+            rows.append({'troves': n_troves, 'reads': reads, 'calls': len(calls),
+                         'requests': (rpc.requests - requests) // REPEATS, 'seconds': statistics.median(seconds)})
+            print(f"{n_troves:>6} troves {reads:>10}: {len(calls):>5} calls in {rows[-1]['requests']:>5} requests, {rows[-1]['seconds'] * 1000:9.1f} ms")
+
+    with open('tests/rpc_benchmark.csv', 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
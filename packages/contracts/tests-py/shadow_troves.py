@@ -0,0 +1,268 @@
+"""Local shadow of the trove state of the chain simulation.
+
+Reading a trove costs the simulation one JSON-RPC round trip per call
+(`getCurrentICR`, `getEntireDebtAndColl`, `getPrev`, ...), several per trove
+and hour. The shadow keeps, per active trove, the debt, coll and stake
+stored by the TroveManager and the reward snapshots taken with them, plus
+the system's L_ETH and L_ZUSDDebt, and derives the values the contracts
+return with the same integer arithmetic:
+
+    pending reward = stake * (L - snapshot) // 1e18
+    entire debt    = debt + pending ZUSD debt reward
+    ICR            = entire coll * price // entire debt
+
+It is kept current from the events of every mined transaction, taken from
+brownie's transaction history before each read: `TroveUpdated` (emitted by
+BorrowerOperations and the TroveManager whenever a trove is opened,
+adjusted, redeemed, has its pending rewards applied, or is closed, with
+zeros) carries the new debt, coll and stake, and the trove's reward
+snapshots then equal the current L terms; `LTermsUpdated` follows the
+redistributions of liquidations. `check` compares a sample of troves with
+the contracts.
+
+The shadow also keeps the troves in the order of SortedTroves, by
+decreasing nominal CR (liquidation rewards are redistributed in proportion
+to the stakes, which preserves the order). A trove whose NICR changes is
+moved the way the contract inserts it, before the troves of equal NICR, so
+`hints` returns the neighbours of the exact insert position: with them
+SortedTroves checks the position without walking the list, and finding
+them costs no request.
+
+`redemption_hints` is HintHelpers.getRedemptionHints walked over that
+order, returning as well the insert hints of the partially redeemed trove
+for its position once the fully redeemed ones are gone: a redemption then
+needs no request besides its transaction.
+
+The shadow holds addresses and integers only, so it is saved with the
+simulation checkpoint; after resuming, `attach` makes it follow the
+transactions mined from then on.
+"""
+
+from brownie import Wei, history, project
+
+from helpers import ZERO_ADDRESS
+
+DECIMAL_PRECISION = 10**18
+NICR_PRECISION = 10**20
+MAX_UINT = 2**256 - 1
+
+def nominal_CR(coll, debt):
+    """LiquityMath._computeNominalCR on wei amounts."""
+    return coll * NICR_PRECISION // debt if debt > 0 else MAX_UINT
+
+def compute_CR(coll, debt, price):
+    """LiquityMath._computeCR on wei amounts."""
+    return coll * price // debt if debt > 0 else MAX_UINT
+
+class ShadowTroves:
+    def __init__(self, contracts):
+        self.sources = {contracts.troveManager.address, contracts.borrowerOperations.address}
+        # added to the debt of every trove on opening
+        self.gas_compensation = int(contracts.troveManager.ZUSD_GAS_COMPENSATION())
+        self.min_net_debt = int(contracts.troveManager.MIN_NET_DEBT())
+        # the parameters are read once: the simulation does not change them
+        params = project.get_loaded_projects()[0]['LiquityBaseParams'].at(contracts.troveManager.liquityBaseParams())
+        self.MCR = int(params.MCR())
+        # address -> [debt, coll, stake, snapshot ETH, snapshot ZUSDDebt]
+        self.troves = {}
+        # addresses from the head (highest NICR) to the tail of SortedTroves
+        self.order = []
+        self.L_ETH = 0
+        self.L_ZUSDDebt = 0
+        self.attach()
+
+    def attach(self):
+        """Follows the transactions mined from now on, e.g. after resuming from a checkpoint."""
+        self._seen = len(history)
+
+    def sync(self, contracts):
+        """Reads the L terms and the troves, walking SortedTroves from its head, from the chain."""
+        self.L_ETH = int(contracts.troveManager.L_ETH())
+        self.L_ZUSDDebt = int(contracts.troveManager.L_ZUSDDebt())
+        self.troves = {}
+        self.order = []
+        address = contracts.sortedTroves.getFirst()
+        while address != ZERO_ADDRESS:
+            trove = contracts.troveManager.Troves(address)
+            snapshots = contracts.troveManager.rewardSnapshots(address)
+            self.troves[str(address)] = [int(trove['debt']), int(trove['coll']), int(trove['stake']),
+                                         int(snapshots['ETH']), int(snapshots['ZUSDDebt'])]
+            self.order.append(str(address))
+            address = contracts.sortedTroves.getNext(address)
+        self.attach()
+
+    def catch_up(self):
+        if self._seen > len(history):
+            # brownie dropped reverted-to transactions from its history
+            self._seen = len(history)
+        while self._seen < len(history):
+            tx = history[self._seen]
+            self._seen += 1
+            if tx.status == 1:
+                self.apply(tx.events)
+
+    def apply(self, events):
+        for event in events:
+            if event.address not in self.sources:
+                continue
+            if event.name == 'LTermsUpdated':
+                self.L_ETH, self.L_ZUSDDebt = int(event['_L_ETH']), int(event['_L_ZUSDDebt'])
+            elif event.name == 'TroveUpdated':
+                borrower = str(event['_borrower'])
+                previous = self.NICR(borrower) if borrower in self.troves else None
+                if event['_coll'] == 0 and event['_debt'] == 0:
+                    if previous is not None:
+                        del self.order[self._index(borrower, previous)]
+                        del self.troves[borrower]
+                    continue
+                stake = event['stake'] if 'stake' in event else event['_stake']
+                # the snapshots are the current L terms: no pending rewards
+                NICR = nominal_CR(int(event['_coll']), int(event['_debt']))
+                # applying the pending rewards keeps the NICR, and the trove its place
+                if NICR != previous:
+                    if previous is not None:
+                        del self.order[self._index(borrower, previous)]
+                    self.order.insert(self._position(NICR), borrower)
+                self.troves[borrower] = [int(event['_debt']), int(event['_coll']), int(stake), self.L_ETH, self.L_ZUSDDebt]
+
+    def __getstate__(self):
+        # a checkpoint holds the state after every transaction mined so far
+        self.catch_up()
+        return self.__dict__
+
+    def __len__(self):
+        self.catch_up()
+        return len(self.troves)
+
+    def __contains__(self, address):
+        self.catch_up()
+        return str(address) in self.troves
+
+    def _amounts(self, address):
+        debt, coll, stake, snapshot_ETH, snapshot_ZUSDDebt = self.troves[str(address)]
+        pending_ETH = stake * (self.L_ETH - snapshot_ETH) // DECIMAL_PRECISION
+        pending_ZUSDDebt = stake * (self.L_ZUSDDebt - snapshot_ZUSDDebt) // DECIMAL_PRECISION
+        return debt + pending_ZUSDDebt, coll + pending_ETH, pending_ZUSDDebt, pending_ETH
+
+    def NICR(self, address):
+        """TroveManager.getNominalICR."""
+        debt, coll, _, _ = self._amounts(address)
+        return nominal_CR(coll, debt)
+
+    def _position(self, NICR):
+        # index in `order` of the first trove with a NICR not above `NICR`
+        low, high = 0, len(self.order)
+        while low < high:
+            middle = (low + high) // 2
+            if self.NICR(self.order[middle]) > NICR:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _index(self, address, NICR):
+        # index in `order` of the trove at `address`, of nominal CR `NICR`: among the troves of equal NICR
+        # from its bisected position, without comparing the addresses before them; the whole order is
+        # searched only if it no longer follows the NICRs
+        try:
+            return self.order.index(address, self._position(NICR))
+        except ValueError:
+            return self.order.index(address)
+
+    def hints(self, NICR, exclude=()):
+        """Upper and lower hints of the exact position in SortedTroves of a trove of nominal CR `NICR`.
+
+        The troves in `exclude` -- the one being reinserted, the ones a
+        redemption closes first -- are left out.
+        """
+        self.catch_up()
+        order = self.order
+        exclude = {str(address) for address in exclude}
+        lower = self._position(NICR)
+        upper = lower - 1
+        while upper >= 0 and order[upper] in exclude:
+            upper -= 1
+        while lower < len(order) and order[lower] in exclude:
+            lower += 1
+        return (order[upper] if upper >= 0 else ZERO_ADDRESS,
+                order[lower] if lower < len(order) else ZERO_ADDRESS)
+
+    def redemption_hints(self, amount, price, max_iterations=0):
+        """HintHelpers.getRedemptionHints, with `amount` and `price` in wei, plus the partial redemption's insert hints.
+
+        Returns (firstRedemptionHint, partialRedemptionHintNICR,
+        truncatedZUSDamount, upperHint, lowerHint).
+        """
+        self.catch_up()
+        order = self.order
+        k = len(order) - 1
+        while k >= 0 and self.current_ICR(order[k], price) < self.MCR:
+            k -= 1
+        first = order[k] if k >= 0 else ZERO_ADDRESS
+
+        remaining = int(amount)
+        partial_NICR = 0
+        redeemed = []
+        hints = (ZERO_ADDRESS, ZERO_ADDRESS)
+        iterations = max_iterations or len(order)
+        while k >= 0 and remaining > 0 and iterations > 0:
+            iterations -= 1
+            address = order[k]
+            debt, coll, _, _ = self._amounts(address)
+            net_debt = debt - self.gas_compensation
+            if net_debt > remaining:
+                if net_debt > self.min_net_debt:
+                    redeemable = min(remaining, net_debt - self.min_net_debt)
+                    new_coll = coll - redeemable * DECIMAL_PRECISION // int(price)
+                    partial_NICR = nominal_CR(new_coll, net_debt - redeemable + self.gas_compensation)
+                    remaining -= redeemable
+                    hints = self.hints(partial_NICR, redeemed + [address])
+                break
+            remaining -= net_debt
+            redeemed.append(address)
+            k -= 1
+
+        return first, partial_NICR, int(amount) - remaining, hints[0], hints[1]
+
+    def entire_debt_and_coll(self, address):
+        """TroveManager.getEntireDebtAndColl, in wei."""
+        self.catch_up()
+        debt, coll, pending_ZUSDDebt, pending_ETH = self._amounts(address)
+        return {'debt': Wei(debt), 'coll': Wei(coll),
+                'pendingZUSDDebtReward': Wei(pending_ZUSDDebt), 'pendingETHReward': Wei(pending_ETH)}
+
+    def current_ICR(self, address, price):
+        """TroveManager.getCurrentICR, with `price` in wei."""
+        self.catch_up()
+        debt, coll, _, _ = self._amounts(address)
+        return Wei(compute_CR(coll, debt, int(price)))
+
+    def by_risk(self, n=None):
+        """Addresses of the `n` (all by default) riskiest troves, by increasing nominal CR: SortedTroves from its last."""
+        self.catch_up()
+        # reversed slices, without copying the whole order for the last few
+        return self.order[::-1] if n is None else self.order[:-n - 1:-1]
+
+    def check(self, contracts, addresses, price, tail=0):
+        """Compares the troves at `addresses`, the L terms and the last `tail` troves of the order with the contracts; returns the mismatches."""
+        self.catch_up()
+        mismatches = []
+        chain_tail = []
+        address = contracts.sortedTroves.getLast()
+        while len(chain_tail) < tail and address != ZERO_ADDRESS:
+            chain_tail.append(str(address))
+            address = contracts.sortedTroves.getPrev(address)
+        if chain_tail != self.by_risk(tail)[:len(chain_tail)]:
+            mismatches.append(('order', self.by_risk(tail), chain_tail))
+        chain_L = (int(contracts.troveManager.L_ETH()), int(contracts.troveManager.L_ZUSDDebt()))
+        if chain_L != (self.L_ETH, self.L_ZUSDDebt):
+            mismatches.append(('L terms', (self.L_ETH, self.L_ZUSDDebt), chain_L))
+        for address in addresses:
+            chain = contracts.troveManager.getEntireDebtAndColl(address)
+            chain_amounts = (int(chain['debt']), int(chain['coll'])) if contracts.troveManager.getTroveStatus(address) == 1 else None
+            shadow = tuple(self._amounts(address)[:2]) if str(address) in self.troves else None
+            if chain_amounts != shadow:
+                mismatches.append((str(address), shadow, chain_amounts))
+            elif shadow is not None and self.current_ICR(address, price) != contracts.troveManager.getCurrentICR(address, price):
+                mismatches.append((str(address), 'ICR', None))
+        return mismatches
@@ -0,0 +1,120 @@
+"""The shadow trove state against SortedTroves and the TroveManager.
+
+Opens troves, some with the same nominal CR, then adjusts, closes and
+liquidates them with the shadow's hints, and after every round compares the
+shadow's amounts, L terms and whole order with the contracts -- the order
+the shadow keeps by moving troves in place rather than by reading the list.
+
+    brownie test tests-py/shadow_troves_test.py
+"""
+
+import numpy as np
+
+from brownie import *
+from helpers import *
+from simulation_helpers import *
+from simulation_test import contracts
+
+N_TROVES = 40
+ROUNDS = 3
+
+def in_step(shadow, contracts, price, borrowers):
+    """The amounts of the `borrowers`, the L terms and the order of all the troves match the contracts."""
+    assert shadow.check(contracts, borrowers, price, tail=len(shadow)) == []
+    assert len(shadow) == contracts.sortedTroves.getSize()
+    # a shadow read from the chain has the same order
+    fresh = ShadowTroves(contracts)
+    fresh.sync(contracts)
+    assert fresh.by_risk() == shadow.by_risk()
+    assert shadow.by_risk(5) == shadow.by_risk()[:5]
+
+def open_trove(contracts, shadow, account, coll, debt):
+    hints = get_hints(shadow, coll, debt + shadow.gas_compensation)
+    contracts.borrowerOperations.openTrove(MAX_FEE, get_zusd_amount_from_net_debt(contracts, debt), hints[0], hints[1],
+                                           { 'from': account, 'value': coll })
+
+def adjust_trove(contracts, shadow, account, kind, rng):
+    amounts = shadow.entire_debt_and_coll(account)
+    coll, debt = int(amounts['coll']), int(amounts['debt'])
+    if kind == 'repay':
+        amount = int((debt - shadow.gas_compensation - shadow.min_net_debt) * rng.uniform(0.1, 0.5))
+        amount = min(amount, int(contracts.zusdToken.balanceOf(account)))
+        hints = get_hints(shadow, coll, debt - amount, account)
+        contracts.borrowerOperations.repayZUSD(amount, hints[0], hints[1], { 'from': account })
+    elif kind == 'withdraw':
+        amount = int(debt * rng.uniform(0.05, 0.2))
+        # the borrowing fee is added to the debt
+        fee = contracts.troveManager.getBorrowingRateWithDecay() * amount // Wei(1e18)
+        hints = get_hints(shadow, coll, debt + amount + fee, account)
+        contracts.borrowerOperations.withdrawZUSD(MAX_FEE, amount, hints[0], hints[1], { 'from': account })
+    elif kind == 'add':
+        amount = int(coll * rng.uniform(0.05, 0.5))
+        hints = get_hints(shadow, coll + amount, debt, account)
+        contracts.borrowerOperations.addColl(hints[0], hints[1], { 'from': account, 'value': amount })
+    else:
+        amount = int(coll * rng.uniform(0.02, 0.1))
+        hints = get_hints(shadow, coll - amount, debt, account)
+        contracts.borrowerOperations.withdrawColl(amount, hints[0], hints[1], { 'from': account })
+
+def close_trove(contracts, shadow, account):
+    # the borrowing fee was not minted to the borrower: the largest trove lends the difference
+    debt = int(shadow.entire_debt_and_coll(account)['debt']) - shadow.gas_compensation
+    transfer_from_to(contracts, accounts[0], account, max(0, debt - int(contracts.zusdToken.balanceOf(account))))
+    contracts.borrowerOperations.closeTrove({ 'from': account })
+
+def test_shadow_follows_sorted_troves(contracts):
+    rng = np.random.default_rng(seed)
+    price = floatToWei(price_ether[0])
+    shadow = ShadowTroves(contracts)
+    contracts.priceFeedTestnet.setPrice(price, { 'from': accounts[0] })
+    contracts.borrowerOperations.openTrove(MAX_FEE, Wei(1e24), ZERO_ADDRESS, ZERO_ADDRESS,
+                                           { 'from': accounts[0], 'value': floatToWei(30000.0) })
+    opened = {}
+    for i in range(1, N_TROVES + 1):
+        if i % 7 == 0:
+            # the amounts of an earlier trove: the same NICR, inserted before it
+            coll, debt = opened[i - 3]
+        else:
+            debt = floatToWei(MIN_NET_DEBT * (1 + rng.gamma(2.0)))
+            # a few troves close to the MCR, liquidated when the price drops
+            CR = 1.15 if i % 10 == 0 else 1.5 + rng.chisquare(4) / 4
+            coll = floatToWei(CR * (debt / 1e18) / price_ether[0])
+        open_trove(contracts, shadow, accounts[i], coll, debt)
+        opened[i] = coll, debt
+    borrowers = [accounts[i] for i in opened]
+    in_step(shadow, contracts, price, borrowers)
+
+    # with the stability pool empty, the liquidated troves are redistributed and the others carry pending rewards
+    contracts.priceFeedTestnet.setPrice(price * 95 // 100, { 'from': accounts[0] })
+    contracts.troveManager.liquidateTroves(N_TROVES, { 'from': accounts[0] })
+    contracts.priceFeedTestnet.setPrice(price, { 'from': accounts[0] })
+    assert shadow.L_ETH > 0 and len(shadow) < N_TROVES + 1
+    in_step(shadow, contracts, price, borrowers)
+
+    for _ in range(ROUNDS):
+        # the troves safely above the MCR
+        active = [account for account in borrowers if account in shadow and shadow.current_ICR(account, price) > Wei(1.4e18)]
+        for k in rng.permutation(len(active))[:len(active) // 2]:
+            account = active[k]
+            adjust_trove(contracts, shadow, account, rng.choice(['repay', 'withdraw', 'add', 'remove']), rng)
+        in_step(shadow, contracts, price, borrowers)
+
+        for k in rng.permutation(len(active))[:3]:
+            if active[k] in shadow:
+                close_trove(contracts, shadow, active[k])
+        in_step(shadow, contracts, price, borrowers)
+
+        # and a closed trove reopened with the amounts of one in the middle of the order, next to it
+        closed = [i for i in opened if accounts[i] not in shadow]
+        twin = shadow.by_risk()[len(shadow) // 2]
+        amounts = shadow.entire_debt_and_coll(twin)
+        open_trove(contracts, shadow, accounts[closed[0]], int(amounts['coll']),
+                   int(amounts['debt']) - shadow.gas_compensation)
+        in_step(shadow, contracts, price, borrowers)
+
+    # the riskiest trove brought below the MCR and liquidated alone
+    riskiest = shadow.by_risk(1)[0]
+    contracts.priceFeedTestnet.setPrice(price * 3 // 4, { 'from': accounts[0] })
+    if shadow.current_ICR(riskiest, price * 3 // 4) < shadow.MCR:
+        contracts.troveManager.liquidate(riskiest, { 'from': accounts[0] })
+    in_step(shadow, contracts, price * 3 // 4, borrowers)
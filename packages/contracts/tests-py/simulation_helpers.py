@@ -1,10 +1,21 @@
 from brownie import *
-import random
+import os
+import sys
 import numpy as np
 from bisect import bisect_left
 
 from helpers import *
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from macroModel import checkpoint as checkpoints
+from macroModel.exogenous import ZERO_price_path, ether_price_path, natural_rate_path
+from macroModel.profiler import Profiler, RpcCounter
+from macroModel.random_streams import RandomStreams
+from macroModel.recorder import Recorder
+from multicall import MulticallReader
+from rpc_batch import BatchReader, DirectReader, use_transport
+from shadow_troves import ShadowTroves, nominal_CR
+
 #global variables
 day = 24
 month = 24 * 30
@@ -15,6 +26,22 @@ period = year
 #n_sim = 8640
 n_sim = year
 
+#seed of the random streams of the exogenous paths, troves and markets
+seed = 2019
+
+# checkpoint of the simulation state, saved every `checkpoint_every` iterations
+CHECKPOINT = os.environ.get('ZERO_SIM_CHECKPOINT', 'tests/simulation_checkpoint.pkl')
+
+# how groups of view calls are read: 'multicall' (one eth_call), 'batch' (one JSON-RPC batch) or 'direct'
+READS = os.environ.get('ZERO_SIM_READS', 'multicall')
+# endpoint of the node (HTTP URL or IPC socket path), by default brownie's
+RPC = os.environ.get('ZERO_SIM_RPC')
+
+# the shadow trove state is compared with the contracts every `shadow_check_every` iterations (0: never), on a sample of troves
+shadow_check_every = int(os.environ.get('ZERO_SIM_SHADOW_CHECK', day))
+shadow_check_sample = 20
+checkpoint_every = day
+
 # number of liquidations for each call to `liquidateTroves`
 NUM_LIQUIDATIONS = 10
 
@@ -34,7 +61,6 @@ where $\zeta_t^e \sim N(0, $ sd_ether$)$ represents ether price shock and $\sigm
 
 #ether price
 price_ether_initial = 2000
-price_ether = [price_ether_initial]
 sd_ether=0.02
 #drift_ether = 0.001
 # 4 stages:
@@ -64,7 +90,6 @@ The ZERO price from the second month on is endogenously determined.
 
 #ZERO price & airdrop
 price_ZERO_initial = 0.4
-price_ZERO = [price_ZERO_initial]
 sd_ZERO=0.005
 drift_ZERO = 0.0035
 supply_ZERO=[0]
@@ -158,7 +183,6 @@ theta = 0.001
 
 #natural rate
 natural_rate_initial = 0.2
-natural_rate = [natural_rate_initial]
 sd_natural_rate = 0.002
 
 """# Trove pool
@@ -299,50 +323,74 @@ Ether Price
 """
 
 #ether price
-for i in range(1, period1):
-    random.seed(2019375+10000*i)
-    shock_ether = random.normalvariate(0, sd_ether)
-    price_ether.append(price_ether[i-1] * (1 + shock_ether) * (1 + drift_ether1))
-print(" - ETH period 1 -")
-print(f"Min ETH price: {min(price_ether[1:period1])}")
-print(f"Max ETH price: {max(price_ether[1:period1])}")
-for i in range(period1, period2):
-    random.seed(2019375+10000*i)
-    shock_ether = random.normalvariate(0, sd_ether)
-    price_ether.append(price_ether[i-1] * (1 + shock_ether) * (1 + drift_ether2))
-print(" - ETH period 2 -")
-print(f"Min ETH price: {min(price_ether[period1:period2])}")
-print(f"Max ETH price: {max(price_ether[period1:period2])}")
-for i in range(period2, period3):
-    random.seed(2019375+10000*i)
-    shock_ether = random.normalvariate(0, sd_ether)
-    price_ether.append(price_ether[i-1] * (1 + shock_ether) * (1 + drift_ether3))
-print(" - ETH period 3 -")
-print(f"Min ETH price: {min(price_ether[period2:period3])}")
-print(f"Max ETH price: {max(price_ether[period2:period3])}")
-for i in range(period3, period4):
-    random.seed(2019375+10000*i)
-    shock_ether = random.normalvariate(0, sd_ether)
-    price_ether.append(price_ether[i-1] * (1 + shock_ether) * (1 + drift_ether4))
-print(" - ETH period 4 -")
-print(f"Min ETH price: {min(price_ether[period3:period4])}")
-print(f"Max ETH price: {max(price_ether[period3:period4])}")
+ether_drift_schedule = [(period1, drift_ether1), (period2, drift_ether2), (period3, drift_ether3), (period4, drift_ether4)]
+price_ether = ether_price_path(period, price_ether_initial, sd_ether, ether_drift_schedule, seed)
+for n, (start, end) in enumerate(zip([1, period1, period2, period3], [period1, period2, period3, period4]), 1):
+    print(f" - ETH period {n} -")
+    print(f"Min ETH price: {price_ether[start:end].min()}")
+    print(f"Max ETH price: {price_ether[start:end].max()}")
 
 """Natural Rate"""
 
 #natural rate
-for i in range(1, period):
-    random.seed(201597+10*i)
-    shock_natural = random.normalvariate(0,sd_natural_rate)
-    natural_rate.append(natural_rate[i-1]*(1+shock_natural))
+natural_rate = natural_rate_path(period, natural_rate_initial, sd_natural_rate, seed)
 
 """ZERO Price - First Month"""
 
 #ZERO price
-for i in range(1, month):
-    random.seed(2+13*i)
-    shock_ZERO = random.normalvariate(0,sd_ZERO)  
-    price_ZERO.append(price_ZERO[i-1]*(1+shock_ZERO)*(1+drift_ZERO))
+price_ZERO = ZERO_price_path(month, price_ZERO_initial, sd_ZERO, drift_ZERO, seed)
+
+"""# Checkpoints
+
+The Python side of the simulation (account bookkeeping, recorded series and
+running totals) is pickled together with an `evm_snapshot` of the node. The
+random streams are addressed by (seed, phase, iteration) and need no saving.
+Resuming reverts the node to the snapshot, so it only works while the node
+that ran the simulation is still up: start it separately (brownie then
+attaches to it) to survive the test process. If the node lost the snapshot
+the simulation starts over.
+"""
+
+def save_simulation_checkpoint(path, contracts, state, csvfile):
+    csvfile.flush()
+    snapshot = web3.provider.make_request('evm_snapshot', [])['result']
+    checkpoints.save(path, dict(state, snapshot=snapshot, block=web3.eth.block_number, csv_size=csvfile.tell(),
+                                contracts={name: (contract._name, contract.address) for name, contract in vars(contracts).items()}))
+
+def load_simulation_checkpoint(path, contracts):
+    """Reverts the node to the checkpoint at `path` and points `contracts` at its deployments; returns its state or None."""
+    state = checkpoints.load(path)
+    if state is None:
+        return None
+    if not web3.provider.make_request('evm_revert', [state['snapshot']]).get('result') or web3.eth.block_number != state['block']:
+        print(f"The node no longer holds the snapshot of {path}: starting over")
+        os.remove(path)
+        return None
+    # reverting uses the snapshot up
+    state['snapshot'] = web3.provider.make_request('evm_snapshot', [])['result']
+    checkpoints.save(path, state)
+    build = project.get_loaded_projects()[0]
+    for name, (contract_type, address) in state['contracts'].items():
+        setattr(contracts, name, build[contract_type].at(address))
+    return state
+
+def check_shadow(accounts, contracts, shadow, active_accounts, price_ether_current, index, streams):
+    """Compares the shadow trove state with the contracts, on the riskiest troves and a random sample of the others."""
+    rng = streams('shadow_check', index)
+    n = min(shadow_check_sample, len(active_accounts))
+    sample = [accounts[active_accounts[i]['index']] for i in rng.choice(len(active_accounts), n, replace=False)]
+    mismatches = shadow.check(contracts, shadow.by_risk(NUM_LIQUIDATIONS) + sample, floatToWei(price_ether_current), tail=NUM_LIQUIDATIONS)
+    assert not mismatches, f"shadow trove state differs from the contracts at iteration {index}: {mismatches}"
+
+def view_reader(contracts, reads=None):
+    reads = reads or READS
+    if reads == 'multicall':
+        return MulticallReader(contracts.multicall)
+    if reads == 'batch':
+        return BatchReader(use_transport(web3, RPC))
+    if reads == 'direct':
+        return DirectReader()
+    raise ValueError(f"unknown way of reading: {reads!r}")
 
 """# Troves
 
@@ -353,12 +401,13 @@ def is_recovery_mode(contracts, price_ether_current):
     price = Wei(price_ether_current * 1e18)
     return contracts.troveManager.checkRecoveryMode(price)
 
-def pending_liquidations(contracts, price_ether_current):
-    last_trove = contracts.sortedTroves.getLast()
-    last_ICR = contracts.troveManager.getCurrentICR(last_trove, Wei(price_ether_current * 1e18))
-
-    if last_trove == ZERO_ADDRESS:
+def pending_liquidations(contracts, shadow, price_ether_current):
+    price = Wei(price_ether_current * 1e18)
+    troves = shadow.by_risk(NUM_LIQUIDATIONS)
+    if len(troves) == 0:
         return False
+
+    last_ICR = shadow.current_ICR(troves[0], price)
     if last_ICR >= Wei(15e17):
         return False
     if last_ICR < Wei(11e17):
@@ -367,15 +416,12 @@ def pending_liquidations(contracts, price_ether_current):
         return False
 
     stability_pool_balance = contracts.stabilityPool.getTotalZUSDDeposits()
-    trove = last_trove
-    for i in range(NUM_LIQUIDATIONS):
-        debt = contracts.troveManager.getEntireDebtAndColl(trove)[0]
+    for trove in troves:
+        if shadow.current_ICR(trove, price) >= Wei(15e17):
+            return False
+        debt = shadow.entire_debt_and_coll(trove)['debt']
         if stability_pool_balance >= debt:
             return True
-        trove = contracts.sortedTroves.getPrev(trove)
-        ICR = contracts.troveManager.getCurrentICR(trove, Wei(price_ether_current * 1e18))
-        if ICR >= Wei(15e17):
-            return False
 
     return False
 
@@ -404,14 +450,15 @@ def quantity_ZERO_airdrop(index):
         return 0
     return 32e6 * (F ** (index-1) - F ** index)
 
-def liquidate_troves(accounts, contracts, active_accounts, inactive_accounts, price_ether_current, price_ZUSD, price_ZERO_current, data, index):
+def liquidate_troves(accounts, contracts, shadow, active_accounts, inactive_accounts, price_ether_current, price_ZUSD, price_ZERO_current, data, index):
     if len(active_accounts) == 0:
         return [0, 0]
 
-    stability_pool_previous = contracts.stabilityPool.getTotalZUSDDeposits() / 1e18
-    stability_pool_eth_previous = contracts.stabilityPool.getETH() / 1e18
+    reader = view_reader(contracts)
+    stability_pool_reads = [(contracts.stabilityPool.getTotalZUSDDeposits,), (contracts.stabilityPool.getETH,)]
+    [stability_pool_previous, stability_pool_eth_previous] = [amount / 1e18 for amount in reader.call(stability_pool_reads)]
 
-    while pending_liquidations(contracts, price_ether_current):
+    while pending_liquidations(contracts, shadow, price_ether_current):
         try:
             tx = contracts.troveManager.liquidateTroves(NUM_LIQUIDATIONS, { 'from': accounts[0], 'gas_limit': 8000000, 'allow_revert': True })
             #print(tx.events['TroveLiquidated'])
@@ -420,26 +467,23 @@ def liquidate_troves(accounts, contracts, active_accounts, inactive_accounts, pr
             print(f"TM: {contracts.troveManager.address}")
             stability_pool_balance = contracts.stabilityPool.getTotalZUSDDeposits()
             print(f"stability_pool_balance: {stability_pool_balance / 1e18}")
-            trove = last_trove
-            for i in range(NUM_LIQUIDATIONS):
+            for i, trove in enumerate(shadow.by_risk(NUM_LIQUIDATIONS)):
                 print(f"i: {i}")
-                debt = contracts.troveManager.getEntireDebtAndColl(trove)[0]
+                debt = shadow.entire_debt_and_coll(trove)['debt']
                 print(f"debt: {debt / 1e18}")
                 if stability_pool_balance >= debt:
                     print("True!")
-                trove = contracts.sortedTroves.getPrev(trove)
-                ICR = contracts.troveManager.getCurrentICR(trove, Wei(price_ether_current * 1e18))
+                ICR = shadow.current_ICR(trove, Wei(price_ether_current * 1e18))
                 print(f"ICR: {ICR}")
-    stability_pool_current = contracts.stabilityPool.getTotalZUSDDeposits() / 1e18
-    stability_pool_eth_current = contracts.stabilityPool.getETH() / 1e18
+    [stability_pool_current, stability_pool_eth_current] = [amount / 1e18 for amount in reader.call(stability_pool_reads)]
 
     debt_liquidated = stability_pool_current - stability_pool_previous
     ether_liquidated = stability_pool_eth_current - stability_pool_eth_previous
     liquidation_gain = ether_liquidated * price_ether_current - debt_liquidated * price_ZUSD
     airdrop_gain = price_ZERO_current * quantity_ZERO_airdrop(index)
 
-    data['liquidation_gain'][index] = liquidation_gain
-    data['airdrop_gain'][index] = airdrop_gain
+    data.loc[index, 'liquidation_gain'] = liquidation_gain
+    data.loc[index, 'airdrop_gain'] = airdrop_gain
 
     return_stability = calculate_stability_return(contracts, price_ZUSD, data, index)
 
@@ -453,13 +497,13 @@ def calculate_stability_return(contracts, price_ZUSD, data, index):
         return_stability = initial_return * 2
     elif index < month:
         return_stability = (year/index) * \
-            (sum(data['liquidation_gain'][0:index]) +
-             sum(data['airdrop_gain'][0:index])
+            (data.window_sum('liquidation_gain', month, index) +
+             data.window_sum('airdrop_gain', month, index)
              ) / (price_ZUSD * stability_pool_previous)
     else:
         return_stability = (year/month) * \
-            (sum(data['liquidation_gain'][index - month:index]) +
-             sum(data['airdrop_gain'][index - month:index])
+            (data.window_sum('liquidation_gain', month, index) +
+             data.window_sum('airdrop_gain', month, index)
              ) / (price_ZUSD * stability_pool_previous)
 
     return return_stability
@@ -470,31 +514,30 @@ def isNewTCRAboveCCR(contracts, collChange, isCollIncrease, debtChange, isDebtIn
 
 """Close Troves"""
 
-def close_troves(accounts, contracts, active_accounts, inactive_accounts, price_ether_current, price_ZUSD, index):
+def close_troves(accounts, contracts, shadow, active_accounts, inactive_accounts, price_ether_current, price_ZUSD, index, streams):
     if len(active_accounts) == 0:
         return [0]
 
     if is_recovery_mode(contracts, price_ether_current):
         return [0]
 
-    np.random.seed(208+index)
-    shock_closetroves = np.random.normal(0,sd_closetroves)
-    n_troves = contracts.sortedTroves.getSize()
+    rng = streams('close_troves', index)
+    shock_closetroves = rng.normal(0,sd_closetroves)
+    n_troves = len(shadow)
 
     if index <= 240:
-        number_closetroves = np.random.uniform(0,1)
+        number_closetroves = rng.uniform(0,1)
     elif price_ZUSD >=1:
         number_closetroves = max(0, n_steady * (1+shock_closetroves))
     else:
         number_closetroves = max(0, n_steady * (1+shock_closetroves)) + beta*(1-price_ZUSD)*n_troves
 
     number_closetroves = min(int(round(number_closetroves)), len(active_accounts) - 1)
-    random.seed(293+100*index)
-    drops = list(random.sample(range(len(active_accounts)), number_closetroves))
+    drops = list(rng.choice(len(active_accounts), number_closetroves, replace=False))
     for i in range(0, len(drops)):
         account_index = active_accounts[drops[i]]['index']
         account = accounts[account_index]
-        amounts = contracts.troveManager.getEntireDebtAndColl(account)
+        amounts = shadow.entire_debt_and_coll(account)
         coll = amounts['coll']
         debt = amounts['debt']
         pending = get_zusd_to_repay(accounts, contracts, active_accounts, inactive_accounts, account, debt)
@@ -510,8 +553,9 @@ def close_troves(accounts, contracts, active_accounts, inactive_accounts, price_
 
 """Adjust Troves"""
 
-def transfer_from_to(contracts, from_account, to_account, amount):
-    balance = contracts.zusdToken.balanceOf(from_account)
+def transfer_from_to(contracts, from_account, to_account, amount, balance=None):
+    if balance is None:
+        balance = contracts.zusdToken.balanceOf(from_account)
     transfer_amount = min(balance, amount)
     if transfer_amount == 0:
         return amount
@@ -523,11 +567,12 @@ def transfer_from_to(contracts, from_account, to_account, amount):
     return pending
 
 def get_zusd_to_repay(accounts, contracts, active_accounts, inactive_accounts, account, debt):
-    zusdBalance = contracts.zusdToken.balanceOf(account)
+    reader = view_reader(contracts)
+    [zusdBalance, deposit] = reader.call([(contracts.zusdToken.balanceOf, account), (contracts.stabilityPool.deposits, account)])
     if debt > zusdBalance:
         pending = debt - zusdBalance
         # first try to withdraw from SP
-        initial_deposit = contracts.stabilityPool.deposits(account)[0]
+        initial_deposit = deposit[0]
         if initial_deposit > 0:
             contracts.stabilityPool.withdrawFromSP(pending, { 'from': account, 'gas_limit': 8000000, 'allow_revert': True })
             # it can only withdraw up to the deposit, so we check the balance again
@@ -535,17 +580,15 @@ def get_zusd_to_repay(accounts, contracts, active_accounts, inactive_accounts, a
             pending = debt - zusdBalance
         # try with whale
         pending = transfer_from_to(contracts, accounts[0], account, pending)
-        # try with active accounts, which are more likely to hold ZUSD
-        for a in active_accounts:
-            if pending <= 0:
-                break
-            a_address = accounts[a['index']]
-            pending = transfer_from_to(contracts, a_address, account, pending)
-        for i in inactive_accounts:
+        # try with active accounts, which are more likely to hold ZUSD, then with the inactive ones
+        # (a transfer only changes the balances of `account` and the sender, so they are read ahead)
+        for holders in ([accounts[a['index']] for a in active_accounts], [accounts[i] for i in inactive_accounts]):
             if pending <= 0:
                 break
-            i_address = accounts[i]
-            pending = transfer_from_to(contracts, i_address, account, pending)
+            for holder, balance in zip(holders, reader.balances(contracts.zusdToken, holders)):
+                if pending <= 0:
+                    break
+                pending = transfer_from_to(contracts, holder, account, pending, balance)
 
         if pending > 0:
             print(f"\n ***Error: not enough ZUSD to repay! {debt / 1e18} ZUSD for {account}")
@@ -554,52 +597,29 @@ def get_zusd_to_repay(accounts, contracts, active_accounts, inactive_accounts, a
 
     return 0
 
-def get_hints(contracts, coll, debt):
-    NICR = contracts.hintHelpers.computeNominalCR(floatToWei(coll), floatToWei(debt))
-    approxHint = contracts.hintHelpers.getApproxHint(NICR, 100, 0)
-    #print("approx hint", approxHint)
-    return contracts.sortedTroves.findInsertPosition(NICR, approxHint[0], approxHint[0])
-
-def get_hints_from_amounts(accounts, contracts, active_accounts, coll, debt, price_ether_current):
-    ICR = coll * price_ether_current / debt
-    NICR = contracts.hintHelpers.computeNominalCR(floatToWei(coll), floatToWei(debt))
-    return get_hints_from_ICR(accounts, contracts, active_accounts, ICR, NICR)
+def get_hints(shadow, coll, debt, borrower=None):
+    """Hints of the exact SortedTroves position of a trove with `coll` and `debt` in wei, from the shadow state."""
+    return shadow.hints(nominal_CR(coll, debt), [borrower] if borrower else [])
 
 #def get_address_from_active_index(accounts, active_accounts, index):
 def index2address(accounts, active_accounts, index):
     return accounts[active_accounts[index]['index']]
 
-def get_hints_from_ICR(accounts, contracts, active_accounts, ICR, NICR):
-    l = len(active_accounts)
-    if l == 0:
-        return [ZERO_ADDRESS, ZERO_ADDRESS, 0]
-    else:
-        keys = [a['CR_initial'] for a in active_accounts]
-        i = bisect_left(keys, ICR)
-        #return [index2address(accounts, active_accounts, min(i, l-1)), index2address(accounts, active_accounts, max(i-1, 0)), i]
-        hints = contracts.sortedTroves.findInsertPosition(
-            NICR,
-            index2address(accounts, active_accounts, min(i, l-1)),
-            index2address(accounts, active_accounts, max(i-1, 0))
-        )
-        return [hints[0], hints[1], i]
-
-
-def adjust_troves(accounts, contracts, active_accounts, inactive_accounts, price_ether_current, index):
-    random.seed(57984-3*index)
-    ratio = random.uniform(0,1)
+def adjust_troves(accounts, contracts, shadow, active_accounts, inactive_accounts, price_ether_current, index, streams):
+    rng = streams('adjust_troves', index)
+    ratio = rng.uniform(0,1)
+    p_troves = rng.uniform(0,1,len(active_accounts))
     coll_added_float = 0
     issuance_ZUSD_adjust = 0
 
     for i, working_trove in enumerate(active_accounts):
         account = accounts[working_trove['index']]
-        currentICR = contracts.troveManager.getCurrentICR(account, floatToWei(price_ether_current)) / 1e18
-        amounts = contracts.troveManager.getEntireDebtAndColl(account)
+        currentICR = shadow.current_ICR(account, floatToWei(price_ether_current)) / 1e18
+        amounts = shadow.entire_debt_and_coll(account)
         coll = amounts['coll'] / 1e18
         debt = amounts['debt'] / 1e18
 
-        random.seed(187*index + 3*i)
-        p = random.uniform(0,1)
+        p = p_troves[i]
         check = (currentICR - working_trove['CR_initial']) / (working_trove['CR_initial'] * working_trove['Rational_inattention'])
 
         if check >= -1 and check <= 2:
@@ -608,7 +628,6 @@ def adjust_troves(accounts, contracts, active_accounts, inactive_accounts, price
         #A part of the troves are adjusted by adjusting debt
         if p >= ratio:
             debt_new = price_ether_current * coll / working_trove['CR_initial']
-            hints = get_hints_from_amounts(accounts, contracts, active_accounts, coll, debt_new, price_ether_current)
             if debt_new < MIN_NET_DEBT:
                 continue
             if check < -1:
@@ -616,58 +635,65 @@ def adjust_troves(accounts, contracts, active_accounts, inactive_accounts, price
                 repay_amount = floatToWei(debt - debt_new)
                 pending = get_zusd_to_repay(accounts, contracts, active_accounts, inactive_accounts, account, repay_amount)
                 if pending == 0:
+                    hints = get_hints(shadow, amounts['coll'], amounts['debt'] - repay_amount, account)
                     contracts.borrowerOperations.repayZUSD(repay_amount, hints[0], hints[1], { 'from': account })
             elif check > 2 and not is_recovery_mode(contracts, price_ether_current):
                 # withdraw ZUSD
                 withdraw_amount = debt_new - debt
                 withdraw_amount_wei = floatToWei(withdraw_amount)
                 if isNewTCRAboveCCR(contracts, 0, False, withdraw_amount_wei, True, floatToWei(price_ether_current)):
+                    # the borrowing fee is added to the debt
+                    fee = contracts.troveManager.getBorrowingRateWithDecay() * withdraw_amount_wei // Wei(1e18)
+                    hints = get_hints(shadow, amounts['coll'], amounts['debt'] + withdraw_amount_wei + fee, account)
                     contracts.borrowerOperations.withdrawZUSD(MAX_FEE, withdraw_amount_wei, hints[0], hints[1], { 'from': account })
                     rate_issuance = contracts.troveManager.getBorrowingRateWithDecay() / 1e18
                     issuance_ZUSD_adjust = issuance_ZUSD_adjust + rate_issuance * withdraw_amount
         #Another part of the troves are adjusted by adjusting collaterals
         elif p < ratio:
             coll_new = working_trove['CR_initial'] * debt / price_ether_current
-            hints = get_hints_from_amounts(accounts, contracts, active_accounts, coll_new, debt, price_ether_current)
             if check < -1:
                 # add coll
                 coll_added_float = coll_new - coll
                 coll_added = floatToWei(coll_added_float)
+                hints = get_hints(shadow, amounts['coll'] + coll_added, amounts['debt'], account)
                 contracts.borrowerOperations.addColl(hints[0], hints[1], { 'from': account, 'value': coll_added })
             elif check > 2 and not is_recovery_mode(contracts, price_ether_current):
                 # withdraw ETH
                 coll_withdrawn = floatToWei(coll - coll_new)
                 if isNewTCRAboveCCR(contracts, coll_withdrawn, False, 0, False, floatToWei(price_ether_current)):
+                    hints = get_hints(shadow, amounts['coll'] - coll_withdrawn, amounts['debt'], account)
                     contracts.borrowerOperations.withdrawColl(coll_withdrawn, hints[0], hints[1], { 'from': account })
 
     return [coll_added_float, issuance_ZUSD_adjust]
 
 """Open Troves"""
 
-def open_trove(accounts, contracts, active_accounts, inactive_accounts, supply_trove, quantity_ether, CR_ratio, rational_inattention, price_ether_current):
+def open_trove(accounts, contracts, shadow, active_accounts, inactive_accounts, supply_trove, quantity_ether, CR_ratio, rational_inattention, price_ether_current):
     if len(inactive_accounts) == 0:
         return
     if is_recovery_mode(contracts, price_ether_current) and CR_ratio < 1.5:
         return
 
-    #hints = get_hints_from_ICR(accounts, active_accounts, CR_ratio)
-    hints = get_hints_from_amounts(accounts, contracts, active_accounts, quantity_ether, supply_trove, price_ether_current)
     coll = floatToWei(quantity_ether)
     debtChange = floatToWei(supply_trove) + ZUSD_GAS_COMPENSATION
+    # the net debt comes to `supply_trove` once the borrowing fee is added, up to the rounding of the fee
+    hints = get_hints(shadow, coll, floatToWei(supply_trove) + shadow.gas_compensation)
     zusd = get_zusd_amount_from_net_debt(contracts, floatToWei(supply_trove))
     if isNewTCRAboveCCR(contracts, coll, True, debtChange, True, floatToWei(price_ether_current)):
         contracts.borrowerOperations.openTrove(MAX_FEE, zusd, hints[0], hints[1],
                                                { 'from': accounts[inactive_accounts[0]], 'value': coll })
         new_account = {"index": inactive_accounts[0], "CR_initial": CR_ratio, "Rational_inattention": rational_inattention}
-        active_accounts.insert(hints[2], new_account)
+        # active accounts are kept sorted by the ICR they open at
+        ICR = quantity_ether * price_ether_current / supply_trove
+        active_accounts.insert(bisect_left([a['CR_initial'] for a in active_accounts], ICR), new_account)
         inactive_accounts.pop(0)
         return True
 
     return False
 
-def open_troves(accounts, contracts, active_accounts, inactive_accounts, price_ether_current, price_ZUSD, index):
-    random.seed(2019*index)
-    shock_opentroves = random.normalvariate(0,sd_opentroves)
+def open_troves(accounts, contracts, shadow, active_accounts, inactive_accounts, price_ether_current, price_ZUSD, index, streams):
+    rng = streams('open_troves', index)
+    shock_opentroves = rng.normal(0,sd_opentroves)
     n_troves = len(active_accounts)
     rate_issuance = contracts.troveManager.getBorrowingRateWithDecay() / 1e18
     coll_added = 0
@@ -682,23 +708,21 @@ def open_troves(accounts, contracts, active_accounts, inactive_accounts, price_e
                         alpha * (price_ZUSD - rate_issuance - 1) * n_troves
 
     number_opentroves = min(int(round(float(number_opentroves))), len(inactive_accounts))
+    CR_ratios = target_cr_a + target_cr_b * rng.chisquare(df=target_cr_chi_square_df, size=number_opentroves)
+    quantities_ether = rng.gamma(collateral_gamma_k, scale=collateral_gamma_theta, size=number_opentroves)
+    rational_inattentions = rng.gamma(rational_inattention_gamma_k, scale=rational_inattention_gamma_theta, size=number_opentroves)
 
     for i in range(0, number_opentroves):
-        np.random.seed(2033 + index + i*i)
-        CR_ratio = target_cr_a + target_cr_b * np.random.chisquare(df=target_cr_chi_square_df)
-
-        np.random.seed(20 + 10 * i + index)
-        quantity_ether = np.random.gamma(collateral_gamma_k, scale=collateral_gamma_theta)
-
-        np.random.seed(209870- index + i*i)
-        rational_inattention = np.random.gamma(rational_inattention_gamma_k, scale=rational_inattention_gamma_theta)
+        CR_ratio = CR_ratios[i]
+        quantity_ether = quantities_ether[i]
+        rational_inattention = rational_inattentions[i]
         supply_trove = price_ether_current * quantity_ether / CR_ratio
         if supply_trove < MIN_NET_DEBT:
             supply_trove = MIN_NET_DEBT
             quantity_ether = CR_ratio * supply_trove / price_ether_current
 
         issuance_ZUSD_open = issuance_ZUSD_open + rate_issuance * supply_trove
-        if open_trove(accounts, contracts, active_accounts, inactive_accounts, supply_trove, quantity_ether, CR_ratio, rational_inattention, price_ether_current):
+        if open_trove(accounts, contracts, shadow, active_accounts, inactive_accounts, supply_trove, quantity_ether, CR_ratio, rational_inattention, price_ether_current):
             coll_added = coll_added + quantity_ether
 
     return [coll_added, issuance_ZUSD_open]
@@ -709,12 +733,12 @@ def open_troves(accounts, contracts, active_accounts, inactive_accounts, price_e
 Stability Pool
 """
 
-def stability_update(accounts, contracts, active_accounts, return_stability, index):
-    supply = contracts.zusdToken.totalSupply() / 1e18
-    stability_pool_previous = contracts.stabilityPool.getTotalZUSDDeposits() / 1e18
+def stability_update(accounts, contracts, active_accounts, return_stability, index, streams):
+    reader = view_reader(contracts)
+    [supply, stability_pool_previous] = [amount / 1e18 for amount in reader.call([
+        (contracts.zusdToken.totalSupply,), (contracts.stabilityPool.getTotalZUSDDeposits,)])]
 
-    np.random.seed(27+3*index)
-    shock_stability = np.random.normal(0,sd_stability)
+    shock_stability = streams('stability_update', index).normal(0,sd_stability)
     natural_rate_current = natural_rate[index]
     if stability_pool_previous == 0:
         stability_pool = stability_initial
@@ -729,15 +753,14 @@ def stability_update(accounts, contracts, active_accounts, return_stability, ind
 
     if stability_pool > stability_pool_previous:
         remaining = stability_pool - stability_pool_previous
-        i = 0
-        while remaining > 0 and i < len(active_accounts):
-          account = index2address(accounts, active_accounts, i)
-          balance = contracts.zusdToken.balanceOf(account) / 1e18
-          deposit = min(balance, remaining)
+        holders = [index2address(accounts, active_accounts, i) for i in range(len(active_accounts))]
+        for account, balance in zip(holders, reader.balances(contracts.zusdToken, holders)):
+          if remaining <= 0:
+              break
+          deposit = min(balance / 1e18, remaining)
           if deposit > 0:
               contracts.stabilityPool.provideToSP(floatToWei(deposit), ZERO_ADDRESS, { 'from': account, 'gas_limit': 8000000, 'allow_revert': True })
               remaining = remaining - deposit
-          i = i + 1
     else:
         current_deposit = contracts.stabilityPool.getCompoundedZUSDDeposit(accounts[0])
         if current_deposit > 0:
@@ -834,19 +857,18 @@ Redemption fee revenue amounts to
 sd_redemption = 0.001
 redemption_start = 0.8
 
-def redeem_trove(accounts, contracts, i, price_ether_current):
+def redeem_trove(accounts, contracts, shadow, i, price_ether_current):
     zusd_balance = contracts.zusdToken.balanceOf(accounts[i])
-    [firstRedemptionHint, partialRedemptionHintNICR, truncatedZUSDamount] = contracts.hintHelpers.getRedemptionHints(zusd_balance, price_ether_current, 70)
+    [firstRedemptionHint, partialRedemptionHintNICR, truncatedZUSDamount, upperHint, lowerHint] = \
+        shadow.redemption_hints(zusd_balance, floatToWei(price_ether_current), 70)
     if truncatedZUSDamount == Wei(0):
         return None
-    approxHint = contracts.hintHelpers.getApproxHint(partialRedemptionHintNICR, 2000, 0)
-    hints = contracts.sortedTroves.findInsertPosition(partialRedemptionHintNICR, approxHint[0], approxHint[0])
     try:
         tx = contracts.troveManager.redeemCollateral(
             truncatedZUSDamount,
             firstRedemptionHint,
-            hints[0],
-            hints[1],
+            upperHint,
+            lowerHint,
             partialRedemptionHintNICR,
             70,
             MAX_FEE,
@@ -862,14 +884,10 @@ def redeem_trove(accounts, contracts, i, price_ether_current):
         print(f"ZUSD bal: {zusd_balance / 1e18}")
         print(f"truncated: {truncatedZUSDamount / 1e18}")
         print(f"Redemption rate: {contracts.troveManager.getRedemptionRateWithDecay() * 100 / 1e18} %")
-        print(f"approx: {approxHint[0]}")
-        print(f"diff: {approxHint[1]}")
-        print(f"diff: {approxHint[1] / 1e18}")
-        print(f"seed: {approxHint[2]}")
         print(f"amount: {truncatedZUSDamount}")
         print(f"first: {firstRedemptionHint}")
-        print(f"hint: {hints[0]}")
-        print(f"hint: {hints[1]}")
+        print(f"hint: {upperHint}")
+        print(f"hint: {lowerHint}")
         print(f"nicr: {partialRedemptionHintNICR}")
         print(f"nicr: {partialRedemptionHintNICR / 1e18}")
         print(f"70")
@@ -877,27 +895,29 @@ def redeem_trove(accounts, contracts, i, price_ether_current):
         #return None
         exit(1)
 
-def price_stabilizer(accounts, contracts, active_accounts, inactive_accounts, price_ether_current, price_ZUSD, index):
-
-    stability_pool = contracts.stabilityPool.getTotalZUSDDeposits() / 1e18
+def price_stabilizer(accounts, contracts, shadow, active_accounts, inactive_accounts, price_ether_current, price_ZUSD, index, streams):
+    reader = view_reader(contracts)
+    [stability_pool, supply, rate_issuance, rate_redemption] = [amount / 1e18 for amount in reader.call([
+        (contracts.stabilityPool.getTotalZUSDDeposits,),
+        (contracts.zusdToken.totalSupply,),
+        (contracts.troveManager.getBorrowingRateWithDecay,),
+        (contracts.troveManager.getRedemptionRateWithDecay,),
+    ])]
     redemption_pool = 0
     redemption_fee = 0
     issuance_ZUSD_stabilizer = 0
 
-    supply = contracts.zusdToken.totalSupply() / 1e18
     #Liquidity Pool
     liquidity_pool = supply - stability_pool
 
     # next iteration step for liquidity pool
-    np.random.seed(20*index)
-    shock_liquidity = np.random.normal(0,sd_liquidity)
+    rng = streams('price_stabilizer', index)
+    shock_liquidity = rng.normal(0,sd_liquidity)
 
     liquidity_pool_next = liquidity_pool * drift_liquidity * (1+shock_liquidity)
 
     #Calculating Price
     price_ZUSD_current = calculate_price(price_ZUSD, liquidity_pool, liquidity_pool_next)
-    rate_issuance = contracts.troveManager.getBorrowingRateWithDecay() / 1e18
-    rate_redemption = contracts.troveManager.getRedemptionRateWithDecay() / 1e18
 
     #Stabilizer
     #Ceiling Arbitrageurs
@@ -911,15 +931,14 @@ def price_stabilizer(accounts, contracts, active_accounts, inactive_accounts, pr
         rational_inattention = 0.1
         quantity_ether = supply_trove * CR_ratio / price_ether_current
         issuance_ZUSD_stabilizer = rate_issuance * supply_trove
-        if open_trove(accounts, contracts, active_accounts, inactive_accounts, supply_trove, quantity_ether, CR_ratio, rational_inattention):
+        if open_trove(accounts, contracts, shadow, active_accounts, inactive_accounts, supply_trove, quantity_ether, CR_ratio, rational_inattention, price_ether_current):
             price_ZUSD_current = 1.1 + rate_issuance
             liquidity_pool = supply_wanted - stability_pool
 
 
     #Floor Arbitrageurs
     if price_ZUSD_current < 1 - rate_redemption:
-        np.random.seed(30*index)
-        shock_redemption = np.random.normal(0, sd_redemption)
+        shock_redemption = rng.normal(0, sd_redemption)
         redemption_ratio = max(1, redemption_start * (1+shock_redemption))
 
         supply_target = stability_pool + \
@@ -936,13 +955,13 @@ def price_stabilizer(accounts, contracts, active_accounts, inactive_accounts, pr
             price_ZUSD_current = calculate_price(price_ZUSD, liquidity_pool, liquidity_pool_next)
 
         remaining = redemption_pool
-        i = 0
-        while remaining > 0 and i < len(active_accounts):
-          account = index2address(accounts, active_accounts, i)
-          balance = contracts.zusdToken.balanceOf(account) / 1e18
-          redemption = min(balance, remaining)
+        holders = [index2address(accounts, active_accounts, i) for i in range(len(active_accounts))]
+        for balance in reader.balances(contracts.zusdToken, holders):
+          if remaining <= 0:
+              break
+          redemption = min(balance / 1e18, remaining)
           if redemption > 0:
-              tx = redeem_trove(accounts, contracts, 0, price_ether_current)
+              tx = redeem_trove(accounts, contracts, shadow, 0, price_ether_current)
               if tx:
                   remove_accounts_from_events(
                     accounts,
@@ -952,7 +971,6 @@ def price_stabilizer(accounts, contracts, active_accounts, inactive_accounts, pr
                     '_borrower'
                   )
                   remaining = remaining - redemption
-          i = i + 1
 
 
     #Redemption Fee
@@ -962,15 +980,14 @@ def price_stabilizer(accounts, contracts, active_accounts, inactive_accounts, pr
 
 """# ZERO Market"""
 
-def ZERO_market(index, data):
+def ZERO_market(index, data, streams):
     #quantity_ZERO = (ZERO_total_supply/3)*(1-0.5**(index/period))
-    np.random.seed(2+3*index)
     if index <= month:
         price_ZERO_current = price_ZERO[index-1]
-        annualized_earning = (index/month)**0.5 * np.random.normal(200000000,500000)
+        annualized_earning = (index/month)**0.5 * streams('ZERO_market', index).normal(200000000,500000)
     else:
-        revenue_issuance = sum(data['issuance_fee'][index - month:index])
-        revenue_redemption = sum(data['redemption_fee'][index - month:index])
+        revenue_issuance = data.window_sum('issuance_fee', month, index)
+        revenue_redemption = data.window_sum('redemption_fee', month, index)
         annualized_earning = 365 * (revenue_issuance+revenue_redemption) / 30
         #discounting factor to factor in the risk in early days
         discount=index/period
@@ -1,6 +1,7 @@
 import pytest
 
 import csv
+import os
 
 from brownie import *
 from accounts import *
@@ -123,6 +124,8 @@ def contracts():
     contracts.collSurplusPool = CollSurplusPool.deploy({ 'from': accounts[0] })
     contracts.borrowerOperations = BorrowerOperationsTester.deploy({ 'from': accounts[0] })
     contracts.hintHelpers = HintHelpers.deploy({ 'from': accounts[0] })
+    # batches the view calls of the simulation
+    contracts.multicall = Multicall.deploy({ 'from': accounts[0] })
     contracts.zusdToken = ZUSDToken.deploy(
         contracts.troveManager.address,
         contracts.stabilityPool.address,
@@ -192,78 +195,116 @@ def _test_test(contracts):
 def test_run_simulation(add_accounts, contracts, print_expectations):
     ZUSD_GAS_COMPENSATION = contracts.troveManager.ZUSD_GAS_COMPENSATION() / 1e18
     MIN_NET_DEBT = contracts.troveManager.MIN_NET_DEBT() / 1e18
-
-    contracts.priceFeedTestnet.setPrice(floatToWei(price_ether[0]), { 'from': accounts[0] })
-    # whale
-    whale_coll = 30000.0
-    contracts.borrowerOperations.openTrove(MAX_FEE, Wei(10e24), ZERO_ADDRESS, ZERO_ADDRESS,
-                                           { 'from': accounts[0], 'value': floatToWei(whale_coll) })
-    contracts.stabilityPool.provideToSP(floatToWei(stability_initial), ZERO_ADDRESS, { 'from': accounts[0] })
-
-    active_accounts = []
-    inactive_accounts = [*range(1, len(accounts))]
-
-    price_ZUSD = 1
-    price_ZERO_current = price_ZERO_initial
-
-    data = {"airdrop_gain": [0] * n_sim, "liquidation_gain": [0] * n_sim, "issuance_fee": [0] * n_sim, "redemption_fee": [0] * n_sim}
-    total_zusd_redempted = 0
-    total_coll_added = whale_coll
-    total_coll_liquidated = 0
+    streams = RandomStreams(seed)
+
+    state = load_simulation_checkpoint(CHECKPOINT, contracts)
+    if state is None:
+        # trove state mirrored from the events, read instead of the contracts
+        shadow = ShadowTroves(contracts)
+        contracts.priceFeedTestnet.setPrice(floatToWei(price_ether[0]), { 'from': accounts[0] })
+        # whale
+        whale_coll = 30000.0
+        contracts.borrowerOperations.openTrove(MAX_FEE, Wei(10e24), ZERO_ADDRESS, ZERO_ADDRESS,
+                                               { 'from': accounts[0], 'value': floatToWei(whale_coll) })
+        contracts.stabilityPool.provideToSP(floatToWei(stability_initial), ZERO_ADDRESS, { 'from': accounts[0] })
+
+        active_accounts = []
+        inactive_accounts = [*range(1, len(accounts))]
+
+        price_ZUSD = 1
+        price_ZERO_current = price_ZERO_initial
+
+        data = Recorder(n_sim, {"airdrop_gain": float, "liquidation_gain": float, "issuance_fee": float, "redemption_fee": float})
+        total_zusd_redempted = 0
+        total_coll_added = whale_coll
+        total_coll_liquidated = 0
+        start = 1
+    else:
+        active_accounts, inactive_accounts = state['active_accounts'], state['inactive_accounts']
+        price_ZUSD, price_ZERO_current, data = state['price_ZUSD'], state['price_ZERO_current'], state['data']
+        total_zusd_redempted, total_coll_added, total_coll_liquidated = state['totals']
+        shadow = state['shadow']
+        shadow.attach()
+        start = state['index'] + 1
+        print(f"Resuming from iteration {start}")
+
+    # wall time and JSON-RPC requests per phase of each iteration
+    profiler = Profiler(rpc=RpcCounter().install(web3))
+    # one persistent connection to the node, which also sends the JSON-RPC batches
+    use_transport(web3, RPC).counter = profiler.rpc
 
     print(f"Accounts: {len(accounts)}")
     print(f"Network: {network.show_active()}")
 
-    logGlobalState(contracts)
+    logGlobalState(contracts, view_reader(contracts))
 
-    with open('tests/simulation.csv', 'w', newline='') as csvfile:
+    with open('tests/simulation.csv', 'w' if state is None else 'r+', newline='') as csvfile:
         datawriter = csv.writer(csvfile, delimiter=',')
-        datawriter.writerow(['iteration', 'ETH_price', 'price_ZUSD', 'price_ZERO', 'num_troves', 'total_coll', 'total_debt', 'TCR', 'recovery_mode', 'last_ICR', 'SP_ZUSD', 'SP_ETH', 'total_coll_added', 'total_coll_liquidated', 'total_zusd_redempted'])
+        if state is None:
+            datawriter.writerow(['iteration', 'ETH_price', 'price_ZUSD', 'price_ZERO', 'num_troves', 'total_coll', 'total_debt', 'TCR', 'recovery_mode', 'last_ICR', 'SP_ZUSD', 'SP_ETH', 'total_coll_added', 'total_coll_liquidated', 'total_zusd_redempted'])
+        else:
+            # drop the rows written after the checkpoint
+            csvfile.truncate(state['csv_size'])
+            csvfile.seek(state['csv_size'])
 
         #Simulation Process
-        for index in range(1, n_sim):
+        for index in range(start, n_sim):
             print('\n  --> Iteration', index)
             print('  -------------------\n')
             #exogenous ether price input
+            profiler.step(index)
             price_ether_current = price_ether[index]
-            contracts.priceFeedTestnet.setPrice(floatToWei(price_ether_current), { 'from': accounts[0] })
+            with profiler.phase('set_price'):
+                contracts.priceFeedTestnet.setPrice(floatToWei(price_ether_current), { 'from': accounts[0] })
 
             #trove liquidation & return of stability pool
-            result_liquidation = liquidate_troves(accounts, contracts, active_accounts, inactive_accounts, price_ether_current, price_ZUSD, price_ZERO_current, data, index)
+            with profiler.phase('liquidate_troves'):
+                result_liquidation = liquidate_troves(accounts, contracts, shadow, active_accounts, inactive_accounts, price_ether_current, price_ZUSD, price_ZERO_current, data, index)
             total_coll_liquidated = total_coll_liquidated + result_liquidation[0]
             return_stability = result_liquidation[1]
 
             #close troves
-            result_close = close_troves(accounts, contracts, active_accounts, inactive_accounts, price_ether_current, price_ZUSD, index)
+            with profiler.phase('close_troves'):
+                result_close = close_troves(accounts, contracts, shadow, active_accounts, inactive_accounts, price_ether_current, price_ZUSD, index, streams)
 
             #adjust troves
-            [coll_added_adjust, issuance_ZUSD_adjust] = adjust_troves(accounts, contracts, active_accounts, inactive_accounts, price_ether_current, index)
+            with profiler.phase('adjust_troves'):
+                [coll_added_adjust, issuance_ZUSD_adjust] = adjust_troves(accounts, contracts, shadow, active_accounts, inactive_accounts, price_ether_current, index, streams)
 
             #open troves
-            [coll_added_open, issuance_ZUSD_open] = open_troves(accounts, contracts, active_accounts, inactive_accounts, price_ether_current, price_ZUSD, index)
+            with profiler.phase('open_troves'):
+                [coll_added_open, issuance_ZUSD_open] = open_troves(accounts, contracts, shadow, active_accounts, inactive_accounts, price_ether_current, price_ZUSD, index, streams)
             total_coll_added = total_coll_added + coll_added_adjust + coll_added_open
             #active_accounts.sort(key=lambda a : a.get('CR_initial'))
 
             #Stability Pool
-            stability_update(accounts, contracts, active_accounts, return_stability, index)
+            with profiler.phase('stability_update'):
+                stability_update(accounts, contracts, active_accounts, return_stability, index, streams)
 
             #Calculating Price, Liquidity Pool, and Redemption
-            [price_ZUSD, redemption_pool, redemption_fee, issuance_ZUSD_stabilizer] = price_stabilizer(accounts, contracts, active_accounts, inactive_accounts, price_ether_current, price_ZUSD, index)
+            with profiler.phase('price_stabilizer'):
+                [price_ZUSD, redemption_pool, redemption_fee, issuance_ZUSD_stabilizer] = price_stabilizer(accounts, contracts, shadow, active_accounts, inactive_accounts, price_ether_current, price_ZUSD, index, streams)
             total_zusd_redempted = total_zusd_redempted + redemption_pool
             print('ZUSD price', price_ZUSD)
             print('ZERO price', price_ZERO_current)
 
             issuance_fee = price_ZUSD * (issuance_ZUSD_adjust + issuance_ZUSD_open + issuance_ZUSD_stabilizer)
-            data['issuance_fee'][index] = issuance_fee
-            data['redemption_fee'][index] = redemption_fee
+            data.loc[index, 'issuance_fee'] = issuance_fee
+            data.loc[index, 'redemption_fee'] = redemption_fee
 
             #ZERO Market
-            result_ZERO = ZERO_market(index, data)
+            with profiler.phase('ZERO_market'):
+                result_ZERO = ZERO_market(index, data, streams)
             price_ZERO_current = result_ZERO[0]
             #annualized_earning = result_ZERO[1]
             #MC_ZERO_current = result_ZERO[2]
 
-            [ETH_price, num_troves, total_coll, total_debt, TCR, recovery_mode, last_ICR, SP_ZUSD, SP_ETH] = logGlobalState(contracts)
+            if shadow_check_every and index % shadow_check_every == 0:
+                with profiler.phase('shadow_check'):
+                    check_shadow(accounts, contracts, shadow, active_accounts, price_ether_current, index, streams)
+
+            with profiler.phase('log_state'):
+                [ETH_price, num_troves, total_coll, total_debt, TCR, recovery_mode, last_ICR, SP_ZUSD, SP_ETH] = logGlobalState(contracts, view_reader(contracts))
             print('Total redempted ', total_zusd_redempted)
             print('Total ETH added ', total_coll_added)
             print('Total ETH liquid', total_coll_liquidated)
@@ -273,3 +314,16 @@ def test_run_simulation(add_accounts, contracts, print_expectations):
             datawriter.writerow([index, ETH_price, price_ZUSD, price_ZERO_current, num_troves, total_coll, total_debt, TCR, recovery_mode, last_ICR, SP_ZUSD, SP_ETH, total_coll_added, total_coll_liquidated, total_zusd_redempted])
 
             assert price_ZUSD > 0
+
+            if index % checkpoint_every == 0:
+                save_simulation_checkpoint(CHECKPOINT, contracts, {
+                    'index': index, 'active_accounts': active_accounts, 'inactive_accounts': inactive_accounts,
+                    'price_ZUSD': price_ZUSD, 'price_ZERO_current': price_ZERO_current, 'data': data, 'shadow': shadow,
+                    'totals': (total_zusd_redempted, total_coll_added, total_coll_liquidated)}, csvfile)
+
+    # the run is complete: the next one starts over
+    if os.path.exists(CHECKPOINT):
+        os.remove(CHECKPOINT)
+    print(profiler.summary())
+    profiler.to_csv('tests/simulation_profile.csv')
+    profiler.to_json('tests/simulation_profile.json')